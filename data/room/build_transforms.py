@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Build nerfstudio/transforms.json in one pass: poses, fl_x/fl_y/cx/cy, w/h and
+distortion from a single parse of the COLMAP model and a single write.
+
+Usage:
+ python build_transforms.py \
+   --colmap_dir ~/nerf_project/data/room/sparse/0 \
+   --images_dir ~/nerf_project/data/room/nerfstudio/images \
+   --out ~/nerf_project/data/room/nerfstudio/transforms.json
+
+--stages poses,intrinsics,wh,distortion picks a subset; without 'poses' the
+existing transforms.json is updated in place.
+"""
+import sys
+from nerfprep.pipeline import main
+
+if __name__ == '__main__':
+    sys.exit(main())
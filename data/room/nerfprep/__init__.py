@@ -0,0 +1,39 @@
+"""
+Shared helpers for the data/room preprocessing scripts.
+
+The scripts in data/room import this package as a sibling directory, so
+nothing needs to be installed:
+
+ python convert_colmap_txt_to_transforms.py --colmap_dir sparse/0 ...
+ python -m nerfprep <command> ...             # all tools behind one entry point
+
+The main functions are also importable from the package itself, each module
+loaded on first use:
+
+ from nerfprep import SceneModel, new_context, run
+"""
+import importlib
+
+# name -> module that defines it
+_API = {
+    'read_model': 'colmap_io', 'write_model': 'colmap_io', 'detect_format': 'colmap_io',
+    'find_model_dir': 'colmap_io',
+    'SceneModel': 'scene',
+    'match_names': 'matching',
+    'poses_to_transforms': 'poses',
+    'probe_sizes': 'imagesize',
+    'write_transforms': 'transforms_io', 'load_sidecar': 'transforms_io', 'fresh_sidecar': 'transforms_io',
+    'frame_poses': 'transforms_io',
+    'new_context': 'pipeline', 'run': 'pipeline', 'STAGES': 'pipeline',
+    'scene_root': 'paths',
+    'span': 'trace', 'traced': 'trace',
+}
+__all__ = sorted(_API)
+
+
+def __getattr__(name):
+    if name not in _API:
+        raise AttributeError(f"module 'nerfprep' has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _API[name], __name__), name)
+    globals()[name] = value
+    return value
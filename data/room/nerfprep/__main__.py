@@ -0,0 +1,64 @@
+"""
+One entry point for the preprocessing tools:
+
+ python -m nerfprep <command> [args]        # python -m nerfprep -h lists them
+ python -m nerfprep build --root ~/nerf_project/data/room
+ NERFPREP_ROOT=/data/scan42 python -m nerfprep wh
+
+A command's module is imported only when it runs, so listing the commands
+does not load numpy or PIL. The scene-root commands (build, convert,
+intrinsics, wh, batch, watch, dedup, link, link-convert, pyramid) load them
+only after their arguments are parsed, so their -h is instant too; the array
+tools (validate, keyframes, covis, rays, pixels, undistort, dense, points,
+tiles, bench) import numpy with their module, -h included.
+"""
+import importlib
+import sys
+
+# command -> (module, function, leading args, summary)
+COMMANDS = {
+    'build': ('pipeline', 'main', (), 'transforms.json in one pass (poses, intrinsics, wh, distortion, undistort)'),
+    'convert': ('convert', 'main', (), 'poses-only transforms.json (fuzzy names, --exact for exact)'),
+    'intrinsics': ('pipeline', 'update_main', ('intrinsics',), 'add fl_x/fl_y/cx/cy to <root>/nerfstudio/transforms.json'),
+    'wh': ('pipeline', 'update_main', ('wh',), 'add w/h to <root>/nerfstudio/transforms.json'),
+    'validate': ('validate', 'main', (), 'pre-flight checks of poses, intrinsics and files (exit 1 on errors)'),
+    'keyframes': ('keyframes', 'main', (), 'drop near-duplicate frames (pose-space grid)'),
+    'covis': ('covis', 'main', (), 'co-visibility graph, neighbors and components from points3D tracks'),
+    'rays': ('rays', 'main', (), 'memory-mapped ray bundles per pyramid level'),
+    'pixels': ('pixels', 'main', (), 'decode frames once into memory-mapped uint8 arrays per pyramid level'),
+    'batch': ('batch', 'main', (), 'build every scene under a directory in a process pool'),
+    'watch': ('watch', 'main', (), 'update transforms.json incrementally as images and poses arrive'),
+    'dedup': ('dedup', 'main', (), 'hardlink/reflink identical images, match COLMAP names by content'),
+    'link': ('links', 'main', (), 'symlink COLMAP image names to the matching files'),
+    'link-convert': ('links', 'convert_main', (), 'link (hardlink or copy as fallback), then convert in the same process'),
+    'undistort': ('undistort', 'main', (), 'undistort frames to pinhole images'),
+    'dense': ('dense', 'main', (), 'depth map stats and depth_file_path export from dense/stereo'),
+    'pyramid': ('pyramid', 'main', (), 'images_2/4/8 downscales'),
+    'points': ('points', 'main', (), 'filter points3D and export a PLY'),
+    'tiles': ('tiles', 'main', (), 'octree LOD tiles for the web viewer'),
+    'bench': ('bench', 'main', (), 'benchmark the scripts on synthetic scenes'),
+}
+
+
+def usage():
+    lines = ["usage: python -m nerfprep <command> [args]   (<command> -h for its options)", "", "commands:"]
+    lines += [f"  {name:14s} {summary}" for name, (_, _, _, summary) in COMMANDS.items()]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(usage())
+        return 0 if argv else 2
+    if argv[0] not in COMMANDS:
+        print(f"unknown command {argv[0]!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module, func, lead, _ = COMMANDS[argv[0]]
+    sys.argv[0] = f"nerfprep {argv[0]}"     # argparse prog
+    fn = getattr(importlib.import_module('nerfprep.' + module), func)
+    return fn(*lead, argv[1:]) or 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
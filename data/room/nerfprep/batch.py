@@ -0,0 +1,200 @@
+"""
+Run the transforms.json pipeline over many scenes at once.
+
+ python -m nerfprep batch /data/captures --jobs 8 --mem_budget 16000 --report batch.json
+ python -m nerfprep batch /data/captures -- --stages poses,intrinsics,wh --c2w   # args after -- go to build
+
+A scene is any directory under the root with a COLMAP model (sparse/0 or
+sparse_txt) and nerfstudio/images; discovery stops descending at a scene.
+Scenes run in a process pool, biggest first, each in a fresh worker process
+with its output in <scene>/nerfstudio/batch.log. A scene is started only if
+the estimated memory of the running scenes stays within --mem_budget (a scene
+larger than the budget runs alone). A scene that fails or raises is reported
+and the batch carries on. A worker that dies takes the scenes running next
+to it down too; those are retried one at a time, so only the scene that
+kills its worker again is reported as crashed. The exit code is 1 if any
+scene failed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr, redirect_stdout
+from .colmap_io import detect_format, find_model_dir
+
+LOG_NAME = 'batch.log'
+
+
+def discover(root, max_depth=4):
+    """Scene directories under `root` (root itself included), sorted."""
+    scenes = []
+    todo = [(os.path.abspath(root), 0)]
+    while todo:
+        path, depth = todo.pop()
+        if find_model_dir(path) and os.path.isdir(os.path.join(path, 'nerfstudio', 'images')):
+            scenes.append(path)
+            continue
+        if depth >= max_depth:
+            continue
+        try:
+            with os.scandir(path) as it:
+                todo += [(e.path, depth + 1) for e in it
+                         if e.is_dir(follow_symlinks=False) and not e.name.startswith('.')]
+        except OSError:
+            continue
+    return sorted(scenes)
+
+
+def estimate_mb(scene):
+    """Rough peak memory of one pipeline run: interpreter + numpy, plus a few
+    times the size of the model files it parses."""
+    d = find_model_dir(scene)
+    ext = detect_format(d)
+    size = sum(os.path.getsize(p) for p in (os.path.join(d, f'{n}.{ext}') for n in ('cameras', 'images', 'frames', 'rigs'))
+               if os.path.isfile(p))
+    return 80 + 3 * size / (1 << 20)
+
+
+def run_scene(scene, argv=()):
+    """Pipeline for one scene, output to its batch.log; returns a status dict."""
+    log_path = os.path.join(scene, 'nerfstudio', LOG_NAME)
+    t = time.perf_counter()
+    status, error = 'ok', None
+    with open(log_path, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            from .pipeline import main
+            rc = main(['--root', scene, *argv])
+        except SystemExit as e:     # argparse errors
+            rc = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            traceback.print_exc()
+            rc, error = 1, repr(e)
+        if rc:
+            status, error = 'failed', error or f"exit {rc}, see {log_path}"
+    frames = None
+    try:
+        with open(os.path.join(scene, 'nerfstudio', 'transforms.json')) as f:
+            frames = len(json.load(f).get('frames', []))
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    except ImportError:
+        peak = None
+    return {'scene': scene, 'status': status, 'error': error, 'wall_s': round(time.perf_counter() - t, 3),
+            'frames': frames, 'peak_rss_mb': peak and round(peak, 1), 'log': log_path}
+
+
+def _pool(jobs):
+    # one task per worker: a clean process per scene, so peak RSS is the scene's own
+    # and memory is handed back between scenes
+    if sys.version_info >= (3, 11):
+        return ProcessPoolExecutor(max_workers=jobs, max_tasks_per_child=1)
+    return ProcessPoolExecutor(max_workers=jobs)
+
+
+def _crashed(scene, error):
+    return {'scene': scene, 'status': 'crashed', 'error': error, 'wall_s': None, 'frames': None,
+            'peak_rss_mb': None, 'log': os.path.join(scene, 'nerfstudio', LOG_NAME)}
+
+
+def run_batch(scenes, argv=(), jobs=None, mem_budget=None, on_done=None):
+    """Run every scene; returns the status dicts in scene order.
+
+    A dead worker breaks the whole pool, and with it every scene in flight.
+    Those scenes are suspects: each is retried once, alone in a fresh pool,
+    and only one that kills its worker again is reported as crashed."""
+    jobs = jobs or os.cpu_count() or 1
+    est = {s: estimate_mb(s) for s in scenes}
+    pending = sorted(scenes, key=est.get, reverse=True)
+    running, results, suspects = {}, {}, set()
+    pool = _pool(jobs)
+    try:
+        while pending or running:
+            used = sum(est[s] for s in running.values())
+            i = 0
+            while i < len(pending) and len(running) < jobs and not suspects & set(running.values()):
+                s = pending[i]
+                if running and (s in suspects or mem_budget and used + est[s] > mem_budget):
+                    i += 1
+                    continue
+                running[pool.submit(run_scene, s, tuple(argv))] = s
+                used += est[s]
+                pending.pop(i)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(isinstance(fut.exception(), BrokenProcessPool) for fut in done):
+                done, _ = wait(running)     # the pool is dead: every scene in flight settles now
+            broken = []
+            for fut in done:
+                try:
+                    res = fut.result()
+                except BrokenProcessPool as e:
+                    broken.append((running.pop(fut), repr(e)))
+                    continue
+                results[running.pop(fut)] = res
+                if on_done:
+                    on_done(res)
+            if broken:
+                # the pool cannot be reused; the scenes in flight died with it
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _pool(jobs)
+                for s, error in broken:
+                    if s in suspects or len(broken) == 1:
+                        results[s] = _crashed(s, error)     # it was running alone
+                        if on_done:
+                            on_done(results[s])
+                    else:
+                        suspects.add(s)
+                        pending.append(s)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return [results[s] for s in scenes]
+
+
+def _print_result(res):
+    wall = f"{res['wall_s']:8.2f}s" if res['wall_s'] is not None else ' ' * 9
+    frames = res['frames'] if res['frames'] is not None else '-'
+    print(f"  {res['status']:8s} {wall} {frames!s:>7} frames  {res['scene']}"
+          + (f"  ({res['error']})" if res['error'] else ''), flush=True)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    extra = []
+    if '--' in argv:
+        k = argv.index('--')
+        argv, extra = argv[:k], argv[k + 1:]
+    p = argparse.ArgumentParser(description="Build transforms.json for every scene under a directory.")
+    p.add_argument('root', help='directory searched for scenes')
+    p.add_argument('--jobs', type=int, default=None, help='scenes run at once (default: CPU count)')
+    p.add_argument('--mem_budget', type=float, default=None, help='MB the running scenes may use together (estimated)')
+    p.add_argument('--max_depth', type=int, default=4, help='directory levels searched below the root')
+    p.add_argument('--report', help='write the per-scene status/timing summary as JSON')
+    p.add_argument('--dry_run', action='store_true', help='list the scenes and their estimates only')
+    args = p.parse_args(argv)
+
+    scenes = discover(args.root, args.max_depth)
+    print(f"Found {len(scenes)} scenes under {args.root}")
+    if args.dry_run:
+        for s in scenes:
+            print(f"  {estimate_mb(s):8.0f} MB  {s}")
+        return 0
+    t = time.perf_counter()
+    results = run_batch(scenes, extra, args.jobs, args.mem_budget, on_done=_print_result)
+    wall = time.perf_counter() - t
+    failed = [r for r in results if r['status'] != 'ok']
+    print(f"{len(results) - len(failed)} ok, {len(failed)} failed in {wall:.1f}s")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'root': os.path.abspath(args.root), 'wall_s': round(wall, 3), 'scenes': results}, f, indent=2)
+        print("WROTE", args.report)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""
+Benchmark the conversion scripts on synthetic scenes.
+
+ python -m nerfprep.bench --sizes 1000,10000,100000 --formats txt,bin --schemes whatsapp,frame --out bench.json
+ python -m nerfprep.bench --sizes 1000 --compare bench.json          # exit 1 on a >20% regression
+
+Each scene is a fake ~/nerf_project/data/room: a COLMAP model (sparse_txt or
+sparse/0) with 3 SIMPLE_RADIAL cameras and random poses, nerfstudio/images
+filled with header-only JPEGs, and the scripts linked in. Every stage runs as
+its own process with HOME pointed at the scene, so the scripts find it as
+their default root, and is measured with os.wait4: wall time, peak
+RSS and images per second go to the JSON report.
+
+Name schemes (COLMAP name -> file on disk):
+ exact     IMG_000001.jpg -> IMG_000001.jpg
+ frame     IMG_000001.jpg -> frame_IMG_000001.jpg (ns-process-data)
+ whatsapp  WhatsApp Image 2025-12-08 at 12.50.19 PM (1).jpeg -> frame_00001.jpeg
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from .colmap_io import write_model
+from .paths import ROOT_ENV
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMES = ('exact', 'frame', 'whatsapp')
+# stage -> (script, needs --colmap_dir/--images_dir/--out)
+STAGES = {
+    'convert_txt': ('convert_colmap_txt_to_transforms.py', True),
+    'convert_fuzzy': ('convert_colmap_fuzzy_to_transforms.py', True),
+    'build_transforms': ('build_transforms.py', True),
+    'add_intrinsics': ('add_intrinsics_to_transforms.py', False),
+    'add_wh': ('add_wh_to_transforms.py', False),
+    'make_symlinks': ('make_symlinks_for_colmap_names.py', False),
+    'aggressive_symlink': ('aggressive_symlink_and_convert.py', False),
+}
+WIDTH, HEIGHT = 1200, 1600
+
+
+def dummy_jpeg(w, h):
+    """SOI + baseline SOF0 + EOI: enough for header probing, not decodable."""
+    sof = struct.pack('>BHHB', 8, h, w, 3) + b''.join(struct.pack('>BBB', c, 0x11, 0) for c in (1, 2, 3))
+    return b'\xff\xd8' + b'\xff\xc0' + struct.pack('>H', len(sof) + 2) + sof + b'\xff\xd9'
+
+
+def scheme_names(scheme, n):
+    """(COLMAP names, file names) for `n` images."""
+    if scheme == 'whatsapp':
+        t0 = datetime.datetime(2025, 12, 8, 12, 50, 19)
+        names = []
+        for i in range(n):
+            t = t0 + datetime.timedelta(seconds=i // 4)
+            dup = f' ({i % 4})' if i % 4 else ''
+            names.append(f"WhatsApp Image {t:%Y-%m-%d} at {t:%I.%M.%S %p}{dup}.jpeg")
+        return names, [f'frame_{i + 1:05d}.jpeg' for i in range(n)]
+    names = [f'IMG_{i + 1:06d}.jpg' for i in range(n)]
+    return names, (names if scheme == 'exact' else ['frame_' + s for s in names])
+
+
+def synthetic_model(names, n_cameras=3, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(names)
+    q = rng.standard_normal((n, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    cams = {cid: {'model': 'SIMPLE_RADIAL', 'width': WIDTH, 'height': HEIGHT,
+                  'params': np.array([1400.0 + 10 * k, WIDTH / 2, HEIGHT / 2, 0.01])}
+            for k, cid in enumerate(range(1, n_cameras + 1))}
+    images = {'id': np.arange(1, n + 1, dtype=np.int64), 'qvec': q, 'tvec': rng.standard_normal((n, 3)),
+              'camera_id': rng.integers(1, n_cameras + 1, n), 'name': names}
+    return {'cameras': cams, 'images': images}
+
+
+def make_scene(work, n, fmt, scheme, seed=0):
+    """Create a scene under `work`; returns (home, room, model dir)."""
+    home = os.path.join(work, f'{scheme}-{fmt}-{n}')
+    room = os.path.join(home, 'nerf_project', 'data', 'room')
+    shutil.rmtree(home, ignore_errors=True)
+    images_dir = os.path.join(room, 'nerfstudio', 'images')
+    os.makedirs(images_dir)
+    names, files = scheme_names(scheme, n)
+    model_dir = os.path.join(room, 'sparse', '0') if fmt == 'bin' else os.path.join(room, 'sparse_txt')
+    write_model(model_dir, synthetic_model(names, seed=seed), fmt)
+    blob = dummy_jpeg(WIDTH, HEIGHT)
+    for f in files:
+        with open(os.path.join(images_dir, f), 'wb') as fh:
+            fh.write(blob)
+    for entry in os.listdir(HERE):
+        if entry.endswith('.py') or entry == 'nerfprep':
+            os.symlink(os.path.join(HERE, entry), os.path.join(room, entry))
+    return home, room, model_dir
+
+
+def run_stage(stage, home, room, model_dir, cache=False):
+    """Run one stage to completion; returns (wall seconds, peak RSS MB, exit code)."""
+    script, takes_args = STAGES[stage]
+    argv = [sys.executable, os.path.join(room, script)]
+    if takes_args:
+        argv += ['--colmap_dir', model_dir, '--images_dir', os.path.join(room, 'nerfstudio', 'images'),
+                 '--out', os.path.join(room, 'nerfstudio', 'transforms.json')]
+    env = dict(os.environ, HOME=home)
+    env.pop(ROOT_ENV, None)     # the default root must be the synthetic scene, never the user's
+    if not cache:
+        env['NERFPREP_MODEL_CACHE'] = '0'
+        sizes = os.path.join(room, 'nerfstudio', '.imagesize_cache.json')
+        if os.path.exists(sizes):
+            os.remove(sizes)
+    with open(os.path.join(home, f'{stage}.log'), 'w') as log:
+        t = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=room, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    rss = usage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    return wall, rss, proc.returncode
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report, base, threshold=1.2):
+    """Print wall/RSS ratios against an earlier report; returns the regressed runs."""
+    key = lambda r: (r['scheme'], r['format'], r['images'], r['stage'])
+    old = {key(r): r for r in base['runs']}
+    regressed = []
+    for r in report['runs']:
+        o = old.get(key(r))
+        if not o or not o['wall_s']:
+            continue
+        wall, rss = r['wall_s'] / o['wall_s'], r['max_rss_mb'] / max(o['max_rss_mb'], 1e-9)
+        flag = ' REGRESSION' if wall > threshold else ''
+        print(f"  {'/'.join(map(str, key(r))):45s} wall x{wall:.2f}  rss x{rss:.2f}{flag}")
+        if flag:
+            regressed.append(r)
+    return regressed
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the conversion scripts on synthetic COLMAP scenes.")
+    p.add_argument('--sizes', default='1000,10000', help='comma separated image counts')
+    p.add_argument('--formats', default='txt,bin')
+    p.add_argument('--schemes', default='whatsapp', help='comma separated subset of ' + ','.join(SCHEMES))
+    p.add_argument('--stages', default=','.join(STAGES), help='comma separated subset of ' + ','.join(STAGES))
+    p.add_argument('--workdir', default=None, help='where scenes are built (default: a temp dir, removed afterwards)')
+    p.add_argument('--cache', action='store_true', help='keep the model/image-size caches between stages')
+    p.add_argument('--repeat', type=int, default=1, help='runs per stage; the fastest is reported')
+    p.add_argument('--out', default='bench.json')
+    p.add_argument('--compare', help='earlier report to compare against')
+    p.add_argument('--threshold', type=float, default=1.2, help='wall time ratio counted as a regression')
+    args = p.parse_args(argv)
+
+    stages = [s for s in args.stages.split(',') if s]
+    schemes = [s for s in args.schemes.split(',') if s]
+    bad = [s for s in stages if s not in STAGES] + [s for s in schemes if s not in SCHEMES]
+    if bad:
+        p.error(f"unknown stages/schemes {bad}")
+    work = args.workdir or tempfile.mkdtemp(prefix='nerfprep-bench-')
+    report = {'version': 1, 'commit': git_commit(), 'python': platform.python_version(),
+              'platform': platform.platform(), 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+              'cache': args.cache, 'runs': []}
+    try:
+        for n in [int(s) for s in args.sizes.split(',') if s]:
+            for fmt in [s for s in args.formats.split(',') if s]:
+                for scheme in schemes:
+                    t = time.perf_counter()
+                    home, room, model_dir = make_scene(work, n, fmt, scheme)
+                    print(f"scene {scheme}/{fmt}/{n}: built in {time.perf_counter() - t:.1f}s")
+                    for stage in stages:
+                        wall, rss, code = min(run_stage(stage, home, room, model_dir, args.cache)
+                                              for _ in range(max(args.repeat, 1)))
+                        report['runs'].append({'scheme': scheme, 'format': fmt, 'images': n, 'stage': stage,
+                                               'wall_s': round(wall, 4), 'max_rss_mb': round(rss, 1),
+                                               'images_per_s': round(n / wall, 1) if wall else None,
+                                               'returncode': code})
+                        print(f"  {stage:20s} {wall:8.2f}s {rss:8.1f} MB {n / wall:10.0f} img/s"
+                              + ('' if code == 0 else f"  exit {code}, see {home}/{stage}.log"))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("WROTE", args.out)
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(report, json.load(f), args.threshold)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
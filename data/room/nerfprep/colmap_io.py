@@ -0,0 +1,445 @@
+"""
+Readers for COLMAP sparse models (binary and text) returning NumPy arrays.
+
+Binary files are memory-mapped and decoded with np.frombuffer; the fixed-size
+part of every variable-length record is gathered in one vectorized pass, so
+only the record offsets are walked in Python.
+
+ model = read_model('sparse/0')        # or 'sparse_txt', 'dense/sparse'
+ model['cameras'][9]['params']
+ model['images']['qvec']               # (N,4) float64
+ model['points3D']['xyz']              # (P,3) float32
+
+cameras:  {camera_id: {'model','width','height','params'}}
+images:   {'id','qvec','tvec','camera_id','name','num_points2D'}
+points3D: {'id','xyz','rgb','error','track_offsets','track'}  (track is CSR)
+frames:   {'id','rig_id','qvec','tvec','data_offsets','data'}  (data is CSR)
+rigs:     {rig_id: {'ref_sensor': (type,id), 'sensors': [(type,id,qvec,tvec)]}}
+
+write_model() writes cameras and images back in either format (without 2D
+points), which is what the synthetic benchmark scenes need.
+"""
+import mmap
+import os
+import struct
+import numpy as np
+
+# model_id -> (name, num_params), see colmap/src/colmap/sensor/models.h
+CAMERA_MODELS = {
+    0: ('SIMPLE_PINHOLE', 3),
+    1: ('PINHOLE', 4),
+    2: ('SIMPLE_RADIAL', 4),
+    3: ('RADIAL', 5),
+    4: ('OPENCV', 8),
+    5: ('OPENCV_FISHEYE', 8),
+    6: ('FULL_OPENCV', 12),
+    7: ('FOV', 5),
+    8: ('SIMPLE_RADIAL_FISHEYE', 4),
+    9: ('RADIAL_FISHEYE', 5),
+    10: ('THIN_PRISM_FISHEYE', 12),
+    11: ('RAD_TAN_THIN_PRISM_FISHEYE', 16),
+}
+CAMERA_MODEL_IDS = {name: mid for mid, (name, _) in CAMERA_MODELS.items()}
+
+SENSOR_TYPES = {-1: 'INVALID', 0: 'CAMERA', 1: 'IMU'}
+SENSOR_TYPE_IDS = {name: tid for tid, name in SENSOR_TYPES.items()}
+
+# fixed-size heads of the variable-length records
+IMAGE_HEAD = np.dtype([('id', '<u4'), ('qvec', '<f8', 4), ('tvec', '<f8', 3), ('camera_id', '<u4')])
+POINT3D_HEAD = np.dtype([('id', '<u8'), ('xyz', '<f8', 3), ('rgb', 'u1', 3), ('error', '<f8'), ('track_length', '<u8')])
+POINT2D = np.dtype([('xy', '<f8', 2), ('point3D_id', '<i8')])
+TRACK_ELEM = np.dtype([('image_id', '<u4'), ('point2D_idx', '<u4')])
+FRAME_HEAD = np.dtype([('id', '<u4'), ('rig_id', '<u4'), ('qvec', '<f8', 4), ('tvec', '<f8', 3), ('num_data_ids', '<u4')])
+FRAME_DATA = np.dtype([('sensor_type', '<i4'), ('sensor_id', '<u4'), ('data_id', '<u8')])
+
+
+def _map(path):
+    """Read-only buffer over a file; mmap for non-empty files."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _gather(buf, offsets, dtype):
+    """Decode one `dtype` record at each byte offset of `buf` in a single pass."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) == 0:
+        return np.zeros(0, dtype=dtype)
+    u8 = np.frombuffer(buf, dtype=np.uint8)
+    return u8[offsets[:, None] + np.arange(dtype.itemsize)].view(dtype).ravel()
+
+
+def _csr(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def read_cameras_bin(path):
+    buf = _map(path)
+    cams = {}
+    n, = struct.unpack_from('<Q', buf, 0)
+    off = 8
+    for _ in range(n):
+        cam_id, model_id, w, h = struct.unpack_from('<IiQQ', buf, off)
+        off += 24
+        model, num_params = CAMERA_MODELS[model_id]
+        params = np.frombuffer(buf, dtype='<f8', count=num_params, offset=off).copy()
+        off += 8 * num_params
+        cams[cam_id] = {'model': model, 'width': w, 'height': h, 'params': params}
+    return cams
+
+
+def read_images_bin(path, points2D=False):
+    """Read images.bin; with points2D=True also returns the 2D observations as CSR
+    ('points2D_offsets', 'points2D_xy', 'points2D_point3D_id')."""
+    buf = _map(path)
+    n, = struct.unpack_from('<Q', buf, 0) if len(buf) else (0,)
+    heads = np.empty(n, dtype=np.int64)
+    counts = np.empty(n, dtype=np.int64)
+    names = []
+    off = 8
+    for i in range(n):
+        heads[i] = off
+        end = buf.find(b'\0', off + IMAGE_HEAD.itemsize)
+        names.append(buf[off + IMAGE_HEAD.itemsize:end].decode('utf-8'))
+        counts[i], = struct.unpack_from('<Q', buf, end + 1)
+        off = end + 9 + POINT2D.itemsize * counts[i]
+    head = _gather(buf, heads, IMAGE_HEAD)
+    imgs = {
+        'id': head['id'].astype(np.int64),
+        'qvec': head['qvec'].copy(),
+        'tvec': head['tvec'].copy(),
+        'camera_id': head['camera_id'].astype(np.int64),
+        'name': names,
+        'num_points2D': counts,
+    }
+    if points2D:
+        starts = heads + IMAGE_HEAD.itemsize + np.array([len(s.encode('utf-8')) for s in names], dtype=np.int64) + 9
+        imgs['points2D_offsets'] = _csr(counts)
+        pts = np.concatenate([np.frombuffer(buf, dtype=POINT2D, count=c, offset=s) for s, c in zip(starts, counts)]) \
+            if n else np.zeros(0, dtype=POINT2D)
+        imgs['points2D_xy'] = pts['xy'].copy()
+        imgs['points2D_point3D_id'] = pts['point3D_id'].copy()
+    return imgs
+
+
+def read_points3D_bin(path):
+    buf = _map(path)
+    n, = struct.unpack_from('<Q', buf, 0) if len(buf) else (0,)
+    # the only sequential part: hop from record to record via the track length
+    unpack = struct.Struct('<Q').unpack_from
+    size, track_at, elem = POINT3D_HEAD.itemsize, POINT3D_HEAD.itemsize - 8, TRACK_ELEM.itemsize
+    heads = [0] * n
+    off = 8
+    for i in range(n):
+        heads[i] = off
+        off += size + elem * unpack(buf, off + track_at)[0]
+    heads = np.array(heads, dtype=np.int64)
+    head = _gather(buf, heads, POINT3D_HEAD)
+    lengths = head['track_length'].astype(np.int64)
+    offsets = _csr(lengths)
+    # byte offset of every track element: record start + head + 8 * position in track
+    pos = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1], lengths)
+    elem = np.repeat(heads + POINT3D_HEAD.itemsize, lengths) + TRACK_ELEM.itemsize * pos
+    track = _gather(buf, elem, TRACK_ELEM)
+    return {
+        'id': head['id'].astype(np.int64),
+        'xyz': head['xyz'].astype(np.float32),
+        'rgb': head['rgb'].copy(),
+        'error': head['error'].astype(np.float32),
+        'track_offsets': offsets,
+        'track': track,
+    }
+
+
+def read_frames_bin(path):
+    buf = _map(path)
+    n, = struct.unpack_from('<Q', buf, 0) if len(buf) else (0,)
+    heads = np.empty(n, dtype=np.int64)
+    off = 8
+    for i in range(n):
+        heads[i] = off
+        num, = struct.unpack_from('<I', buf, off + FRAME_HEAD.itemsize - 4)
+        off += FRAME_HEAD.itemsize + FRAME_DATA.itemsize * num
+    head = _gather(buf, heads, FRAME_HEAD)
+    lengths = head['num_data_ids'].astype(np.int64)
+    offsets = _csr(lengths)
+    pos = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1], lengths)
+    elem = np.repeat(heads + FRAME_HEAD.itemsize, lengths) + FRAME_DATA.itemsize * pos
+    return {
+        'id': head['id'].astype(np.int64),
+        'rig_id': head['rig_id'].astype(np.int64),
+        'qvec': head['qvec'].copy(),
+        'tvec': head['tvec'].copy(),
+        'data_offsets': offsets,
+        'data': _gather(buf, elem, FRAME_DATA),
+    }
+
+
+def read_rigs_bin(path):
+    buf = _map(path)
+    rigs = {}
+    n, = struct.unpack_from('<Q', buf, 0) if len(buf) else (0,)
+    off = 8
+    for _ in range(n):
+        rig_id, num_sensors = struct.unpack_from('<II', buf, off)
+        off += 8
+        ref = None
+        sensors = []
+        if num_sensors:
+            ref = struct.unpack_from('<iI', buf, off)
+            off += 8
+        for _ in range(num_sensors - 1 if num_sensors else 0):
+            stype, sid, has_pose = struct.unpack_from('<iIB', buf, off)
+            off += 9
+            qvec = tvec = None
+            if has_pose:
+                pose = np.frombuffer(buf, dtype='<f8', count=7, offset=off)
+                qvec, tvec = pose[:4].copy(), pose[4:].copy()
+                off += 56
+            sensors.append((stype, sid, qvec, tvec))
+        rigs[rig_id] = {'ref_sensor': ref, 'sensors': sensors}
+    return rigs
+
+
+def _data_lines(path):
+    with open(path, 'r') as f:
+        return [l for l in f.read().splitlines() if l.strip() and not l.startswith('#')]
+
+
+def read_cameras_txt(path):
+    cams = {}
+    for line in _data_lines(path):
+        parts = line.split()
+        cams[int(parts[0])] = {'model': parts[1], 'width': int(parts[2]), 'height': int(parts[3]),
+                               'params': np.array(parts[4:], dtype=np.float64)}
+    return cams
+
+
+def read_images_txt(path):
+    # two lines per image; the second (POINTS2D) may be empty, so keep blank lines here
+    with open(path, 'r') as f:
+        lines = [l for l in f.read().splitlines() if not l.startswith('#')]
+    while lines and not lines[-1].strip() and len(lines) % 2:
+        lines.pop()
+    heads = [l.split(None, 9) for l in lines[0::2]]
+    points = lines[1::2] + [''] * (len(heads) - len(lines[1::2]))
+    nums = np.array([h[1:8] for h in heads], dtype=np.float64).reshape(-1, 7)
+    return {
+        'id': np.array([h[0] for h in heads], dtype=np.int64),
+        'qvec': nums[:, :4].copy(),
+        'tvec': nums[:, 4:].copy(),
+        'camera_id': np.array([h[8] for h in heads], dtype=np.int64),
+        'name': [h[9] for h in heads],
+        'num_points2D': np.array([len(l.split()) // 3 for l in points], dtype=np.int64),
+    }
+
+
+def _sensor_type(token):
+    return SENSOR_TYPE_IDS[token] if token in SENSOR_TYPE_IDS else int(token)
+
+
+def read_frames_txt(path):
+    """frames.txt into the same columns as read_frames_bin."""
+    rows = [l.split() for l in _data_lines(path)]
+    head = np.array([r[:9] for r in rows], dtype=np.float64).reshape(-1, 9)
+    lengths = np.array([int(r[9]) for r in rows], dtype=np.int64)
+    triples = [r[10 + 3 * k:13 + 3 * k] for r, n in zip(rows, lengths.tolist()) for k in range(n)]
+    data = np.zeros(len(triples), dtype=FRAME_DATA)
+    if triples:
+        data['sensor_type'] = [_sensor_type(t[0]) for t in triples]
+        data['sensor_id'] = [int(t[1]) for t in triples]
+        data['data_id'] = [int(t[2]) for t in triples]
+    return {
+        'id': head[:, 0].astype(np.int64),
+        'rig_id': head[:, 1].astype(np.int64),
+        'qvec': head[:, 2:6].copy(),
+        'tvec': head[:, 6:9].copy(),
+        'data_offsets': _csr(lengths),
+        'data': data,
+    }
+
+
+def read_rigs_txt(path):
+    """rigs.txt into the same dict as read_rigs_bin."""
+    rigs = {}
+    for line in _data_lines(path):
+        p = line.split()
+        rig_id, num_sensors = int(p[0]), int(p[1])
+        ref, sensors, k = None, [], 2
+        if num_sensors:
+            ref = (_sensor_type(p[2]), int(p[3]))
+            k = 4
+        for _ in range(num_sensors - 1 if num_sensors else 0):
+            stype, sid, has_pose = _sensor_type(p[k]), int(p[k + 1]), int(p[k + 2])
+            k += 3
+            qvec = tvec = None
+            if has_pose:
+                pose = np.array(p[k:k + 7], dtype=np.float64)
+                qvec, tvec = pose[:4], pose[4:]
+                k += 7
+            sensors.append((stype, sid, qvec, tvec))
+        rigs[rig_id] = {'ref_sensor': ref, 'sensors': sensors}
+    return rigs
+
+
+def _parse_points3D_txt(buf):
+    """Columns of a block of complete points3D.txt data lines (no comments)."""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    space = b <= 32
+    starts = np.flatnonzero(~space & np.r_[True, space[:-1]])
+    # tokens per line from where each newline falls among the token starts
+    bounds = np.searchsorted(starts, np.r_[np.flatnonzero(b == 10), len(b)])
+    counts = np.diff(np.r_[0, bounds])
+    counts = counts[counts > 0]
+    vals = np.fromstring(buf.decode('ascii'), dtype=np.float64, sep=' ') if len(starts) else np.zeros(0)
+    if len(vals) != len(starts) or np.any(counts < 8) or np.any((counts - 8) % 2):
+        raise ValueError("malformed points3D.txt line")
+    first = _csr(counts)[:-1]
+    head = vals[first[:, None] + np.arange(8)]
+    lengths = (counts - 8) // 2
+    pos = np.arange(lengths.sum(), dtype=np.int64) - np.repeat(_csr(lengths)[:-1], lengths)
+    at = np.repeat(first + 8, lengths) + 2 * pos
+    track = np.empty(len(at), dtype=TRACK_ELEM)
+    track['image_id'] = vals[at]
+    track['point2D_idx'] = vals[at + 1]
+    return head, lengths, track
+
+
+def read_points3D_txt(path, block=1 << 26):
+    """points3D.txt into the same columns as read_points3D_bin.
+
+    The file is read in blocks of whole lines; in each block token starts are
+    found on the raw bytes, counted per line to get the track lengths, and all
+    numbers are parsed by one np.fromstring call, so there is no Python object
+    per point."""
+    heads, lengths, tracks = [], [], []
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(block)
+            buf = tail + chunk
+            cut = len(buf) if not chunk else buf.rfind(b'\n') + 1
+            buf, tail = buf[:cut], buf[cut:]
+            if b'#' in buf:
+                buf = b'\n'.join(l for l in buf.split(b'\n') if not l.lstrip().startswith(b'#'))
+            if buf.strip():
+                h, l, t = _parse_points3D_txt(buf)
+                heads.append(h)
+                lengths.append(l)
+                tracks.append(t)
+            if not chunk:
+                break
+    head = np.concatenate(heads) if heads else np.zeros((0, 8))
+    lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+    return {
+        'id': head[:, 0].astype(np.int64),
+        'xyz': head[:, 1:4].astype(np.float32),
+        'rgb': head[:, 4:7].astype(np.uint8),
+        'error': head[:, 7].astype(np.float32),
+        'track_offsets': _csr(lengths),
+        'track': np.concatenate(tracks) if tracks else np.zeros(0, dtype=TRACK_ELEM),
+    }
+
+
+def detect_format(path):
+    """'bin' or 'txt' depending on which cameras/images pair exists in `path`, else None."""
+    for ext in ('bin', 'txt'):
+        if all(os.path.isfile(os.path.join(path, f'{n}.{ext}')) for n in ('cameras', 'images')):
+            return ext
+    return None
+
+
+READERS = {
+    'bin': {'cameras': read_cameras_bin, 'images': read_images_bin, 'frames': read_frames_bin,
+            'rigs': read_rigs_bin, 'points3D': read_points3D_bin},
+    'txt': {'cameras': read_cameras_txt, 'images': read_images_txt, 'frames': read_frames_txt,
+            'rigs': read_rigs_txt, 'points3D': read_points3D_txt},
+}
+# read whenever the file exists; points3D only on request
+OPTIONAL = ('frames', 'rigs')
+
+
+def read_model(path, ext=None, points3D=False, cache=False):
+    """Read a COLMAP model directory (sparse/0, dense/sparse or sparse_txt).
+
+    Binary files are preferred when both formats are present. points3D is only
+    loaded on request since converters do not need it. cache=True goes through
+    the parsed-model cache (see model_cache)."""
+    ext = ext or detect_format(path)
+    if ext is None:
+        raise FileNotFoundError(f"no cameras/images .bin or .txt in {path}")
+    readers = READERS[ext]
+    names = ['cameras', 'images'] + [n for n in OPTIONAL if n in readers]
+    if points3D and 'points3D' in readers:
+        names.append('points3D')
+    names = [n for n in names if n in ('cameras', 'images') or os.path.isfile(os.path.join(path, f'{n}.{ext}'))]
+    if cache:
+        from .model_cache import read_components
+        model = read_components(path, ext, names)
+    else:
+        model = {n: readers[n](os.path.join(path, f'{n}.{ext}')) for n in names}
+    model['format'] = ext
+    model['path'] = path
+    return model
+
+
+def find_model_dir(root, candidates=('sparse/0', 'sparse_txt')):
+    """First directory under `root` holding a readable model, or None."""
+    for c in candidates:
+        path = os.path.join(root, c)
+        if detect_format(path):
+            return path
+    return None
+
+
+def write_cameras_txt(path, cams):
+    with open(path, 'w') as f:
+        f.write("# Camera list with one line of data per camera:\n"
+                "#   CAMERA_ID, MODEL, WIDTH, HEIGHT, PARAMS[]\n"
+                f"# Number of cameras: {len(cams)}\n")
+        for cid, c in cams.items():
+            f.write(' '.join([str(cid), c['model'], str(c['width']), str(c['height'])] + [repr(float(p)) for p in c['params']]) + '\n')
+
+
+def write_cameras_bin(path, cams):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(cams)))
+        for cid, c in cams.items():
+            f.write(struct.pack('<IiQQ', cid, CAMERA_MODEL_IDS[c['model']], c['width'], c['height']))
+            f.write(np.asarray(c['params'], dtype='<f8').tobytes())
+
+
+def write_images_txt(path, imgs):
+    """images.txt with an empty POINTS2D line per image."""
+    ids, cams, names = imgs['id'].tolist(), imgs['camera_id'].tolist(), imgs['name']
+    nums = np.hstack([imgs['qvec'], imgs['tvec']]).tolist()
+    with open(path, 'w') as f:
+        f.write("# Image list with two lines of data per image:\n"
+                "#   IMAGE_ID, QW, QX, QY, QZ, TX, TY, TZ, CAMERA_ID, NAME\n"
+                "#   POINTS2D[] as (X, Y, POINT3D_ID)\n"
+                f"# Number of images: {len(ids)}, mean observations per image: 0\n")
+        f.writelines(f"{i} {' '.join(map(repr, v))} {c} {n}\n\n" for i, v, c, n in zip(ids, nums, cams, names))
+
+
+def write_images_bin(path, imgs):
+    """images.bin with no 2D points per image."""
+    n = len(imgs['name'])
+    head = np.zeros(n, dtype=IMAGE_HEAD)
+    head['id'], head['qvec'], head['tvec'], head['camera_id'] = imgs['id'], imgs['qvec'], imgs['tvec'], imgs['camera_id']
+    raw = head.tobytes()
+    size, tail = IMAGE_HEAD.itemsize, b'\0' + struct.pack('<Q', 0)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', n))
+        f.write(b''.join(raw[i * size:(i + 1) * size] + name.encode('utf-8') + tail
+                         for i, name in enumerate(imgs['name'])))
+
+
+def write_model(path, model, ext='bin'):
+    """Write model['cameras'] and model['images'] to `path` as .bin or .txt."""
+    os.makedirs(path, exist_ok=True)
+    writers = {'bin': (write_cameras_bin, write_images_bin), 'txt': (write_cameras_txt, write_images_txt)}[ext]
+    writers[0](os.path.join(path, f'cameras.{ext}'), model['cameras'])
+    writers[1](os.path.join(path, f'images.{ext}'), model['images'])
@@ -0,0 +1,61 @@
+"""
+COLMAP model -> transforms.json with poses only (the 'poses' stage of pipeline.py).
+
+ python -m nerfprep convert --root ~/nerf_project/data/room
+ python -m nerfprep convert --colmap_dir sparse/0 --images_dir nerfstudio/images --out nerfstudio/transforms.json --exact
+
+convert_colmap_fuzzy_to_transforms.py and convert_colmap_txt_to_transforms.py
+(exact names) are thin wrappers around main().
+"""
+import argparse
+import os
+from .paths import add_scene_args, resolve_scene_args
+from .pipeline import new_context, stage_poses
+
+
+def convert(scene, images_dir, out, fuzzy=True, c2w=False, opengl=False, sidecar=False):
+    """Match `scene` images to files in `images_dir` and write `out`.
+
+    Returns (transforms dict, [(COLMAP name, file)], [unmatched names])."""
+    from .transforms_io import write_transforms
+    ctx = new_context(scene, base_dir=os.path.dirname(os.path.abspath(out)), images_dir=images_dir)
+    data = {}
+    stage_poses(data, ctx, c2w=c2w, opengl=opengl, fuzzy=fuzzy)
+    write_transforms(out, data, sidecar=sidecar)
+    matches = [(scene.names[scene.by_frame[fr['file_path']]], os.path.basename(fr['file_path'])) for fr in data['frames']]
+    return data, matches, ctx['unmatched']
+
+
+def main(argv=None, fuzzy=True):
+    p = argparse.ArgumentParser(description="Write a poses-only transforms.json from a COLMAP model.")
+    add_scene_args(p)
+    p.add_argument('--exact', action='store_true', default=not fuzzy, help='no fuzzy filename matching')
+    p.add_argument('--c2w', action='store_true', help='write camera-to-world matrices')
+    p.add_argument('--opengl', action='store_true', help='flip camera axes to the OpenGL convention')
+    p.add_argument('--sidecar', action='store_true', help='also write poses to <out>.frames.npy')
+    args = resolve_scene_args(p.parse_args(argv))
+
+    from .colmap_io import detect_format
+    from .scene import SceneModel
+    if detect_format(args.colmap_dir) is None:
+        print("ERROR: Missing cameras/images .bin or .txt in", args.colmap_dir); return 1
+    scene = SceneModel.load(args.colmap_dir)
+    if not scene.cameras or not len(scene):
+        print("ERROR: no cameras or no images parsed"); return 1
+
+    data, matches, unmatched = convert(scene, args.images_dir, args.out, not args.exact, args.c2w, args.opengl, args.sidecar)
+    print(f"WROTE {args.out} with {len(data['frames'])} frames. {len(unmatched)} unmatched.")
+    if matches:
+        print("\nSAMPLE matches (COLMAP_name -> matched_file):")
+        for a, b in matches[:30]:
+            print("  ", a, "->", b)
+    if unmatched:
+        print("\nUNMATCHED names (first 30):")
+        for u in unmatched[:30]:
+            print("  ", u)
+        print("\nIf many names are unmatched, consider renaming the files in nerfstudio/images or copying files to names that match COLMAP image names.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
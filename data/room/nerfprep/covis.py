@@ -0,0 +1,178 @@
+"""
+Co-visibility view graph from points3D tracks.
+
+ python -m nerfprep covis --model sparse/0                        # edges and connected components
+ python -m nerfprep covis --model sparse/0 --image "IMG_0001.jpg" --top 10
+ python -m nerfprep covis --model sparse/0 --min_shared 15 --out covis.npz
+
+g = build_covisibility(model) is a symmetric image x image matrix in CSR form:
+row i (an index into model['images']) lists in g['indices'][g['indptr'][i]:g['indptr'][i + 1]]
+the images sharing at least one 3D point with it, and g['counts'] the number
+of shared points. Pairs are generated per track length with one fancy index
+per length (tracks of equal length form an (m, L) array), and counted with
+sorts over packed int64 pair keys, in chunks so long tracks cannot blow up memory.
+"""
+import argparse
+import numpy as np
+
+PAIR_CHUNK = 1 << 24
+
+
+def _track_images(pts, image_ids):
+    """Per-observation (point index, image index) with repeated images in a track removed."""
+    order = np.argsort(image_ids, kind='stable')
+    ids = image_ids[order]
+    obs_img = pts['track']['image_id'].astype(np.int64)
+    pos = np.clip(np.searchsorted(ids, obs_img), 0, max(len(ids) - 1, 0))
+    known = (ids[pos] == obs_img) if len(ids) else np.zeros(len(obs_img), bool)
+    img = order[pos]
+    point = np.repeat(np.arange(len(pts['track_offsets']) - 1), np.diff(pts['track_offsets']))
+    key = np.unique(point[known] * len(image_ids) + img[known])
+    return key // max(len(image_ids), 1), key % max(len(image_ids), 1)
+
+
+def _pair_counts(point, img, n):
+    """(packed pair keys a * n + b with a < b, shared point counts)."""
+    lengths = np.bincount(point)
+    starts = np.r_[0, np.cumsum(lengths)[:-1]]
+    keys, counts = [], []
+
+    def flush(buf):
+        if buf:
+            k, c = np.unique(np.concatenate(buf), return_counts=True)
+            keys.append(k)
+            counts.append(c)
+            buf.clear()
+
+    buf, size = [], 0
+    for L in np.unique(lengths[lengths > 1]).tolist():
+        pts_L = np.flatnonzero(lengths == L)
+        iu, ju = np.triu_indices(L, 1)
+        step = max(1, PAIR_CHUNK // len(iu))
+        for lo in range(0, len(pts_L), step):
+            rows = img[starts[pts_L[lo:lo + step], None] + np.arange(L)]      # (m, L), ascending per row
+            buf.append((rows[:, iu] * n + rows[:, ju]).ravel())
+            size += len(buf[-1])
+            if size >= PAIR_CHUNK:
+                flush(buf)
+                size = 0
+    flush(buf)
+    if not keys:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    if len(keys) == 1:
+        return keys[0], counts[0]
+    k = np.concatenate(keys)
+    c = np.concatenate(counts)
+    uk, inv = np.unique(k, return_inverse=True)
+    return uk, np.bincount(inv, weights=c).astype(np.int64)
+
+
+def build_covisibility(model, min_shared=1):
+    """Symmetric CSR co-visibility graph of a model read with points3D=True."""
+    images = model['images']
+    image_ids = np.asarray(images['id'], dtype=np.int64)
+    n = len(image_ids)
+    point, img = _track_images(model['points3D'], image_ids)
+    keys, counts = _pair_counts(point, img, n)
+    keep = counts >= min_shared
+    keys, counts = keys[keep], counts[keep]
+    a, b = keys // max(n, 1), keys % max(n, 1)
+    rows = np.concatenate([a, b])
+    cols = np.concatenate([b, a])
+    order = np.argsort(rows * n + cols, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return {'image_ids': image_ids, 'names': list(images['name']), 'indptr': indptr,
+            'indices': cols[order].astype(np.int32), 'counts': np.concatenate([counts, counts])[order].astype(np.int32)}
+
+
+def neighbors(g, i, k=None):
+    """(image indices, shared counts) of image `i`, most shared first, at most k."""
+    lo, hi = g['indptr'][i], g['indptr'][i + 1]
+    idx, cnt = g['indices'][lo:hi], g['counts'][lo:hi]
+    order = np.lexsort((idx, -cnt))
+    if k is not None:
+        order = order[:k]
+    return idx[order], cnt[order]
+
+
+def top_k(g, k):
+    """(n, k) neighbor indices (-1 padded) and counts for every image at once."""
+    n = len(g['indptr']) - 1
+    rows = np.repeat(np.arange(n), np.diff(g['indptr']))
+    order = np.lexsort((g['indices'], -g['counts'].astype(np.int64), rows))
+    r = rows[order]
+    rank = np.arange(len(order)) - g['indptr'][r]
+    sel = rank < k
+    out_idx = np.full((n, k), -1, dtype=np.int32)
+    out_cnt = np.zeros((n, k), dtype=np.int32)
+    out_idx[r[sel], rank[sel]] = g['indices'][order[sel]]
+    out_cnt[r[sel], rank[sel]] = g['counts'][order[sel]]
+    return out_idx, out_cnt
+
+
+def components(g, min_shared=1):
+    """Component label per image (0 = largest) and the component sizes, over
+    edges with at least `min_shared` points. Min-label propagation with
+    pointer jumping, whole-array passes only."""
+    n = len(g['indptr']) - 1
+    rows = np.repeat(np.arange(n), np.diff(g['indptr']))
+    keep = g['counts'] >= min_shared
+    rows, cols = rows[keep], g['indices'][keep].astype(np.int64)
+    labels = np.arange(n)
+    while True:
+        new = labels.copy()
+        np.minimum.at(new, rows, labels[cols])
+        np.minimum.at(new, labels, new)             # hook the old root to the smaller label
+        while True:
+            jumped = new[new]
+            if np.array_equal(jumped, new):
+                break
+            new = jumped
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    roots, inv, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(roots), dtype=np.int64)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(roots))
+    return rank[inv], np.sort(sizes)[::-1]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Co-visibility graph of a COLMAP model from its points3D tracks.")
+    p.add_argument('--model', required=True, help='model directory (sparse/0 or sparse_txt)')
+    p.add_argument('--min_shared', type=int, default=1, help='shared points for an edge to count')
+    p.add_argument('--image', help='print the neighbors of this image (COLMAP name)')
+    p.add_argument('--top', type=int, default=10)
+    p.add_argument('--out', help='save indptr/indices/counts/image_ids as .npz')
+    args = p.parse_args(argv)
+
+    from .colmap_io import read_model
+    from .trace import span
+    model = read_model(args.model, points3D=True, cache=True)
+    if 'points3D' not in model:
+        print("ERROR: no points3D in", args.model); return 1
+    with span('covisibility', items=len(model['points3D']['track'])):
+        g = build_covisibility(model, args.min_shared)
+    labels, sizes = components(g)
+    n = len(g['image_ids'])
+    print(f"{n} images, {len(g['indices']) // 2} co-visible pairs, {len(sizes)} components"
+          + (f" (sizes {sizes[:10].tolist()})" if len(sizes) > 1 else ''))
+    isolated = [g['names'][i] for i in np.flatnonzero(np.diff(g['indptr']) == 0)]
+    if isolated:
+        print(f"{len(isolated)} images share no points:", isolated[:10])
+    if args.image:
+        if args.image not in g['names']:
+            print("ERROR: no image named", args.image); return 1
+        idx, cnt = neighbors(g, g['names'].index(args.image), args.top)
+        for j, c in zip(idx.tolist(), cnt.tolist()):
+            print(f"  {c:8d}  {g['names'][j]}")
+    if args.out:
+        np.savez(args.out, indptr=g['indptr'], indices=g['indices'], counts=g['counts'],
+                 image_ids=g['image_ids'], labels=labels)
+        print("WROTE", args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""
+Content-addressed dedup of the image trees of a scene.
+
+ python -m nerfprep dedup --root ~/nerf_project/data/room --dry_run
+ python -m nerfprep dedup --root ... --link_names     # also COLMAP-name views, matched by content
+
+Every image under <root>/images and <root>/nerfstudio/images* (plus --dirs)
+is hashed (blake2b, 1 MB reads, a thread pool; hashes are cached by path,
+size and mtime in <root>/.nerfprep_store/hashes.json). Each distinct content
+gets one object in <root>/.nerfprep_store/objects/, and every view file is
+replaced by a hardlink to its object, or a reflink where hardlinks are not
+possible. A view that allows neither (another filesystem, FAT) is left as it
+is, since a copy would only add bytes. Symlinks become hardlinks too, so a
+view survives its target being moved. The byte counts of the report include
+the objects themselves.
+
+--link_names makes the COLMAP image names exist in nerfstudio/images. A name
+is matched by content first: a file with that basename anywhere in the
+hashed trees (e.g. the images/ COLMAP ran on) gives the hash, and the
+nerfstudio/images file with the same hash is its frame, whatever it is
+called. Names without a hashed file fall back to filename matching.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from .paths import DEFAULT_ROOT, ROOT_ENV, scene_root
+from .trace import span, traced
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+STORE_DIR = '.nerfprep_store'
+CHUNK = 1 << 20
+FICLONE = 0x40049409    # linux/fs.h _IOW(0x94, 9, int)
+
+
+def hash_file(path, chunk=CHUNK):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+@traced('hash_files', items=lambda r: len(r[0]))
+def hash_files(paths, cache_path=None, workers=8):
+    """({path: hex digest}, [paths that could not be read]); cached like probe_sizes()."""
+    from .imagesize import load_cache, save_cache
+    cache = load_cache(cache_path) if cache_path else {}
+    hashes, todo, keys = {}, [], {}
+    for p in dict.fromkeys(paths):
+        key = os.path.realpath(p)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        keys[p] = (key, st.st_size, st.st_mtime_ns)
+        hit = cache.get(key)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            hashes[p] = hit[2]
+        else:
+            todo.append(p)
+
+    def one(p):
+        try:
+            return hash_file(p)
+        except OSError:
+            return None
+
+    if todo:
+        # hashlib releases the GIL on large buffers, so threads scale
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for p, digest in zip(todo, pool.map(one, todo)):
+                if digest:
+                    hashes[p] = digest
+                    key, size, mtime = keys[p]
+                    cache[key] = [size, mtime, digest]
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            save_cache(cache_path, cache)
+    return hashes, [p for p in dict.fromkeys(paths) if p not in hashes]
+
+
+def view_dirs(root):
+    """images/ and nerfstudio/images* under a scene root that exist."""
+    dirs = [os.path.join(root, 'images')]
+    ns = os.path.join(root, 'nerfstudio')
+    if os.path.isdir(ns):
+        with os.scandir(ns) as it:
+            dirs += sorted(e.path for e in it if e.name.startswith('images') and e.is_dir())
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def list_images(dirs):
+    """Image files (and symlinks to files) directly in `dirs`."""
+    out = []
+    for d in dirs:
+        with os.scandir(d) as it:
+            out += sorted(e.path for e in it if e.name.lower().endswith(IMAGE_EXTS) and e.is_file())
+    return out
+
+
+def reflink(src, dst):
+    """Copy-on-write clone of src at dst (btrfs, XFS, ...); OSError where unsupported."""
+    if fcntl is None:
+        raise OSError("reflink not supported on this platform")
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def place(src, dst, copy=True):
+    """Make dst the content of src: hardlink, else reflink, else copy.
+
+    dst is replaced atomically; returns 'link', 'reflink' or 'copy'. With
+    copy=False, returns None and leaves dst alone when only a copy would do."""
+    tmp = dst + '.dedup.tmp'
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+        how = 'link'
+    except OSError:
+        try:
+            reflink(src, tmp)
+            how = 'reflink'
+        except OSError:
+            if not copy:
+                return None
+            shutil.copy2(src, tmp)
+            how = 'copy'
+    os.replace(tmp, dst)
+    return how
+
+
+def object_path(store, digest, path):
+    return os.path.join(store, 'objects', digest[:2], digest + os.path.splitext(path)[1].lower())
+
+
+def store_objects(store):
+    """Paths of the content objects in `store`."""
+    out = []
+    for d, _, files in os.walk(os.path.join(store, 'objects')):
+        out += [os.path.join(d, f) for f in files]
+    return out
+
+
+def _unique_bytes(paths):
+    seen = {}
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        seen[(st.st_dev, st.st_ino)] = st.st_size
+    return sum(seen.values())
+
+
+def dedup(hashes, store, dry_run=False):
+    """Point every path of {path: digest} at its content object.
+
+    Returns {'files', 'unique', 'before', 'after', 'saved', 'link', 'reflink', 'same', 'skipped'};
+    byte counts are distinct inodes of the views and the store objects
+    (reflinks counted as shared). 'skipped' views could only have been copied."""
+    paths = sorted(hashes)
+    sizes = {p: os.path.getsize(p) for p in paths}
+    objects = store_objects(store)
+    report = {'files': len(paths), 'unique': len(set(hashes.values())), 'before': _unique_bytes(paths + objects),
+              'link': 0, 'reflink': 0, 'same': 0, 'skipped': 0}
+    if dry_run:
+        # every view linked to one object per content; objects of other contents stay
+        stored = {os.path.splitext(os.path.basename(o))[0]: os.path.getsize(o) for o in objects}
+        report['after'] = sum(dict(stored, **{hashes[p]: sizes[p] for p in paths}).values())
+        report['saved'] = report['before'] - report['after']
+        return report
+    reflinked = 0
+    with span('dedup', items=len(paths)):
+        for p in paths:
+            obj = object_path(store, hashes[p], p)
+            if not os.path.exists(obj):
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                if place(os.path.realpath(p), obj, copy=False) is None:
+                    report['skipped'] += 1
+                    continue
+            if not os.path.islink(p) and os.path.samefile(p, obj):
+                report['same'] += 1
+                continue
+            how = place(obj, p, copy=False)
+            if how is None:
+                report['skipped'] += 1
+                continue
+            report[how] += 1
+            if how == 'reflink':
+                reflinked += sizes[p]
+    report['after'] = _unique_bytes(paths + store_objects(store)) - reflinked
+    report['saved'] = report['before'] - report['after']
+    return report
+
+
+def content_matches(names, hashes, images_dir):
+    """For each COLMAP name, the file in images_dir with the same content, or None.
+
+    A name's content comes from a hashed file with that basename (outside
+    images_dir first); each file backs at most one name."""
+    images_dir = os.path.abspath(images_dir)
+    by_name, by_digest = {}, {}
+    for p, digest in sorted(hashes.items(), key=lambda kv: os.path.dirname(os.path.abspath(kv[0])) == images_dir):
+        if os.path.dirname(os.path.abspath(p)) == images_dir:
+            by_digest.setdefault(digest, []).append(os.path.basename(p))
+        by_name.setdefault(os.path.basename(p), digest)
+    out = []
+    for name in names:
+        files = by_digest.get(by_name.get(os.path.basename(name)), [])
+        out.append(files.pop(0) if files else None)
+    return out
+
+
+def link_names(scene, hashes, images_dir, fuzzy=True):
+    """COLMAP-name views in images_dir, hardlinked to the content match (or filename match).
+
+    Returns (created, by content, unmatched names)."""
+    from .matching import match_names
+    names = list(scene.names)
+    found = content_matches(names, hashes, images_dir)
+    used = set(f for f in found if f)
+    rest = [i for i, f in enumerate(found) if f is None]
+    by_content = [f is not None for f in found]
+    available = [f for f in sorted(os.listdir(images_dir)) if f not in used]
+    for i, f in zip(rest, match_names([names[i] for i in rest], available, fuzzy=fuzzy)):
+        found[i] = f
+    created, unmatched = 0, []
+    for name, f, content in zip(names, found, by_content):
+        dst = os.path.join(images_dir, name)
+        if not f:
+            if not os.path.exists(dst):
+                unmatched.append(name)
+            continue
+        if f == name:
+            continue
+        src = os.path.join(images_dir, f)
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            continue
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        print(f"LINK {name} <-- {f}" + (" (content)" if content else ''))
+        place(os.path.realpath(src), dst)
+        created += 1
+    return created, len(names) - len(rest), unmatched
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Hash the image trees of a scene and replace duplicates with hardlinks/reflinks.")
+    p.add_argument('--root', help=f'scene root (default ${ROOT_ENV} or {DEFAULT_ROOT})')
+    p.add_argument('--dirs', nargs='*', default=[], help='more image directories to include')
+    p.add_argument('--workers', type=int, default=8)
+    p.add_argument('--dry_run', action='store_true', help='hash and report, change nothing')
+    p.add_argument('--link_names', action='store_true', help='create COLMAP-name views in nerfstudio/images')
+    p.add_argument('--exact', action='store_true', help='no fuzzy filename fallback for --link_names')
+    args = p.parse_args(argv)
+
+    root = scene_root(args.root)
+    store = os.path.join(root, STORE_DIR)
+    dirs = view_dirs(root) + [d for d in args.dirs if os.path.isdir(d)]
+    paths = list_images(dirs)
+    hashes, failed = hash_files(paths, os.path.join(store, 'hashes.json'), args.workers)
+    print(f"Hashed {len(hashes)} files in {len(dirs)} directories" + (f", {len(failed)} unreadable" if failed else ''))
+    report = dedup(hashes, store, args.dry_run)
+    mb = 1 << 20
+    print(f"{report['files']} files, {report['unique']} distinct: {report['before'] / mb:.1f} MB -> "
+          f"{report['after'] / mb:.1f} MB, {report['saved'] / mb:.1f} MB "
+          + ("can be saved" if args.dry_run else f"saved ({report['link']} hardlinked, {report['reflink']} reflinked, "
+                                               f"{report['same']} already shared, {report['skipped']} left alone: "
+                                               f"no hardlink or reflink possible)"))
+    if args.link_names and not args.dry_run:
+        from .scene import SceneModel
+        scene = SceneModel.from_root(root)
+        if scene is None:
+            print("ERROR: missing COLMAP model (sparse/0 or sparse_txt) in", root); return 1
+        images_dir = os.path.join(root, 'nerfstudio', 'images')
+        created, by_content, unmatched = link_names(scene, hashes, images_dir, fuzzy=not args.exact)
+        print(f"Created {created} name views, {by_content} of {len(scene)} names matched by content")
+        for name in unmatched:
+            print("NO MATCH for:", name)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
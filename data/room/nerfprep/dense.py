@@ -0,0 +1,216 @@
+"""
+COLMAP dense depth and normal maps (dense/stereo/{depth,normal}_maps/*.bin).
+
+ python -m nerfprep dense --workspace dense --transforms nerfstudio/transforms.json
+ python -m nerfprep dense --workspace dense --stats_only
+
+A map file is an ASCII header 'width&height&channels&' followed by float32
+values, column-major per channel. read_map() memory-maps it and returns an
+(h, w) or (h, w, c) view without copying or reading the file. Depth 0 marks
+pixels without an estimate.
+
+The export writes, for each frame of transforms.json, its depth map resized
+to the frame's w/h as float32 .npy under <base>/depths/ and sets
+depth_file_path, with depth_unit_scale_factor 1 (COLMAP depth is in scene
+units). Frames are processed one at a time per worker, so only `workers` maps
+are resident at any point; near/far statistics go to depths/stats.json.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MAP_TYPES = ('geometric', 'photometric')
+
+
+def map_path(workspace, name, kind='depth', map_type='geometric'):
+    return os.path.join(workspace, 'stereo', f'{kind}_maps', f'{name}.{map_type}.bin')
+
+
+def find_map(workspace, name, kind='depth', map_type='geometric'):
+    """Path of an image's map, falling back to the other map type, or None."""
+    for t in (map_type,) + tuple(t for t in MAP_TYPES if t != map_type):
+        path = map_path(workspace, name, kind, t)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_header(path):
+    """(width, height, channels, data offset) of a map file."""
+    with open(path, 'rb') as f:
+        head = f.read(64)
+    parts = head.split(b'&', 3)
+    if len(parts) < 4:
+        raise ValueError(f"{path}: not a COLMAP dense map")
+    w, h, c = (int(v) for v in parts[:3])
+    return w, h, c, len(parts[0]) + len(parts[1]) + len(parts[2]) + 3
+
+
+def read_map(path):
+    """Memory-mapped (h, w) depth or (h, w, c) normal map."""
+    w, h, c, offset = read_header(path)
+    # column-major (w, h, c) on disk == row-major (c, h, w)
+    arr = np.memmap(path, dtype='<f4', mode='r', offset=offset, shape=(c, h, w)).transpose(1, 2, 0)
+    return arr[:, :, 0] if c == 1 else arr
+
+
+def downsample(m, factor):
+    """Block mean over factor x factor pixels, ignoring zeros (no estimate).
+    Output is floor(w / factor) x floor(h / factor), as for images_2/4/8.
+    Normal maps (3 channels) are renormalized."""
+    if factor == 1:
+        return np.asarray(m, dtype=np.float32)
+    h, w = m.shape[0] // factor, m.shape[1] // factor
+    blocks = np.asarray(m[:h * factor, :w * factor], dtype=np.float32).reshape(h, factor, w, factor, -1)
+    if blocks.shape[-1] == 1:
+        valid = blocks != 0
+        total = blocks.sum(axis=(1, 3))
+        count = valid.sum(axis=(1, 3))
+        return np.divide(total, count, out=np.zeros_like(total), where=count > 0)[..., 0]
+    out = blocks.sum(axis=(1, 3))
+    norm = np.linalg.norm(out, axis=-1, keepdims=True)
+    return np.divide(out, norm, out=np.zeros_like(out), where=norm > 0)
+
+
+def resize(m, w, h):
+    """Map resized to w x h: block mean for integer factors, else nearest sample."""
+    H, W = m.shape[:2]
+    if (W, H) == (w, h):
+        return np.asarray(m, dtype=np.float32)
+    factor = W // w
+    if factor >= 1 and W // factor == w and H // factor == h:
+        return downsample(m, factor)
+    rows = np.minimum(((np.arange(h) + 0.5) * H / h).astype(np.intp), H - 1)
+    cols = np.minimum(((np.arange(w) + 0.5) * W / w).astype(np.intp), W - 1)
+    return np.asarray(m[rows[:, None], cols[None, :]], dtype=np.float32)
+
+
+def depth_stats(depth, percentiles=(1, 99)):
+    """Valid fraction, near/far percentiles, median, min and max of the estimated pixels."""
+    d = np.asarray(depth).ravel()
+    d = d[d > 0]
+    if not len(d):
+        return {'valid': 0.0, 'near': None, 'far': None, 'median': None, 'min': None, 'max': None}
+    near, median, far = np.percentile(d, (percentiles[0], 50, percentiles[1]))
+    return {'valid': round(len(d) / np.asarray(depth).size, 4), 'near': float(near), 'far': float(far),
+            'median': float(median), 'min': float(d.min()), 'max': float(d.max())}
+
+
+def frame_names(data, scene):
+    """{file_path: COLMAP image name} for the frames of `data`."""
+    from .matching import match_names
+    paths = [fr['file_path'] for fr in data.get('frames', [])]
+    by_file = {os.path.basename(p): p for p in paths}
+    out = {}
+    for p in paths:
+        i = scene.image_index(p)
+        if i is not None:
+            out[p] = scene.names[i]
+    known = set(out.values())
+    rest = [n for n in scene.names if n not in known]
+    for name, found in zip(rest, match_names(rest, [f for f, p in by_file.items() if p not in out])):
+        if found:
+            out[by_file[found]] = name
+    return out
+
+
+def _export_one(args):
+    src, dst, w, h = args
+    try:
+        depth = read_map(src)
+        if w and h:
+            depth = resize(depth, w, h)
+        else:
+            depth = np.asarray(depth, dtype=np.float32)
+        np.save(dst + '.tmp.npy', depth)
+        os.replace(dst + '.tmp.npy', dst)
+        return depth_stats(depth), None
+    except (OSError, ValueError) as e:
+        return None, repr(e)
+
+
+def export_depths(data, base_dir, workspace, scene, out_subdir='depths', map_type='geometric', factor=1, workers=4):
+    """Write a depth .npy per frame and set depth_file_path; returns ({file_path: stats}, [missing/failed])."""
+    from .trace import span
+    out_dir = os.path.join(base_dir, out_subdir)
+    os.makedirs(out_dir, exist_ok=True)
+    names = frame_names(data, scene)
+    jobs, frames, failed = [], [], []
+    for fr in data.get('frames', []):
+        src = find_map(workspace, names.get(fr['file_path'], os.path.basename(fr['file_path'])), 'depth', map_type)
+        if src is None:
+            failed.append(fr['file_path'])
+            continue
+        w, h = fr.get('w'), fr.get('h')
+        if factor > 1:
+            W, H = read_header(src)[:2]
+            w, h = W // factor, H // factor
+        dst = os.path.join(out_dir, os.path.splitext(os.path.basename(fr['file_path']))[0] + '.npy')
+        jobs.append((src, dst, w, h))
+        frames.append(fr)
+    stats = {}
+    with span('export_depths', items=len(jobs)), ThreadPoolExecutor(max_workers=workers) as pool:
+        for fr, job, (st, err) in zip(frames, jobs, pool.map(_export_one, jobs)):
+            if err:
+                failed.append(fr['file_path'])
+                continue
+            fr['depth_file_path'] = f"{out_subdir}/{os.path.basename(job[1])}"
+            stats[fr['file_path']] = st
+    if stats:
+        data['depth_unit_scale_factor'] = 1.0
+    return stats, failed
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Read COLMAP dense depth maps: per-frame stats and depth_file_path export.")
+    p.add_argument('--workspace', default='dense', help='COLMAP dense workspace (with stereo/depth_maps)')
+    p.add_argument('--colmap_dir', help='model for name matching (default <workspace>/sparse)')
+    p.add_argument('--transforms', help='transforms.json to add depth_file_path to')
+    p.add_argument('--type', default='geometric', choices=MAP_TYPES)
+    p.add_argument('--factor', type=int, default=1, help='downsample the maps by this factor instead of matching w/h')
+    p.add_argument('--out_subdir', default='depths')
+    p.add_argument('--workers', type=int, default=4, help='maps processed (and resident) at once')
+    p.add_argument('--stats_only', action='store_true', help='print near/far statistics of every depth map')
+    args = p.parse_args(argv)
+
+    maps_dir = os.path.join(args.workspace, 'stereo', 'depth_maps')
+    if not os.path.isdir(maps_dir):
+        print("ERROR: no depth maps in", maps_dir, "(run patch_match_stereo first)"); return 1
+    if args.stats_only or not args.transforms:
+        suffix = f'.{args.type}.bin'
+        with os.scandir(maps_dir) as it:
+            files = sorted(e.path for e in it if e.name.endswith(suffix))
+        for path in files:
+            st = depth_stats(read_map(path))
+            near = f"{st['near']:.3f}" if st['near'] is not None else '-'
+            far = f"{st['far']:.3f}" if st['far'] is not None else '-'
+            print(f"{os.path.basename(path)[:-len(suffix)]:50s} valid {st['valid']:.3f} near {near} far {far}")
+        print(len(files), "depth maps")
+        return 0
+
+    from .scene import SceneModel
+    from .transforms_io import write_transforms
+    scene = SceneModel.load(args.colmap_dir or os.path.join(args.workspace, 'sparse'))
+    with open(args.transforms) as f:
+        data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.transforms))
+    stats, failed = export_depths(data, base_dir, args.workspace, scene, args.out_subdir, args.type,
+                                  args.factor, args.workers)
+    stats_path = os.path.join(base_dir, args.out_subdir, 'stats.json')
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f, indent=1)
+    write_transforms(args.transforms, data)
+    near = [s['near'] for s in stats.values() if s['near'] is not None]
+    far = [s['far'] for s in stats.values() if s['far'] is not None]
+    print(f"Exported {len(stats)} depth maps, {len(failed)} frames without one. Wrote {args.transforms}, {stats_path}")
+    if near:
+        print(f"Scene near {min(near):.3f} far {max(far):.3f}")
+    if failed:
+        print("No depth map for:", failed[:20])
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
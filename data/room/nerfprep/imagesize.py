@@ -0,0 +1,144 @@
+"""
+Header-only image dimension probing with a persistent sidecar cache.
+
+JPEG and PNG sizes are read from the first bytes of the file (SOFn segment /
+IHDR chunk) together with the EXIF orientation, so nothing is decoded. Files
+are probed across a thread pool and results are cached by path, size and
+mtime, which makes reruns on an unchanged tree close to free. Anything that
+cannot be probed is returned in `failed` rather than replaced by a default.
+
+ sizes, failed = probe_sizes(paths, cache_path='nerfstudio/.imagesize_cache.json')
+ w, h, orientation = sizes[path]
+"""
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from .trace import traced
+
+CACHE_NAME = '.imagesize_cache.json'
+PNG_SIG = b'\x89PNG\r\n\x1a\n'
+# SOF markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) share the range but do not
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _exif_orientation(seg):
+    """Orientation tag (0x0112) from an APP1 payload, or 1."""
+    if not seg.startswith(b'Exif\0\0') or len(seg) < 14:
+        return 1
+    tiff = seg[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None:
+        return 1
+    ifd, = struct.unpack_from(endian + 'I', tiff, 4)
+    if ifd + 2 > len(tiff):
+        return 1
+    n, = struct.unpack_from(endian + 'H', tiff, ifd)
+    for k in range(n):
+        at = ifd + 2 + 12 * k
+        if at + 12 > len(tiff):
+            break
+        tag, typ, count = struct.unpack_from(endian + 'HHI', tiff, at)
+        if tag == 0x0112:
+            return struct.unpack_from(endian + 'H', tiff, at + 8)[0]
+    return 1
+
+
+def _jpeg_size(f):
+    orientation = 1
+    while True:
+        b = f.read(1)
+        while b and b != b'\xff':
+            b = f.read(1)
+        while b == b'\xff':
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue    # standalone markers have no length
+        if marker == 0xD9:
+            return None
+        head = f.read(2)
+        if len(head) < 2:
+            return None
+        length, = struct.unpack('>H', head)
+        if marker in SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            h, w = struct.unpack('>HH', data[1:5])
+            return w, h, orientation
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def probe(path):
+    """(width, height, exif orientation) of a JPEG or PNG from its header, or None."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(24)
+            if head.startswith(PNG_SIG) and head[12:16] == b'IHDR':
+                w, h = struct.unpack('>II', head[16:24])
+                return w, h, 1
+            if head.startswith(b'\xff\xd8'):
+                f.seek(2)
+                return _jpeg_size(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def display_size(w, h, orientation):
+    """Size after applying the EXIF orientation (5-8 are rotated by 90 degrees)."""
+    return (h, w) if orientation in (5, 6, 7, 8) else (w, h)
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    tmp = cache_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(tmp, cache_path)
+
+
+@traced('probe_sizes', items=lambda r: len(r[0]))
+def probe_sizes(paths, cache_path=None, workers=16):
+    """Probe many images at once.
+
+    Returns ({path: (w, h, orientation)}, [paths that could not be probed]).
+    Entries are cached under their absolute path with (size, mtime_ns)."""
+    cache = load_cache(cache_path) if cache_path else {}
+    sizes, todo, keys = {}, [], {}
+    for p in dict.fromkeys(paths):
+        key = os.path.abspath(p)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue    # missing files end up in `failed`
+        keys[p] = (key, st.st_size, st.st_mtime_ns)
+        hit = cache.get(key)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            sizes[p] = tuple(hit[2:])
+        else:
+            todo.append(p)
+    if todo:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for p, res in zip(todo, pool.map(probe, todo)):
+                if res:
+                    sizes[p] = res
+                    key, size, mtime = keys[p]
+                    cache[key] = [size, mtime, *res]
+        if cache_path:
+            save_cache(cache_path, cache)
+    failed = [p for p in dict.fromkeys(paths) if p not in sizes]
+    return sizes, failed
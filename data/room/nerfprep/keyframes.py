@@ -0,0 +1,155 @@
+"""
+Keyframe selection: drop near-duplicate frames from a transforms.json.
+
+ python -m nerfprep keyframes --transforms nerfstudio/transforms.json --out nerfstudio/transforms_keys.json --target 300
+ python -m nerfprep keyframes --transforms ... --out ... --min_dist 0.05 --min_angle 5
+
+Each frame is reduced to its camera center and viewing axis and hashed into a
+grid: `min_dist` cells in space times `min_angle` cells on the sphere of
+directions. The first frame (in file order) of every occupied cell is kept,
+so two frames are merged only when both position and direction fall in the
+same cell (a frame just across a cell border from a kept one survives).
+--target searches the cell size, with space and angle scaled together, for
+the coarsest grid keeping at least `target` frames. When that keeps more,
+the surplus is dropped by coverage, not file order: the first frame of every
+cell of the next coarser grid stays, and the remaining places go farthest
+point first to the frames farthest from what is kept in their cell. One grid
+pass is a sort of N packed keys, so the search stays well under a second for
+100k frames.
+
+Matrices are read in the convention transforms.json records (see
+poses.pose_convention; world-to-camera when absent, as the converters write
+by default); --c2w / --w2c override it.
+"""
+import argparse
+import json
+import math
+import numpy as np
+from .poses import camera_centers, pose_convention
+
+
+def _pack(keys):
+    """One int64 per row of an (N,k) integer key array, or the rows as a void view."""
+    keys = keys - keys.min(axis=0)
+    spans = keys.max(axis=0) + 1
+    if np.prod(spans.astype(float)) < 2 ** 62:
+        packed = np.zeros(len(keys), dtype=np.int64)
+        for j in range(keys.shape[1]):
+            packed = packed * int(spans[j]) + keys[:, j]
+        return packed
+    keys = np.ascontiguousarray(keys)
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+
+def _cells(centers, dirs, min_dist, min_angle):
+    """Packed position x direction cell of every frame, or None when both sizes are 0."""
+    parts = []
+    if min_dist > 0:
+        parts.append(np.floor(centers / min_dist))
+    if min_angle > 0:
+        parts.append(np.floor(dirs / (2 * math.sin(min_angle / 2))))
+    if not parts:
+        return None
+    return _pack(np.concatenate(parts, axis=1).astype(np.int64))
+
+
+def grid_select(centers, dirs, min_dist, min_angle):
+    """Indices (ascending) of the first frame in every occupied position x direction cell.
+
+    `min_angle` is in radians; directions are binned on chords of that length."""
+    if not len(centers):
+        return np.arange(0)
+    keys = _cells(centers, dirs, min_dist, min_angle)
+    if keys is None:
+        return np.arange(len(centers))
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def _thin(centers, dirs, sel, target, min_dist, min_angle):
+    """`target` of the frames `sel`: the first of every cell of the coarser grid
+    (min_dist, min_angle), then, farthest point first, the frames farthest in
+    pose space from the frames kept in their cell."""
+    chord = 2 * math.sin(min_angle / 2)
+    f = np.concatenate([centers[sel] / min_dist] + ([dirs[sel] / chord] if chord > 0 else []), axis=1)
+    _, first, cell = np.unique(_cells(centers[sel], dirs[sel], min_dist, min_angle),
+                               return_index=True, return_inverse=True)
+    cell = cell.ravel()
+    if len(first) >= target:
+        return np.sort(sel[np.sort(first)[:target]])
+    members = np.split(np.argsort(cell, kind='stable'), np.cumsum(np.bincount(cell))[:-1])
+    dist = np.linalg.norm(f - f[first[cell]], axis=1)
+    keep = list(first)
+    for _ in range(target - len(first)):
+        i = int(np.argmax(dist))
+        keep.append(i)
+        m = members[cell[i]]
+        dist[m] = np.minimum(dist[m], np.linalg.norm(f[m] - f[i], axis=1))
+    return np.sort(sel[keep])
+
+
+def select_count(centers, dirs, target, angle_per_extent=math.pi, iters=40):
+    """`target` frames spread over the pose space (see module docstring)."""
+    n = len(centers)
+    if target >= n:
+        return np.arange(n)
+    extent = float(np.ptp(centers, axis=0).max()) if n else 0.0
+    extent = extent or 1.0
+    # cells anchored at the lowest corner, so at s = 2 every frame shares one position cell
+    centers, dirs = centers - centers.min(axis=0), dirs + 1.0
+    # cell = s * extent, angle = s * angle_per_extent; count falls as s grows
+    lo, hi = 1e-9, 2.0
+    best = np.arange(n)
+    for _ in range(iters):
+        s = math.sqrt(lo * hi)
+        sel = grid_select(centers, dirs, s * extent, min(s * angle_per_extent, math.pi))
+        if len(sel) >= target:
+            best, lo = sel, s
+        else:
+            hi = s
+        if len(best) == target or hi / lo < 1.001:
+            break
+    if len(best) > target:
+        best = _thin(centers, dirs, best, target, hi * extent, min(hi * angle_per_extent, math.pi))
+    return best
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Write a transforms.json with near-duplicate frames removed.")
+    p.add_argument('--transforms', required=True)
+    p.add_argument('--out', required=True)
+    p.add_argument('--target', type=int, help='number of frames to keep')
+    p.add_argument('--min_dist', type=float, default=0.0, help='merge frames closer than this (scene units) ...')
+    p.add_argument('--min_angle', type=float, default=0.0, help='... and viewing directions closer than this (degrees)')
+    g = p.add_mutually_exclusive_group()
+    g.add_argument('--c2w', dest='c2w', action='store_const', const=True, help='transform_matrix is camera-to-world')
+    g.add_argument('--w2c', dest='c2w', action='store_const', const=False, help='transform_matrix is world-to-camera')
+    args = p.parse_args(argv)
+    if not args.target and args.min_dist <= 0 and args.min_angle <= 0:
+        p.error("give --target or --min_dist/--min_angle")
+
+    from .trace import span
+    from .transforms_io import frame_poses, write_transforms
+    with span('read_transforms'), open(args.transforms) as f:
+        data = json.load(f)
+    frames = data.get('frames', [])
+    poses = frame_poses(data, args.transforms)
+    ok = np.flatnonzero(np.isfinite(poses).all(axis=(1, 2)))
+    c2w, _ = pose_convention(data, c2w=args.c2w)
+    centers, dirs = camera_centers(poses[ok], c2w=c2w)
+    with span('select_keyframes', items=len(ok)):
+        if args.target:
+            sel = select_count(centers, dirs, args.target)
+        else:
+            sel = grid_select(centers, dirs, args.min_dist, math.radians(args.min_angle))
+    keep = ok[sel]
+    out = {k: v for k, v in data.items() if k != 'frames'}
+    write_transforms(args.out, out, frames=[frames[i] for i in keep.tolist()])
+    print(f"Kept {len(keep)} of {len(frames)} frames"
+          + (f" ({len(frames) - len(ok)} without a valid pose dropped)" if len(ok) < len(frames) else '')
+          + f". Wrote {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""
+Make the COLMAP image names exist in nerfstudio/images, as symlinks to the matched files.
+
+ python -m nerfprep link [--root R]            # make_symlinks_for_colmap_names.py
+ python -m nerfprep link-convert [--root R]    # aggressive_symlink_and_convert.py
+
+link-convert hardlinks (or copies) when a symlink cannot be made (FAT, permissions) and then
+runs the fuzzy converter in the same process, on the model already parsed for
+linking.
+"""
+import argparse
+import json
+import os
+from .dedup import place
+from .paths import DEFAULT_ROOT, ROOT_ENV, scene_root
+from .trace import span
+
+
+def link_names(names, matches, images_dir, copy=False):
+    """Create images_dir/<name> -> matched file for each name not on disk yet.
+
+    Returns (created, unmatched names)."""
+    created, unmatched = 0, []
+    with span('link', items=len(names)):
+        for name, found in zip(names, matches):
+            dst = os.path.join(images_dir, name)
+            if os.path.exists(dst):
+                continue
+            if not found:
+                unmatched.append(name)
+                continue
+            src = os.path.join(images_dir, found)
+            try:
+                try:
+                    os.symlink(src, dst)
+                except OSError:
+                    if not copy:
+                        raise
+                    place(src, dst)     # hardlink/reflink before falling back to a copy
+                created += 1
+                print("LINK", name, "<--", found)
+            except OSError as e:
+                print("ERR creating link for", name, e)
+                unmatched.append(name)
+    return created, unmatched
+
+
+def _load(argv, description):
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument('--root', help=f'scene root (default ${ROOT_ENV} or {DEFAULT_ROOT})')
+    root = scene_root(p.parse_args(argv).root)
+    images_dir = os.path.join(root, 'nerfstudio', 'images')
+    from .scene import SceneModel
+    scene = SceneModel.from_root(root)
+    if scene is None:
+        print("ERROR: missing COLMAP model (sparse/0 or sparse_txt) in", root)
+    elif not os.path.isdir(images_dir):
+        print("ERROR: missing images dir", images_dir)
+        scene = None
+    return scene, images_dir
+
+
+def main(argv=None):
+    scene, images_dir = _load(argv, "Symlink COLMAP image names to the matching files in nerfstudio/images.")
+    if scene is None:
+        return 1
+    from .matching import match_names
+    available = sorted(os.listdir(images_dir))
+    print("Found", len(scene), "COLMAP names and", len(available), "available files")
+    # each file backs at most one COLMAP name
+    created, unmatched = link_names(scene.names, match_names(scene.names, available), images_dir)
+    for name in unmatched:
+        print("NO MATCH for:", name)
+    print("Done.")
+    return 0
+
+
+def convert_main(argv=None):
+    scene, images_dir = _load(argv, "Link COLMAP names in nerfstudio/images, then write transforms.json.")
+    if scene is None:
+        return 1
+    from .convert import convert
+    from .matching import match_names
+    created, unmatched = link_names(scene.names, match_names(scene.names, sorted(os.listdir(images_dir))),
+                                    images_dir, copy=True)
+    print("Created", created, "symlinks/copies. Unmatched:", len(unmatched))
+    if unmatched:
+        print("Sample unmatched:", unmatched[:10])
+
+    out = os.path.join(os.path.dirname(images_dir), 'transforms.json')
+    print("\nRunning fuzzy converter to build transforms.json...")
+    with span('convert'):
+        data, _, missing = convert(scene, images_dir, out)
+    print(f"WROTE {out} with {len(data['frames'])} frames. {len(missing)} unmatched.")
+
+    print("\n----- transforms.json head -----")
+    with open(out) as f:
+        for i, line in enumerate(f):
+            if i > 80:
+                break
+            print(line.rstrip())
+    with open(out) as f:
+        print("\nframes:", len(json.load(f).get('frames', [])))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+"""
+Match COLMAP image names to files present in an images directory.
+
+ chosen = match_names(colmap_names, os.listdir(images_dir))   # list of file or None
+
+NameMatcher builds its indexes once (exact, case-folded, normalized, numeric
+token and a character trigram index) and resolves a whole batch of names.
+Candidates are ranked by tier, then score, then name/file order, and assigned
+greedily so the result is deterministic and one-to-one.
+
+Tiers, best first:
+ 0 exact       name == file
+ 1 casefold    lowercase equality
+ 2 prefixed    'frame_' + name (ns-process-data naming)
+ 3 normalized  lowercase stems with punctuation removed are equal
+ 4 numeric     last number in the stem is equal, when unique among files
+ 5 substring   name stem contained in the file name
+ 6 ngram       trigram similarity of the stems (replaces difflib)
+
+The substring tier is only checked against a name's trigram candidates (its
+rarest grams, each in at most max_posting files), so a name contained in a
+file through common grams alone can miss it and fall through to the ngram
+tier. The trigram pass expands at most max_pairs (name, file) pairs at a time.
+"""
+import os
+import re
+from collections import defaultdict
+import numpy as np
+from .trace import traced
+
+TIERS = ('exact', 'casefold', 'prefixed', 'normalized', 'numeric', 'substring', 'ngram')
+_NUM = re.compile(r'\d+')
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def norm(name):
+    return _NON_ALNUM.sub('', stem(name).lower())
+
+
+def number(name):
+    nums = _NUM.findall(stem(name))
+    return int(nums[-1]) if nums else None
+
+
+def trigrams(s):
+    s = f' {s} '
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _rank(sorted_keys):
+    """Position of each element within its run of equal keys."""
+    n = len(sorted_keys)
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+
+class NameMatcher:
+    def __init__(self, available, ngram_candidates=8, rare_grams=6, max_posting=4096, chunk=8192, max_pairs=1 << 20):
+        self.files = sorted(available)
+        self.exact = {f: i for i, f in enumerate(self.files)}
+        self.casefold, self.normalized, self.numeric = {}, defaultdict(list), defaultdict(list)
+        self.keys = [norm(f) for f in self.files]
+        for i, (f, key) in enumerate(zip(self.files, self.keys)):
+            self.casefold.setdefault(f.lower(), i)
+            self.normalized[key].append(i)
+            n = number(f)
+            if n is not None:
+                self.numeric[n].append(i)
+        self.ngram_candidates = ngram_candidates
+        self.rare_grams = rare_grams
+        self.max_posting = max_posting
+        self.chunk = chunk
+        self.max_pairs = max_pairs
+        # trigram index, built lazily since most batches resolve before it is needed
+        self._vocab = None
+
+    def _ngram_index(self):
+        """gram -> id, per-file gram count, postings (CSR by gram) and sorted file*G+gram keys."""
+        if self._vocab is None:
+            vocab = {}
+            f_idx, g_idx = [], []
+            for i, key in enumerate(self.keys):
+                for t in trigrams(key):
+                    f_idx.append(i)
+                    g_idx.append(vocab.setdefault(t, len(vocab)))
+            f_idx = np.array(f_idx, dtype=np.int64)
+            g_idx = np.array(g_idx, dtype=np.int64)
+            G = max(len(vocab), 1)
+            order = np.argsort(g_idx, kind='stable')
+            self._post_files = f_idx[order]
+            self._post_offsets = np.zeros(G + 1, dtype=np.int64)
+            np.cumsum(np.bincount(g_idx, minlength=G), out=self._post_offsets[1:])
+            self._file_len = np.bincount(f_idx, minlength=len(self.files))
+            self._file_keys = np.sort(f_idx * G + g_idx)
+            self._G = G
+            self._vocab = vocab
+        return self._vocab
+
+    def _ngram_chunk(self, keys, free=None, cutoff=0.0, substring=True):
+        """(name idx, file idx, dice score) for the top trigram candidates of each norm()ed name,
+        among the files where the bool mask `free` is set when given.
+
+        Only candidates that can reach `cutoff`, or contain the name when `substring`,
+        are searched for."""
+        vocab = self._ngram_index()
+        post_off = self._post_offsets
+        n_idx, g_idx, n_len = [], [], np.zeros(len(keys), dtype=np.int64)
+        for k, key in enumerate(keys):
+            grams = trigrams(key)
+            n_len[k] = len(grams)
+            for t in grams:
+                gid = vocab.get(t)
+                if gid is not None:
+                    n_idx.append(k)
+                    g_idx.append(gid)
+        if not n_idx:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+        n_idx = np.array(n_idx, dtype=np.int64)
+        g_idx = np.array(g_idx, dtype=np.int64)
+        # keep each name's rarest grams; very common grams ('fra', 'ame', ...) only add noise and cost
+        df = post_off[g_idx + 1] - post_off[g_idx]
+        order = np.lexsort((df, n_idx))
+        rank = _rank(n_idx[order])
+        # a file sharing `need` of a name's m indexed grams holds one of its m - need + 1 rarest:
+        # dice >= cutoff needs 2 * shared >= cutoff * (n_len + shared), a substring all but the 2 edge grams
+        need = np.ceil(cutoff * n_len / (2.0 - cutoff)).astype(np.int64) if cutoff > 0 else np.ones_like(n_len)
+        if substring:
+            need = np.minimum(need, n_len - 2)
+        budget = np.minimum(np.bincount(n_idx, minlength=len(keys)) - np.maximum(need, 1) + 1, self.rare_grams)
+        keep = order[(rank < budget[n_idx[order]]) & (df[order] <= self.max_posting)]
+        # expand at most ~max_pairs (name, gram, file) rows at a time, cut at name boundaries
+        kn = n_idx[keep]
+        ends = np.cumsum(df[keep])
+        cuts = np.searchsorted(ends, np.arange(self.max_pairs, ends[-1] if len(ends) else 0, self.max_pairs))
+        cuts = np.unique(np.searchsorted(kn, kn[np.minimum(cuts, len(kn) - 1)]))
+        parts = [self._ngram_pairs(n_idx, g_idx, n_len, keep[lo:hi], free)
+                 for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(keep)]) if hi > lo]
+        if not parts:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+        return tuple(np.concatenate(x) for x in zip(*parts))
+
+    def _ngram_pairs(self, n_idx, g_idx, n_len, keep, free):
+        G, post_off = self._G, self._post_offsets
+        # expand every kept (name, gram) into the files of its posting list
+        starts = post_off[g_idx[keep]]
+        lens = post_off[g_idx[keep] + 1] - starts
+        total = lens.sum()
+        pos = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+        files = self._post_files[np.repeat(starts, lens) + pos]
+        pn = np.repeat(n_idx[keep], lens)
+        if free is not None:
+            pn, files = pn[free[files]], files[free[files]]
+        pair, hits = np.unique(pn * len(self.files) + files, return_counts=True)
+        cn, cf = np.divmod(pair, len(self.files))
+        # top-k candidates per name by rare-gram hits; pairs are sorted by (name, file) so a
+        # stable sort on (name, -hits) keeps file order for ties
+        order = np.argsort(cn * (self.rare_grams + 1) + (self.rare_grams - hits), kind='stable')
+        cn, cf = cn[order], cf[order]
+        rank = _rank(cn)
+        top = rank < self.ngram_candidates
+        cn, cf = cn[top], cf[top]
+        # exact shared-gram counts for the candidates: look every name gram up in the file's gram set
+        nstart = np.searchsorted(n_idx, cn)
+        nlen = np.searchsorted(n_idx, cn, side='right') - nstart
+        c_rep = np.repeat(np.arange(len(cn)), nlen)
+        g_all = g_idx[np.repeat(nstart, nlen) + np.arange(nlen.sum()) - np.repeat(np.cumsum(nlen) - nlen, nlen)]
+        keys = cf[c_rep] * G + g_all
+        order = np.argsort(keys)    # sorted queries keep the binary search cache-friendly
+        at = np.minimum(np.searchsorted(self._file_keys, keys[order]), len(self._file_keys) - 1)
+        shared = np.bincount(c_rep[order], weights=self._file_keys[at] == keys[order], minlength=len(cn))
+        return cn, cf, 2.0 * shared / (n_len[cn] + self._file_len[cf])
+
+    def _ngram(self, keys, free=None, cutoff=0.0, substring=True):
+        """{name idx: [(file idx, score)]} over norm()ed names, processed in bounded-memory chunks."""
+        out = defaultdict(list)
+        for lo in range(0, len(keys), self.chunk):
+            cn, cf, score = self._ngram_chunk(keys[lo:lo + self.chunk], free, cutoff, substring)
+            for n, f, sc in zip((cn + lo).tolist(), cf.tolist(), score.tolist()):
+                out[n].append((f, sc))
+        return out
+
+    def _cheap(self, name, key, fuzzy):
+        """(tier, score, file id) candidates from the first index tier that has any."""
+        i = self.exact.get(name)
+        if i is not None:
+            return [(0, 1.0, i)]
+        if fuzzy:
+            i = self.casefold.get(name.lower())
+            if i is not None:
+                return [(1, 1.0, i)]
+        i = self.exact.get('frame_' + name)
+        if i is not None:
+            return [(2, 1.0, i)]
+        if fuzzy:
+            ids = self.normalized.get(key)
+            if ids:
+                return [(3, 1.0, i) for i in ids]
+            n = number(name)
+            ids = self.numeric.get(n) if n is not None else None
+            if ids and len(ids) == 1:
+                return [(4, 1.0, ids[0])]
+        return []
+
+    @traced('match_names', items=lambda r: sum(f is not None for f in r[0]))
+    def match(self, names, fuzzy=True, one_to_one=True, cutoff=0.4):
+        """Resolve all `names`; returns (list of file or None, list of tier name or None)."""
+        names = list(names)
+        keys = [norm(n) for n in names]
+        edges = []
+        rest = []
+        for n_idx, (name, key) in enumerate(zip(names, keys)):
+            cand = self._cheap(name, key, fuzzy)
+            if cand:
+                edges += [(tier, -score, n_idx, f_idx) for tier, score, f_idx in cand]
+            else:
+                rest.append(n_idx)
+        similar = self._ngram([keys[i] for i in rest], cutoff=cutoff if fuzzy else 1.0) if rest else {}
+        for k, n_idx in enumerate(rest):
+            name, s = names[n_idx], stem(names[n_idx])
+            sub = [(5, 1.0, f) for f, _ in similar.get(k, ()) if s in self.files[f] or name in self.files[f]]
+            if sub or not fuzzy:
+                edges += [(tier, -score, n_idx, f) for tier, score, f in sub]
+            else:
+                edges += [(6, -score, n_idx, f) for f, score in similar.get(k, ()) if score >= cutoff]
+        edges.sort()
+        chosen = [None] * len(names)
+        tiers = [None] * len(names)
+        used = set()
+        for tier, _, n_idx, f_idx in edges:
+            if chosen[n_idx] is not None or (one_to_one and f_idx in used):
+                continue
+            chosen[n_idx] = f_idx
+            tiers[n_idx] = tier
+            used.add(f_idx)
+        if fuzzy and one_to_one:
+            # names that lost every candidate to a better match: retry similarity against the free files
+            had = {n_idx for _, _, n_idx, _ in edges}
+            lost = [i for i in sorted(had) if chosen[i] is None]
+            free = np.ones(len(self.files), bool)
+            free[list(used)] = False
+            similar = self._ngram([keys[i] for i in lost], free, cutoff, substring=False) if lost and free.any() else {}
+            retry = sorted((-score, n_idx, f) for k, n_idx in enumerate(lost)
+                           for f, score in similar.get(k, ()) if score >= cutoff and f not in used)
+            for _, n_idx, f in retry:
+                if chosen[n_idx] is None and f not in used:
+                    chosen[n_idx], tiers[n_idx] = f, 6
+                    used.add(f)
+        files = [None if c is None else self.files[c] for c in chosen]
+        return files, [None if t is None else TIERS[t] for t in tiers]
+
+
+def match_names(names, available, fuzzy=True, one_to_one=True):
+    """Resolve each name to a file in `available`; fuzzy=False only accepts exact,
+    'frame_' prefixed and substring matches."""
+    return NameMatcher(available).match(names, fuzzy=fuzzy, one_to_one=one_to_one)[0]
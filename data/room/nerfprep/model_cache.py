@@ -0,0 +1,180 @@
+"""
+On-disk cache of parsed COLMAP models.
+
+ model = read_model('sparse_txt', cache=True)     # SceneModel.load does this by default
+
+Every model file (cameras, images, frames, rigs, points3D) is cached on its
+own in the user cache directory, $XDG_CACHE_HOME/nerfprep/models/<hash of the
+model path>/ (~/.cache when XDG_CACHE_HOME is unset), so the model directory
+itself is never written to: arrays as .npy files loaded with mmap_mode='r',
+name lists as newline separated text, cameras and rigs inline in
+manifest.json. An entry is valid while its source file keeps the same size and
+mtime; when only the mtime moved (touch, copy, re-export of the same model) the
+content hash decides and the entry is kept if the bytes are unchanged.
+
+Set NERFPREP_MODEL_CACHE=0 to bypass the cache, or NERFPREP_MODEL_CACHE=inplace
+to keep it in <model>/.nerfprep_cache/ instead (travels with the model). An
+unwritable cache directory just falls back to parsing.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from .colmap_io import READERS
+
+CACHE_DIR = '.nerfprep_cache'      # in-place cache, NERFPREP_MODEL_CACHE=inplace
+CACHE_ENV = 'NERFPREP_MODEL_CACHE'
+MANIFEST = 'manifest.json'
+VERSION = 1
+# small components kept inline in the manifest
+INLINE = ('cameras', 'rigs')
+
+
+def user_cache_dir(path):
+    """$XDG_CACHE_HOME/nerfprep/models/<hash of the real model path>."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    key = hashlib.blake2b(os.path.realpath(path).encode(), digest_size=8).hexdigest()
+    return os.path.join(base, 'nerfprep', 'models', key)
+
+
+def cache_dir(path):
+    """Cache directory of model `path` for the current NERFPREP_MODEL_CACHE, None when off."""
+    mode = os.environ.get(CACHE_ENV, '1')
+    if mode == '0':
+        return None
+    return os.path.join(path, CACHE_DIR) if mode == 'inplace' else user_cache_dir(path)
+
+
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': VERSION, 'components': {}}
+    if manifest.get('version') != VERSION:
+        return {'version': VERSION, 'components': {}}
+    return manifest
+
+
+def save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _encode_inline(name, value):
+    if name == 'cameras':
+        return [[cid, c['model'], c['width'], c['height'], c['params'].tolist()] for cid, c in value.items()]
+    return [[rid, r['ref_sensor'], [[t, i, None if q is None else q.tolist(), None if v is None else v.tolist()]
+                                    for t, i, q, v in r['sensors']]] for rid, r in value.items()]
+
+
+def _decode_inline(name, value):
+    if name == 'cameras':
+        return {cid: {'model': m, 'width': w, 'height': h, 'params': np.array(p, dtype=np.float64)}
+                for cid, m, w, h, p in value}
+    return {rid: {'ref_sensor': None if ref is None else tuple(ref),
+                  'sensors': [(t, i, None if q is None else np.array(q), None if v is None else np.array(v))
+                              for t, i, q, v in sensors]}
+            for rid, ref, sensors in value}
+
+
+def _store(cache_dir, name, value):
+    """Write one parsed component; returns its manifest entry (minus the source stamp)."""
+    if name in INLINE:
+        return {'inline': _encode_inline(name, value)}
+    arrays, lists = [], []
+    for key, v in value.items():
+        path = os.path.join(cache_dir, f'{name}.{key}')
+        if isinstance(v, list):
+            with open(path + '.txt.tmp', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(v))
+            os.replace(path + '.txt.tmp', path + '.txt')
+            lists.append(key)
+        else:
+            with open(path + '.npy.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(v))
+            os.replace(path + '.npy.tmp', path + '.npy')
+            arrays.append(key)
+    return {'arrays': arrays, 'lists': lists}
+
+
+def _load(cache_dir, name, entry):
+    if 'inline' in entry:
+        return _decode_inline(name, entry['inline'])
+    out = {}
+    for key in entry['arrays']:
+        out[key] = np.load(os.path.join(cache_dir, f'{name}.{key}.npy'), mmap_mode='r')
+    for key in entry['lists']:
+        with open(os.path.join(cache_dir, f'{name}.{key}.txt'), encoding='utf-8') as f:
+            text = f.read()
+        out[key] = text.split('\n') if text else []
+    return out
+
+
+def _valid(entry, src, st):
+    """True if `entry` still describes `src`; refreshes the mtime when only that moved."""
+    if not entry or entry.get('source') != os.path.basename(src) or entry.get('size') != st.st_size:
+        return False
+    if entry.get('mtime_ns') == st.st_mtime_ns:
+        return True
+    if entry.get('hash') == file_hash(src):
+        entry['mtime_ns'] = st.st_mtime_ns
+        return True
+    return False
+
+
+def read_components(path, ext, names):
+    """{name: parsed component} for model `path`, served from the cache where valid."""
+    readers = READERS[ext]
+    cache = cache_dir(path)
+    if cache is None:
+        return {n: readers[n](os.path.join(path, f'{n}.{ext}')) for n in names}
+    manifest = load_manifest(cache)
+    manifest['model'] = os.path.realpath(path)
+    comps = manifest['components']
+    model, dirty = {}, False
+    for n in names:
+        src = os.path.join(path, f'{n}.{ext}')
+        st = os.stat(src)
+        entry = comps.get(n)
+        mtime = entry and entry.get('mtime_ns')
+        if _valid(entry, src, st):
+            try:
+                model[n] = _load(cache, n, entry)
+                dirty |= entry['mtime_ns'] != mtime
+                continue
+            except (OSError, ValueError, KeyError):
+                pass    # damaged entry: parse again
+        model[n] = readers[n](src)
+        try:
+            os.makedirs(cache, exist_ok=True)
+            entry = _store(cache, n, model[n])
+        except OSError:
+            continue    # read-only cache directory
+        entry.update(source=os.path.basename(src), size=st.st_size, mtime_ns=st.st_mtime_ns, hash=file_hash(src))
+        comps[n] = entry
+        dirty = True
+    if dirty:
+        try:
+            save_manifest(cache, manifest)
+        except OSError:
+            pass
+    return model
+
+
+def clear(path):
+    """Remove the cache of model `path` (both the user and the in-place one)."""
+    shutil.rmtree(os.path.join(path, CACHE_DIR), ignore_errors=True)
+    shutil.rmtree(user_cache_dir(path), ignore_errors=True)
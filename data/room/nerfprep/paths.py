@@ -0,0 +1,40 @@
+"""
+Scene root and the standard locations under it.
+
+The root is --root, else $NERFPREP_ROOT, else ~/nerf_project/data/room; it is
+resolved when a command runs, not at import time:
+
+ root/sparse/0 or root/sparse_txt      COLMAP model
+ root/nerfstudio/images                frames
+ root/nerfstudio/transforms.json
+"""
+import os
+
+ROOT_ENV = 'NERFPREP_ROOT'
+DEFAULT_ROOT = os.path.join('~', 'nerf_project', 'data', 'room')
+
+
+def scene_root(root=None):
+    return os.path.abspath(os.path.expanduser(root or os.environ.get(ROOT_ENV) or DEFAULT_ROOT))
+
+
+def add_scene_args(p):
+    """--root plus --colmap_dir/--images_dir/--out, each defaulting to its place under the root."""
+    p.add_argument('--root', help=f'scene root (default ${ROOT_ENV} or {DEFAULT_ROOT})')
+    p.add_argument('--colmap_dir', '--colmap_txt_dir', dest='colmap_dir',
+                   help='binary or text model (default <root>/sparse/0, else <root>/sparse_txt)')
+    p.add_argument('--images_dir', help='default <root>/nerfstudio/images')
+    p.add_argument('--out', help='default <root>/nerfstudio/transforms.json')
+
+
+def resolve_scene_args(args):
+    """Fill the paths left unset by add_scene_args() from the scene root, in place."""
+    root = scene_root(args.root)
+    if args.colmap_dir is None:
+        from .colmap_io import find_model_dir
+        args.colmap_dir = find_model_dir(root) or os.path.join(root, 'sparse', '0')
+    if args.images_dir is None:
+        args.images_dir = os.path.join(root, 'nerfstudio', 'images')
+    if args.out is None:
+        args.out = os.path.join(root, 'nerfstudio', 'transforms.json')
+    return args
@@ -0,0 +1,320 @@
+"""
+Single-pass transforms.json builder.
+
+The COLMAP model is parsed once, every stage fills its keys on the same
+in-memory document, and the file is written once at the end:
+
+ poses       file_path + transform_matrix for every matched image
+ rig_poses   poses, composed through frames/rigs (--rig; --rig_compact stores rig poses once, see rigs.py)
+ intrinsics  fl_x, fl_y, cx, cy
+ wh          w, h
+ distortion  camera_model, k1..k4, p1, p2
+ undistort   images_undistorted/ + pinhole frames (not run by default, see undistort.py)
+
+add_intrinsics_to_transforms.py and add_wh_to_transforms.py run the
+intrinsics / wh stages alone on an existing transforms.json (update_main).
+
+ python build_transforms.py --colmap_dir sparse/0 --images_dir nerfstudio/images \
+   --out nerfstudio/transforms.json
+ python -m nerfprep build --root ~/nerf_project/data/room     # same paths, from the scene root
+
+From Python, run() chains any stages on one document and one parsed model:
+
+ ctx = new_context(SceneModel.load('sparse/0'), base_dir='nerfstudio', images_dir='nerfstudio/images')
+ run(data, ctx, ('poses', 'intrinsics'))
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+from .paths import DEFAULT_ROOT, ROOT_ENV, add_scene_args, resolve_scene_args, scene_root
+from .trace import span
+
+# numpy-backed modules are imported where they are used, so `python -m nerfprep`
+# and --help do not pay for them
+
+STAGES = ('poses', 'intrinsics', 'wh', 'distortion')
+
+# COLMAP model -> (nerfstudio camera_model, names of the params after the focal/principal terms)
+DISTORTION = {
+    'SIMPLE_PINHOLE': ('OPENCV', ()),
+    'PINHOLE': ('OPENCV', ()),
+    'SIMPLE_RADIAL': ('OPENCV', ('k1',)),
+    'RADIAL': ('OPENCV', ('k1', 'k2')),
+    'OPENCV': ('OPENCV', ('k1', 'k2', 'p1', 'p2')),
+    'OPENCV_FISHEYE': ('OPENCV_FISHEYE', ('k1', 'k2', 'k3', 'k4')),
+}
+DISTORTION_KEYS = ('k1', 'k2', 'k3', 'k4', 'p1', 'p2')
+# models whose params start with a single focal length: f, cx, cy, ...
+SINGLE_FOCAL = ('SIMPLE_PINHOLE', 'SIMPLE_RADIAL', 'RADIAL', 'SIMPLE_RADIAL_FISHEYE', 'RADIAL_FISHEYE')
+
+
+def camera_intrinsics(cam):
+    """fl_x, fl_y, cx, cy for a COLMAP camera, read according to its model."""
+    p = [float(v) for v in cam['params']]
+    w, h = cam['width'], cam['height']
+    if cam['model'] in SINGLE_FOCAL and len(p) >= 3:
+        return p[0], p[0], p[1], p[2]
+    if len(p) >= 4:
+        return p[0], p[1], p[2], p[3]
+    if len(p) == 3:
+        return p[0], p[0], p[1], p[2]
+    if len(p) == 2:
+        return p[0], p[1], w/2.0, h/2.0
+    if len(p) == 1:
+        return p[0], p[0], w/2.0, h/2.0
+    return max(w, h)/2.0, max(w, h)/2.0, w/2.0, h/2.0
+
+
+def camera_distortion(cam):
+    """(camera_model, {k1..: value}) or (None, {}) for models nerfstudio cannot represent."""
+    if cam['model'] not in DISTORTION:
+        return None, {}
+    ns_model, names = DISTORTION[cam['model']]
+    start = 3 if cam['model'] in SINGLE_FOCAL else 4
+    return ns_model, {k: float(v) for k, v in zip(names, cam['params'][start:])}
+
+
+def new_context(scene=None, base_dir='.', images_dir=None):
+    """Shared state for the stages; `scene` is a SceneModel or None."""
+    return {'scene': scene, 'base_dir': str(base_dir), 'images_dir': images_dir}
+
+
+def frame_camera(ctx, frame):
+    """COLMAP camera behind a frame, or None."""
+    scene = ctx['scene']
+    return scene.camera_of(scene.frame_image(frame.get('file_path', ''))) if scene else None
+
+
+def probe_frames(ctx, frames):
+    """{file_path: (w, h)} for `frames` from image headers (parallel, cached next to
+    transforms.json) plus the file_paths that could not be probed. Sizes are as
+    displayed: EXIF orientations 5-8 swap w and h."""
+    from .imagesize import probe_sizes, display_size, CACHE_NAME
+    paths = {fr.get('file_path', ''): os.path.join(ctx['base_dir'], fr.get('file_path', '')) for fr in frames}
+    sizes, failed = probe_sizes(list(paths.values()), cache_path=os.path.join(ctx['base_dir'], CACHE_NAME))
+    found = {fp: display_size(*sizes[p]) for fp, p in paths.items() if p in sizes}
+    return found, [fp for fp in paths if fp not in found]
+
+
+def stage_poses(data, ctx, c2w=False, opengl=False, fuzzy=True):
+    from .matching import match_names
+    from .poses import CONVENTION_KEY, poses_to_transforms
+    scene = ctx['scene']
+    images = scene.images
+    chosen = match_names(images['name'], os.listdir(ctx['images_dir']), fuzzy=fuzzy)
+    idx = [i for i, c in enumerate(chosen) if c]
+    M = poses_to_transforms(images['qvec'][idx], images['tvec'][idx], invert=c2w, opengl=opengl).tolist()
+    data[CONVENTION_KEY] = {'c2w': bool(c2w), 'opengl': bool(opengl)}
+    prefix = os.path.basename(os.path.normpath(ctx['images_dir']))
+    data['frames'] = [{'file_path': f"{prefix}/{chosen[i]}", 'transform_matrix': m} for i, m in zip(idx, M)]
+    for i, fr in zip(idx, data['frames']):
+        scene.bind(fr['file_path'], i)
+    ctx['unmatched'] = [images['name'][i] for i, c in enumerate(chosen) if not c]
+    if scene.cameras and 'camera_angle_x' not in data:
+        first_cam = next(iter(scene.cameras.values()))
+        data['camera_angle_x'] = 2.0 * math.atan(first_cam['width'] / (2.0 * first_cam['params'][0]))
+    return len(idx)
+
+
+def stage_rig_poses(data, ctx, c2w=False, opengl=False, fuzzy=True, compact=False):
+    """stage_poses, with the matrices of images on a rig composed from rig_from_world
+    and sensor_from_rig (models without frames/rigs get plain poses)."""
+    from .poses import rt_to_transforms
+    from .rigs import compact_frames, compose
+    n = stage_poses(data, ctx, c2w=c2w, opengl=opengl, fuzzy=fuzzy)
+    scene = ctx['scene']
+    if 'frames' not in scene.model or 'rigs' not in scene.model or not n:
+        return n
+    rig = compose(scene.model)
+    idx = [scene.frame_image(fr['file_path']) for fr in data['frames']]
+    M = rt_to_transforms(rig['R'][idx], rig['t'][idx], invert=c2w, opengl=opengl).tolist()
+    for fr, m in zip(data['frames'], M):
+        fr['transform_matrix'] = m
+    if compact:
+        ctx['rig_compact'] = compact_frames(data, rig, idx, c2w=c2w, opengl=opengl)
+    return n
+
+
+def stage_intrinsics(data, ctx):
+    updated = 0
+    todo = []
+    for fr in data.get('frames', []):
+        if all(k in fr for k in ('fl_x', 'fl_y', 'cx', 'cy')):
+            continue
+        cam = frame_camera(ctx, fr)
+        if cam:
+            fr['fl_x'], fr['fl_y'], fr['cx'], fr['cy'] = camera_intrinsics(cam)
+            updated += 1
+        elif 'camera_angle_x' in data:
+            todo.append(fr)
+        else:
+            print("Could not determine intrinsics for", os.path.basename(fr.get('file_path', '')), "- leaving frame unchanged")
+    # no camera for these: derive from camera_angle_x and the real image size
+    sizes, ctx['intrinsics_failed'] = probe_frames(ctx, todo) if todo else ({}, [])
+    camax = float(data.get('camera_angle_x', 0))
+    for fr in todo:
+        if fr.get('file_path', '') not in sizes:
+            continue
+        w, h = sizes[fr['file_path']]
+        f = 0.5 * w / math.tan(0.5 * camax)
+        fr['fl_x'] = fr['fl_y'] = float(f)
+        fr['cx'] = float(w/2.0); fr['cy'] = float(h/2.0)
+        updated += 1
+    return updated
+
+
+def stage_wh(data, ctx):
+    updated = 0
+    todo = []
+    for fr in data.get('frames', []):
+        if 'w' in fr and 'h' in fr:
+            continue
+        cam = frame_camera(ctx, fr)
+        if cam:
+            fr['w'], fr['h'] = int(cam['width']), int(cam['height'])
+            updated += 1
+        else:
+            todo.append(fr)
+    # frames without a camera get the size of the image file; failures are reported, not defaulted
+    sizes, ctx['wh_failed'] = probe_frames(ctx, todo) if todo else ({}, [])
+    for fr in todo:
+        if fr.get('file_path', '') in sizes:
+            fr['w'], fr['h'] = (int(v) for v in sizes[fr['file_path']])
+            updated += 1
+    return updated
+
+
+def stage_distortion(data, ctx):
+    updated = 0
+    for fr in data.get('frames', []):
+        cam = frame_camera(ctx, fr)
+        if not cam or any(k in fr for k in DISTORTION_KEYS):
+            continue
+        ns_model, coeffs = camera_distortion(cam)
+        if ns_model is None:
+            print("Unsupported camera model", cam['model'], "for", fr.get('file_path'), "- distortion dropped")
+            continue
+        fr['camera_model'] = ns_model
+        fr.update(coeffs)
+        updated += 1
+    return updated
+
+
+def stage_undistort(data, ctx):
+    from .undistort import undistort_frames
+    written, skipped, ctx['undistort_failed'] = undistort_frames(data, ctx['base_dir'])
+    return written + skipped
+
+
+STAGE_FUNCS = {'poses': stage_poses, 'rig_poses': stage_rig_poses, 'intrinsics': stage_intrinsics, 'wh': stage_wh,
+               'distortion': stage_distortion, 'undistort': stage_undistort}
+
+
+POSE_STAGES = ('poses', 'rig_poses')
+
+
+def run(data, ctx, stages=STAGES, **pose_opts):
+    """Run `stages` in order on `data`; returns {stage: frames updated}."""
+    counts = {}
+    for name in stages:
+        fn = STAGE_FUNCS[name]
+        with span('stage:' + name) as sp:
+            counts[name] = sp.items = fn(data, ctx, **pose_opts) if name in POSE_STAGES else fn(data, ctx)
+    return counts
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Build a complete transforms.json from a COLMAP model in one pass.")
+    add_scene_args(p)
+    p.add_argument('--stages', default=','.join(STAGES), help='comma separated subset of ' + ','.join(STAGE_FUNCS))
+    p.add_argument('--c2w', action='store_true', help='write camera-to-world matrices')
+    p.add_argument('--opengl', action='store_true', help='flip camera axes to the OpenGL convention')
+    p.add_argument('--exact', action='store_true', help='no fuzzy filename matching')
+    p.add_argument('--rig', action='store_true', help='compose poses through frames/rigs (rig_poses stage instead of poses)')
+    p.add_argument('--rig_compact', action='store_true', help='with --rig: store a pose shared by several cameras of a rig once')
+    p.add_argument('--backup', action='store_true', help='keep the previous transforms.json as transforms_backup.json')
+    p.add_argument('--sidecar', action='store_true', help='also write poses/intrinsics to <out>.frames.npy (memory-mappable)')
+    args = resolve_scene_args(p.parse_args(argv))
+
+    stages = [s for s in args.stages.split(',') if s]
+    if args.rig or args.rig_compact:
+        stages = ['rig_poses' if s == 'poses' else s for s in stages]
+    bad = [s for s in stages if s not in STAGE_FUNCS]
+    if bad:
+        p.error(f"unknown stages {bad}")
+    from .colmap_io import detect_format
+    from .scene import SceneModel
+    from .transforms_io import write_transforms
+    if detect_format(args.colmap_dir) is None:
+        print("ERROR: Missing cameras/images .bin or .txt in", args.colmap_dir); return 1
+
+    base_dir = os.path.dirname(os.path.abspath(args.out))
+    data = {}
+    if not set(POSE_STAGES) & set(stages):
+        if not os.path.exists(args.out):
+            print("ERROR: transforms.json not found at", args.out, "(add the poses stage to create it)"); return 1
+        with span('read_transforms'), open(args.out) as f:
+            data = json.load(f)
+    if args.backup and os.path.exists(args.out):
+        os.replace(args.out, os.path.join(base_dir, 'transforms_backup.json'))
+
+    ctx = new_context(SceneModel.load(args.colmap_dir), base_dir=base_dir, images_dir=args.images_dir)
+    pose_opts = {'compact': True} if 'rig_poses' in stages and args.rig_compact else {}
+    counts = run(data, ctx, stages, c2w=args.c2w, opengl=args.opengl, fuzzy=not args.exact, **pose_opts)
+
+    write_transforms(args.out, data, sidecar=True if args.sidecar else None)
+    print(f"WROTE {args.out} with {len(data.get('frames', []))} frames.",
+          ', '.join(f"{k}: {v}" for k, v in counts.items()))
+    if ctx.get('rig_compact'):
+        print(f"{ctx['rig_compact']} frames share {len(data['rig_frames'])} rig poses")
+    if ctx.get('unmatched'):
+        print("UNMATCHED names (first 30):", ctx['unmatched'][:30])
+    for key in ('intrinsics_failed', 'wh_failed'):
+        if ctx.get(key):
+            print(f"{len(ctx[key])} frames could not be probed ({key}), left unchanged:", ctx[key][:20])
+    if ctx.get('undistort_failed'):
+        print(f"{len(ctx['undistort_failed'])} frames could not be undistorted, left unchanged:", ctx['undistort_failed'][:20])
+    return 0
+
+
+# stage -> backup kept by update_main (add_intrinsics / add_wh_to_transforms.py)
+UPDATE_BACKUPS = {'intrinsics': 'transforms_backup.json', 'wh': 'transforms_with_intrinsics_backup.json'}
+
+
+def update_main(stage, argv=None):
+    """Run one stage in place on <root>/nerfstudio/transforms.json, keeping a backup."""
+    p = argparse.ArgumentParser(description=f"Add the {stage} keys to an existing transforms.json.")
+    p.add_argument('--root', help=f'scene root (default ${ROOT_ENV} or {DEFAULT_ROOT})')
+    args = p.parse_args(argv)
+
+    from .scene import SceneModel
+    from .transforms_io import write_transforms
+    root = scene_root(args.root)
+    base_dir = os.path.join(root, 'nerfstudio')
+    trans = os.path.join(base_dir, 'transforms.json')
+    if not os.path.exists(trans):
+        print("ERROR: transforms.json not found at", trans); return 1
+    with span('read_transforms'), open(trans) as f:
+        data = json.load(f)
+    if not data.get('frames'):
+        print("ERROR: no frames in transforms.json"); return 1
+
+    # sparse/0 binaries when present, else the sparse_txt export
+    scene = SceneModel.from_root(root)
+    if not scene or not scene.cameras or not len(scene):
+        print("WARNING: COLMAP model missing/empty in", root, "- falling back to camera_angle_x and image headers.")
+
+    backup = os.path.join(base_dir, UPDATE_BACKUPS.get(stage, f'transforms_before_{stage}.json'))
+    shutil.copyfile(trans, backup)
+    print("Wrote backup to", backup)
+
+    ctx = new_context(scene, base_dir=base_dir)
+    counts = run(data, ctx, (stage,))
+    write_transforms(trans, data)
+    print(f"Updated {stage} for {counts[stage]} frames. Wrote {trans}")
+    failed = ctx.get(stage + '_failed')
+    if failed:
+        print(f"{len(failed)} frames could not be probed, left unchanged:", failed[:20])
+    return 0
@@ -0,0 +1,267 @@
+"""
+Pre-decoded RGB pixels of every frame, one memory-mapped uint8 array per pyramid level.
+
+ python -m nerfprep pixels --transforms nerfstudio/transforms.json --levels 1,2,4,8 --workers 8
+
+ store = PixelStore('nerfstudio/pixels', level=2)
+ rgb = store.pixels(np.random.randint(0, len(store), 4096))     # (4096, 3) uint8
+ img = store.frame(0)                                            # (h, w, 3) view, no copy
+
+Level 1 decodes each frame's file_path; level f decodes the same name in
+images_f/ when it exists, else downscales the full image to
+floor(w / f) x floor(h / f) as pyramid.py does. Frames keep their own size
+(images of one capture can differ), so per level <out>/level_<f>.frames.npy
+holds (offset, w, h, frame) per stored frame, `frame` being its index in
+transforms.json, and level_<f>.rgb.npy all pixels as one (total pixels, 3)
+array, frames in transforms.json order and rows row-major: pixel i is pixel
+i - offsets[k] of record k with offsets[k] <= i < offsets[k + 1]. Only
+frames with a finite pose and intrinsics are stored (stored_frames()), and
+frames whose image cannot be read or decoded have no record and no pixels.
+rays.py selects and sizes frames with the same functions, so both stores
+hold the same frames at the same offsets unless a decode failed here; build
+the rays with --pixels <this store> to follow it then. Worker
+processes decode straight into the memory-mapped file. A level is rebuilt
+only when a source file changed (size, mtime) since the last build, or with
+--force.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+FRAME_DTYPE = np.dtype([('offset', '<i8'), ('w', '<i4'), ('h', '<i4'), ('frame', '<i4')])
+INTRINSIC_KEYS = ('fl_x', 'fl_y', 'cx', 'cy', 'w', 'h')
+
+
+def stored_frames(data, json_path=None, poses=None):
+    """transforms.json indices of the frames the pixel and ray stores hold: a file_path,
+    a finite pose and per-frame intrinsics."""
+    from .transforms_io import frame_poses
+    poses = frame_poses(data, json_path) if poses is None else poses
+    finite = np.isfinite(poses).all(axis=(1, 2)).tolist()
+    return [i for i, (fr, ok) in enumerate(zip(data.get('frames', []), finite))
+            if ok and 'file_path' in fr and all(k in fr for k in INTRINSIC_KEYS)]
+
+
+def level_source(base_dir, file_path, factor):
+    """(path to decode, whether it must be downscaled by `factor` after decoding)."""
+    src = os.path.join(base_dir, file_path)
+    if factor == 1:
+        return src, False
+    d, name = os.path.split(os.path.normpath(file_path))
+    scaled = os.path.join(base_dir, f"{d}_{factor}", name)
+    return (scaled, False) if os.path.isfile(scaled) else (src, True)
+
+
+def level_sizes(base_dir, frames, factor):
+    """Per frame (path to decode, downscale after decoding, (w, h) at this level or None
+    when the image cannot be probed). Sizes are of the stored pixels, as decoded."""
+    from .imagesize import probe_sizes, CACHE_NAME
+    sources = [level_source(base_dir, fr['file_path'], factor) for fr in frames]
+    sizes, _ = probe_sizes([s for s, _ in sources], cache_path=os.path.join(base_dir, CACHE_NAME))
+    out = []
+    for src, downscale in sources:
+        size = sizes.get(src)
+        if size is not None:
+            w, h = size[:2]
+            size = (max(w // factor, 1), max(h // factor, 1)) if downscale else (w, h)
+        out.append((src, downscale, size))
+    return out
+
+
+def decode(src, size, factor=None):
+    """(h, w, 3) uint8 RGB of `src`, downscaled by `factor` when given; ValueError if not w x h."""
+    from PIL import Image
+    with Image.open(src) as im:
+        if factor:
+            if im.format == 'JPEG':
+                im.draft('RGB', size)
+            im = im.convert('RGB')
+            if im.size != size:
+                k = im.size[0] // size[0]
+                im = im.reduce(k) if k > 1 and im.size == (size[0] * k, size[1] * k) else im.resize(size, Image.BOX)
+        else:
+            im = im.convert('RGB')
+        if im.size != size:
+            raise ValueError(f"{src} is {im.size[0]}x{im.size[1]}, expected {size[0]}x{size[1]}")
+        return np.asarray(im)
+
+
+_maps = {}
+
+
+def _job(args):
+    path, offset, w, h, src, factor = args
+    try:
+        mm = _maps.get(path)
+        if mm is None:
+            mm = _maps[path] = np.load(path, mmap_mode='r+')
+        mm[offset:offset + w * h] = decode(src, (w, h), factor).reshape(-1, 3)
+        mm.flush()
+        return src, None
+    except Exception as e:
+        return src, repr(e)
+
+
+def source_stamps(paths):
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append([st.st_size, st.st_mtime_ns])
+        except OSError:
+            out.append(None)
+    return out
+
+
+def _compact(tmp, rec, keep, path):
+    """Copy the records `keep` of the pixel file `tmp` back to back into `path`; returns (records, pixels)."""
+    n = rec['w'].astype(np.int64) * rec['h']
+    out = rec[keep]
+    out['offset'] = np.cumsum(n[keep]) - n[keep]
+    total = int(n[keep].sum())
+    if not total:
+        np.save(path, np.zeros((0, 3), dtype=np.uint8))
+        os.remove(tmp)
+        return out, 0
+    src = np.load(tmp, mmap_mode='r')
+    dst = np.lib.format.open_memmap(path + '.compact.tmp', mode='w+', dtype=np.uint8, shape=(total, 3))
+    for a, b, m in zip(rec['offset'][keep].tolist(), out['offset'].tolist(), n[keep].tolist()):
+        dst[b:b + m] = src[a:a + m]
+    dst.flush()
+    del src, dst
+    os.remove(tmp)
+    os.replace(path + '.compact.tmp', path)
+    return out, total
+
+
+def build_level(out_dir, base_dir, frames, factor, workers=None, ids=None):
+    """Decode one level into level_<f>.rgb.npy; returns (frames written, pixels, skipped file_paths, sources).
+
+    `ids` are the transforms.json indices of `frames` (default 0..n-1), stored as 'frame'."""
+    from .trace import span
+    ids = range(len(frames)) if ids is None else ids
+    levels = level_sizes(base_dir, frames, factor)
+    rec, jobs, skipped, offset = [], [], [], 0
+    prefix = os.path.join(out_dir, f'level_{factor}')
+    tmp = prefix + '.rgb.npy.tmp'
+    for fr, i, (src, downscale, size) in zip(frames, ids, levels):
+        if size is None:
+            skipped.append(fr['file_path'])
+            continue
+        w, h = size
+        rec.append((offset, w, h, i))
+        jobs.append((tmp, offset, w, h, src, factor if downscale else None))
+        offset += w * h
+    rec = np.array(rec, dtype=FRAME_DTYPE)
+    sources = [src for src, _, _ in levels]
+    if not offset:      # np.memmap cannot map an empty file
+        np.save(prefix + '.frames.npy', rec)
+        np.save(prefix + '.rgb.npy', np.zeros((0, 3), dtype=np.uint8))
+        return 0, 0, skipped, sources
+    mm = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.uint8, shape=(offset, 3))
+    del mm
+    failed = {}
+    chunk = max(1, len(jobs) // (8 * (workers or os.cpu_count() or 1)))
+    with span('decode_pixels', items=len(jobs), level=factor), ProcessPoolExecutor(max_workers=workers) as pool:
+        failed = {src: err for src, err in pool.map(_job, jobs, chunksize=chunk) if err}
+    for src, err in failed.items():
+        print("  ERR", src, err)
+    if failed:
+        # drop the frames that did not decode, records and pixels, so every pixel belongs to a record
+        keep = np.array([j[4] not in failed for j in jobs])
+        skipped += [fr['file_path'] for fr, src in zip(frames, sources) if src in failed]
+        rec, offset = _compact(tmp, rec, keep, prefix + '.rgb.npy')
+    else:
+        os.replace(tmp, prefix + '.rgb.npy')
+    np.save(prefix + '.frames.npy', rec)
+    return len(rec), offset, skipped, sources
+
+
+class PixelStore:
+    """Memory-mapped pixels of one level written by build_pixels()."""
+
+    def __init__(self, path, level=1):
+        prefix = os.path.join(path, f'level_{level}')
+        self.frames = np.load(prefix + '.frames.npy')
+        self.rgb = np.load(prefix + '.rgb.npy', mmap_mode='r')
+        self.offsets = self.frames['offset']
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def frame_of(self, idx):
+        return np.searchsorted(self.offsets, idx, side='right') - 1
+
+    def frame(self, k):
+        """(h, w, 3) uint8 view of record k, backed by the mapped file; its transforms.json
+        index is self.frames['frame'][k]."""
+        r = self.frames[k]
+        return self.rgb[r['offset']:r['offset'] + int(r['w']) * int(r['h'])].reshape(int(r['h']), int(r['w']), 3)
+
+    def pixels(self, idx):
+        """(len(idx), 3) uint8 RGB for global pixel indices; only their pages are read."""
+        return self.rgb[np.asarray(idx, dtype=np.int64)]
+
+
+def build_pixels(transforms, out_dir, levels=(1, 2, 4, 8), workers=None, force=False):
+    """Pixel arrays for every level plus index.json; returns the index."""
+    with open(transforms) as f:
+        data = json.load(f)
+    ids = stored_frames(data, transforms)
+    frames = [data['frames'][i] for i in ids]
+    base_dir = os.path.dirname(os.path.abspath(transforms))
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, 'index.json')
+    try:
+        with open(index_path) as fh:
+            old = json.load(fh)['levels']
+    except (OSError, ValueError, KeyError):
+        old = {}
+    index = {'version': 1, 'transforms': os.path.abspath(transforms), 'dtype': 'uint8', 'channels': 3,
+             'unposed': len(data.get('frames', [])) - len(ids), 'levels': {}}
+    for f in levels:
+        prev = old.get(str(f))
+        paths = [level_source(base_dir, fr['file_path'], f)[0] for fr in frames]
+        if not force and prev and prev.get('ids') == ids and prev['sources'] == paths \
+                and prev['stamps'] == source_stamps(paths) \
+                and os.path.exists(os.path.join(out_dir, f'level_{f}.rgb.npy')):
+            index['levels'][str(f)] = dict(prev, up_to_date=True)
+            continue
+        n, pixels, skipped, paths = build_level(out_dir, base_dir, frames, f, workers, ids)
+        index['levels'][str(f)] = {'frames': n, 'pixels': pixels, 'skipped': skipped, 'ids': ids,
+                                   'sources': paths, 'stamps': source_stamps(paths)}
+    with open(index_path + '.tmp', 'w') as fh:
+        json.dump(index, fh)
+    os.replace(index_path + '.tmp', index_path)
+    return index
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Decode every frame once into memory-mapped uint8 arrays per pyramid level.")
+    p.add_argument('--transforms', required=True)
+    p.add_argument('--out', help='output directory (default: pixels/ next to transforms.json)')
+    p.add_argument('--levels', default='1,2,4,8', help='downscale factors (images, images_2, ...)')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--force', action='store_true', help='decode even if the sources did not change')
+    args = p.parse_args(argv)
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(args.transforms)), 'pixels')
+    levels = sorted({int(f) for f in args.levels.split(',') if f})
+    index = build_pixels(args.transforms, out, levels, args.workers, args.force)
+    if index['unposed']:
+        print(f"{index['unposed']} frames without image, pose or intrinsics not stored")
+    failed = 0
+    for f, meta in index['levels'].items():
+        size = os.path.getsize(os.path.join(out, f'level_{f}.rgb.npy'))
+        failed += len(meta['skipped'])
+        print(f"level {f}: {meta['frames']} frames, {meta['pixels']} pixels, {size / (1 << 20):.1f} MB"
+              + (" (up to date)" if meta.get('up_to_date') else '')
+              + (f", {len(meta['skipped'])} frames not decoded" if meta['skipped'] else ''))
+    print("WROTE", out)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+Sparse point cloud (points3D) utilities: columnar loading, filtering, PLY export.
+
+ pts = load_points('sparse/0')                         # or 'sparse_txt'
+ keep = point_mask(pts, max_error=2.0, min_track=3, bbox=((-5, -5, -5), (5, 5, 5)))
+ write_ply('sparse.ply', **select_points(pts, keep))
+
+Points are columns (xyz float32, rgb uint8, error float32, id int64) and tracks
+are CSR: track_offsets[i]:track_offsets[i + 1] slices the (image_id,
+point2D_idx) records of point i. Every operation is a whole-array NumPy pass.
+
+ python -m nerfprep.points --model sparse/0 --out sparse.ply --max_error 2 --min_track 3
+"""
+import argparse
+import os
+import numpy as np
+from .colmap_io import read_model
+
+PLY_CHUNK = 1 << 20
+
+
+def load_points(model_dir, cache=True):
+    """points3D of a model directory, through the parsed-model cache by default."""
+    model = read_model(model_dir, points3D=True, cache=cache)
+    if 'points3D' not in model:
+        raise FileNotFoundError(f"no points3D.{model['format']} in {model_dir}")
+    return model['points3D']
+
+
+def track_lengths(pts):
+    return np.diff(pts['track_offsets'])
+
+
+def point_mask(pts, max_error=None, min_track=None, bbox=None):
+    """Boolean mask of points with error <= max_error, track length >= min_track
+    and xyz inside bbox ((xmin, ymin, zmin), (xmax, ymax, zmax))."""
+    keep = np.ones(len(pts['id']), dtype=bool)
+    if max_error is not None:
+        keep &= pts['error'] <= max_error
+    if min_track is not None:
+        keep &= track_lengths(pts) >= min_track
+    if bbox is not None:
+        lo, hi = np.asarray(bbox, dtype=np.float32)
+        keep &= np.all((pts['xyz'] >= lo) & (pts['xyz'] <= hi), axis=1)
+    return keep
+
+
+def select_points(pts, mask):
+    """Subset of `pts` (tracks included) where `mask` is True."""
+    idx = np.flatnonzero(mask)
+    lengths = track_lengths(pts)[idx]
+    offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    starts = pts['track_offsets'][idx]
+    elem = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    out = {k: pts[k][idx] for k in ('id', 'xyz', 'rgb', 'error')}
+    out['track_offsets'] = offsets
+    out['track'] = pts['track'][elem]
+    return out
+
+
+def bounds(pts, percentile=None):
+    """(min, max) corners of the cloud; with percentile=p the p / 100-p
+    percentiles per axis, which ignores stray points."""
+    xyz = pts['xyz']
+    if not len(xyz):
+        return np.zeros(3, np.float32), np.zeros(3, np.float32)
+    if percentile:
+        return np.percentile(xyz, percentile, axis=0), np.percentile(xyz, 100 - percentile, axis=0)
+    return xyz.min(axis=0), xyz.max(axis=0)
+
+
+def write_ply(path, xyz, rgb=None, **_):
+    """Binary little-endian PLY with float x/y/z and optional uchar red/green/blue.
+
+    Extra keyword arguments are ignored so a points dict can be passed with **."""
+    n = len(xyz)
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if rgb is not None:
+        fields += [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
+    dtype = np.dtype(fields)
+    head = ['ply', 'format binary_little_endian 1.0', f'element vertex {n}']
+    head += [f"property {'float' if t == '<f4' else 'uchar'} {name}" for name, t in fields]
+    head.append('end_header')
+    tmp = str(path) + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(('\n'.join(head) + '\n').encode('ascii'))
+        rows = np.empty(min(n, PLY_CHUNK), dtype=dtype)
+        for lo in range(0, n, PLY_CHUNK):
+            r = rows[:min(PLY_CHUNK, n - lo)]
+            chunk = xyz[lo:lo + len(r)]
+            r['x'], r['y'], r['z'] = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+            if rgb is not None:
+                c = rgb[lo:lo + len(r)]
+                r['red'], r['green'], r['blue'] = c[:, 0], c[:, 1], c[:, 2]
+            f.write(r.tobytes())
+    os.replace(tmp, path)
+    return n
+
+
+def _floats(s, n):
+    v = [float(x) for x in s.split(',')] if s else None
+    if v is not None and len(v) != n:
+        raise argparse.ArgumentTypeError(f"expected {n} comma separated numbers")
+    return v
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Filter a COLMAP sparse point cloud and export it as binary PLY.")
+    p.add_argument('--model', required=True, help='model directory (sparse/0 or sparse_txt)')
+    p.add_argument('--out', help='PLY to write')
+    p.add_argument('--max_error', type=float)
+    p.add_argument('--min_track', type=int)
+    p.add_argument('--bbox', type=lambda s: _floats(s, 6), help='xmin,ymin,zmin,xmax,ymax,zmax')
+    args = p.parse_args(argv)
+
+    pts = load_points(args.model)
+    bbox = (args.bbox[:3], args.bbox[3:]) if args.bbox else None
+    keep = point_mask(pts, args.max_error, args.min_track, bbox)
+    sel = select_points(pts, keep)
+    lo, hi = bounds(sel)
+    lengths = track_lengths(sel)
+    print(f"{len(pts['id'])} points, {len(sel['id'])} kept; "
+          f"mean track {lengths.mean() if len(lengths) else 0:.2f}, bounds {lo.tolist()} .. {hi.tolist()}")
+    if args.out:
+        write_ply(args.out, **sel)
+        print("WROTE", args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
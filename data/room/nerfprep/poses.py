@@ -0,0 +1,94 @@
+"""
+Batched pose conversion: COLMAP (qvec, tvec) arrays -> stacks of 4x4 matrices.
+
+ M = poses_to_transforms(images['qvec'], images['tvec'])                    # (N,4,4) world-to-camera
+ M = poses_to_transforms(qvec, tvec, invert=True, opengl=True)             # camera-to-world, nerfstudio axes
+"""
+import numpy as np
+from .trace import traced
+
+# OpenCV (x right, y down, z forward) -> OpenGL (x right, y up, z back)
+OPENGL_FLIP = np.diag([1.0, -1.0, -1.0, 1.0])
+# transforms.json key the converters record their --c2w / --opengl choice in
+CONVENTION_KEY = 'pose_convention'
+
+
+def pose_convention(data, c2w=None, opengl=None):
+    """(c2w, opengl) of the matrices of transforms.json `data`: the given flags, else what
+    the converter recorded under CONVENTION_KEY, else its default (world-to-camera, OpenCV axes)."""
+    rec = data.get(CONVENTION_KEY) or {}
+    return (bool(rec.get('c2w', False)) if c2w is None else c2w,
+            bool(rec.get('opengl', False)) if opengl is None else opengl)
+
+
+def qvec_to_rotmat(qvec):
+    """(N,4) quaternions [qw,qx,qy,qz] -> (N,3,3) rotations; inputs need not be normalized."""
+    q = np.asarray(qvec, dtype=np.float64).reshape(-1, 4)
+    q = q / np.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    R = np.empty((len(q), 3, 3))
+    R[:, 0, 0] = 1 - 2*y*y - 2*z*z
+    R[:, 0, 1] = 2*x*y - 2*z*w
+    R[:, 0, 2] = 2*x*z + 2*y*w
+    R[:, 1, 0] = 2*x*y + 2*z*w
+    R[:, 1, 1] = 1 - 2*x*x - 2*z*z
+    R[:, 1, 2] = 2*y*z - 2*x*w
+    R[:, 2, 0] = 2*x*z - 2*y*w
+    R[:, 2, 1] = 2*y*z + 2*x*w
+    R[:, 2, 2] = 1 - 2*x*x - 2*y*y
+    return R
+
+
+@traced('poses_to_transforms', items=len)
+def poses_to_transforms(qvec, tvec, invert=False, opengl=False):
+    """Build an (N,4,4) transform stack from (N,4) qvecs and (N,3) tvecs.
+
+    COLMAP poses are world-to-camera. invert=True returns camera-to-world
+    (R^T, -R^T t) computed in closed form; opengl=True flips the camera y/z
+    axes (nerfstudio/NeRF convention) in the same pass."""
+    return rt_to_transforms(qvec_to_rotmat(qvec), tvec, invert, opengl)
+
+
+def rt_to_transforms(R, t, invert=False, opengl=False):
+    """poses_to_transforms() for (N,3,3) rotations instead of quaternions."""
+    R = np.asarray(R, dtype=np.float64).reshape(-1, 3, 3)
+    t = np.asarray(t, dtype=np.float64).reshape(-1, 3)
+    M = np.zeros((len(R), 4, 4))
+    M[:, 3, 3] = 1.0
+    if invert:
+        Rt = R.transpose(0, 2, 1)
+        M[:, :3, :3] = Rt
+        M[:, :3, 3] = -np.einsum('nij,nj->ni', Rt, t)
+        if opengl:
+            M[:, :3, 1:3] *= -1     # c2w @ F: flip camera axes (columns)
+    else:
+        M[:, :3, :3] = R
+        M[:, :3, 3] = t
+        if opengl:
+            M[:, 1:3, :] *= -1      # F @ w2c: flip camera axes (rows)
+    return M
+
+
+def invert_transforms(M):
+    """Invert an (N,4,4) stack of rigid transforms without a general matrix inverse."""
+    M = np.asarray(M, dtype=np.float64)
+    out = np.zeros_like(M)
+    Rt = M[:, :3, :3].transpose(0, 2, 1)
+    out[:, :3, :3] = Rt
+    out[:, :3, 3] = -np.einsum('nij,nj->ni', Rt, M[:, :3, 3])
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def camera_centers(M, c2w=True):
+    """Camera centers (N,3) and unit viewing axes (N,3) of an (N,3|4,4) pose stack.
+
+    The axis is the camera z axis; with OpenGL axes it points backwards, which
+    flips every frame alike and so leaves angles between frames unchanged."""
+    M = np.asarray(M, dtype=np.float64)
+    R, t = M[:, :3, :3], M[:, :3, 3]
+    if c2w:
+        C, d = t.copy(), R[:, :, 2]
+    else:
+        C, d = -np.einsum('nji,nj->ni', R, t), R[:, 2, :]
+    return C, d / np.linalg.norm(d, axis=1, keepdims=True)
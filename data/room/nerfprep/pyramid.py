@@ -0,0 +1,123 @@
+"""
+Build the images_2 / images_4 / images_8 downscales next to nerfstudio/images.
+
+Each source is decoded once and every stale scale is produced from that single
+decode; frames whose outputs are all newer than the source are skipped. When
+only the big factors are stale (>= --draft_from, default 4), JPEGs are decoded
+in draft mode (DCT-domain 1/2, 1/4, 1/8 scaling), which avoids a
+full-resolution decode entirely.
+Sizes follow ns-process-data: floor(w / f) x floor(h / f).
+
+ python -m nerfprep.pyramid --images_dir nerfstudio/images --factors 2,4,8 --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def out_dirs(images_dir, factors):
+    base = os.path.normpath(images_dir)
+    return {f: f"{base}_{f}" for f in factors}
+
+
+def stale_factors(src, dirs):
+    """Factors whose output is missing or older than `src`."""
+    mtime = os.stat(src).st_mtime_ns
+    name = os.path.basename(src)
+    todo = []
+    for f, d in dirs.items():
+        try:
+            if os.stat(os.path.join(d, name)).st_mtime_ns >= mtime:
+                continue
+        except OSError:
+            pass
+        todo.append(f)
+    return todo
+
+
+def build_one(src, dirs, factors, draft_from=4, quality=95):
+    """Write every factor in `factors` for one source image; returns the factors written."""
+    from PIL import Image
+    name = os.path.basename(src)
+    with Image.open(src) as im:
+        w, h = im.size
+        targets = {f: (max(w // f, 1), max(h // f, 1)) for f in sorted(factors)}
+        if draft_from and min(factors) >= draft_from and im.format == 'JPEG':
+            # let libjpeg scale down by up to the smallest needed factor while decoding
+            im.draft(im.mode if im.mode in ('RGB', 'L') else 'RGB', targets[min(factors)])
+        im = im.convert('RGB') if im.mode not in ('RGB', 'L', 'RGBA') else im
+        im.load()
+        cur = im
+        for f in sorted(factors):
+            tw, th = targets[f]
+            # successive halving from the previous scale when the ratio is exact, else a box filter
+            if cur.size != (tw, th):
+                k = cur.size[0] // tw
+                if k > 1 and cur.size[0] == tw * k and cur.size[1] == th * k:
+                    cur = cur.reduce(k)
+                else:
+                    cur = cur.resize((tw, th), Image.BOX)
+            dst = os.path.join(dirs[f], name)
+            tmp = dst + '.tmp'
+            fmt = 'JPEG' if name.lower().endswith(('.jpg', '.jpeg')) else 'PNG'
+            cur.save(tmp, format=fmt, **({'quality': quality} if fmt == 'JPEG' else {}))
+            os.replace(tmp, dst)
+    return sorted(factors)
+
+
+def _job(args):
+    src, dirs, factors, draft_from, quality = args
+    try:
+        return src, build_one(src, dirs, factors, draft_from, quality), None
+    except Exception as e:
+        return src, [], repr(e)
+
+
+def build_pyramid(images_dir, factors=(2, 4, 8), workers=None, draft_from=4, quality=95, force=False):
+    """Bring the downscale directories up to date; returns (written, skipped, errors)."""
+    dirs = out_dirs(images_dir, factors)
+    for d in dirs.values():
+        os.makedirs(d, exist_ok=True)
+    jobs, skipped = [], 0
+    with os.scandir(images_dir) as it:
+        for e in sorted(it, key=lambda e: e.name):
+            if not e.is_file() or not e.name.lower().endswith(IMAGE_EXTS):
+                continue
+            todo = list(factors) if force else stale_factors(e.path, dirs)
+            if todo:
+                jobs.append((e.path, {f: dirs[f] for f in todo}, todo, draft_from, quality))
+            else:
+                skipped += 1
+    written, errors = 0, []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for src, _, err in pool.map(_job, jobs, chunksize=max(1, len(jobs) // (8 * (workers or os.cpu_count() or 1)))):
+                if err:
+                    errors.append((src, err))
+                else:
+                    written += 1
+    return written, skipped, errors
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Build images_2/4/8 downscales from nerfstudio/images.")
+    p.add_argument('--images_dir', required=True)
+    p.add_argument('--factors', default='2,4,8')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--quality', type=int, default=95)
+    p.add_argument('--draft_from', type=int, default=4, help='smallest factor decoded in JPEG draft mode (0: never)')
+    p.add_argument('--force', action='store_true', help='rebuild even if outputs are up to date')
+    args = p.parse_args(argv)
+
+    factors = sorted({int(f) for f in args.factors.split(',') if f})
+    written, skipped, errors = build_pyramid(args.images_dir, factors, args.workers, args.draft_from, args.quality, args.force)
+    print(f"Pyramid {factors}: {written} frames written, {skipped} up to date, {len(errors)} failed.")
+    for src, err in errors[:20]:
+        print("  ERR", src, err)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
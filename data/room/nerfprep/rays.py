@@ -0,0 +1,244 @@
+"""
+Precomputed per-pixel ray bundles for every pyramid level.
+
+ python -m nerfprep rays --transforms nerfstudio/transforms.json --levels 1,2,4,8
+ python -m nerfprep rays --transforms ... --shared --dtype float16
+
+ cache = RayCache('nerfstudio/rays', level=2)
+ origins, dirs = cache.rays(np.random.randint(0, len(cache), 4096))
+
+A level has the size of the image pixels.py decodes for it (the images_f/
+file, else floor(w / f) x floor(h / f) of the full image, see
+pixels.level_sizes), with fl/cx/cy rescaled from the transforms.json w x h
+to that size, so images resized after COLMAP get matching rays. Rays go
+through pixel centers, row-major per frame, frames in transforms.json order;
+ray i of a level is pixel i - offsets[k] of record k with
+offsets[k] <= i < offsets[k + 1]. Frames are chosen by pixels.stored_frames
+(a file_path, a finite pose and intrinsics) and need a readable image
+header, so records and offsets are the same as in the pixel store of the
+same transforms.json, unless a frame failed to decode there. --pixels takes
+the frames and sizes from a built pixel store instead, so ray i is pixel i
+in every case; RayCache.check_pixels() refuses a store whose records differ.
+
+Per level, <out>/level_<f>.frames.npy holds one record per frame (offset,
+size, transforms.json frame index, camera table, origin, camera-to-world
+rotation) and either
+ full    level_<f>.dirs.npy      unit world directions, (total rays, 3)
+ shared  level_<f>.tables.npy    unit camera-space directions, one table per
+                                 distinct intrinsics, rotated when fetched.
+All arrays are memory-mapped .npy, so fetching a batch touches only its pages.
+Directions are pinhole: undistort frames with distortion terms first.
+Matrices and camera axes are read in the convention transforms.json records
+(poses.pose_convention: world-to-camera, OpenCV axes when absent, as the
+converters write by default); --c2w/--w2c and --opengl/--opencv override it.
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+FRAME_DTYPE = np.dtype([('offset', '<i8'), ('w', '<i4'), ('h', '<i4'), ('frame', '<i4'), ('table', '<i4'),
+                        ('origin', '<f8', 3), ('rotation', '<f8', (3, 3))])
+
+
+def camera_directions(w, h, fl_x, fl_y, cx, cy, opengl=True):
+    """(h * w, 3) unit camera-space directions through the pixel centers."""
+    x = (np.arange(w, dtype=np.float64) + 0.5 - cx) / fl_x
+    y = (np.arange(h, dtype=np.float64) + 0.5 - cy) / fl_y
+    d = np.empty((h, w, 3))
+    d[..., 0] = x[None, :]
+    d[..., 1] = y[:, None]
+    d[..., 2] = 1.0
+    if opengl:
+        d[..., 1:] *= -1
+    d /= np.linalg.norm(d, axis=-1, keepdims=True)
+    return d.reshape(-1, 3)
+
+
+def level_cameras(frames, sizes):
+    """Per frame (w, h, fl_x, fl_y, cx, cy) rescaled to an image of `sizes` (w, h), or None
+    where the size is None."""
+    from .undistort import scaled_camera
+    out = []
+    for fr, size in zip(frames, sizes):
+        if size is None:
+            out.append(None)
+            continue
+        cam = scaled_camera(fr, size)
+        out.append((int(cam['w']), int(cam['h']), cam['fl_x'], cam['fl_y'], cam['cx'], cam['cy']))
+    return out
+
+
+def build_level(out_dir, base_dir, frames, poses, factor, shared=False, dtype='float32', opengl=True, ids=None,
+                records=None):
+    """Write one level's ray arrays for the frames `ids` (default: pixels.stored_frames), or for
+    the frames and sizes of a pixel store's `records`; returns (frames written, rays, skipped frame indices)."""
+    from .pixels import level_sizes, stored_frames
+    from .trace import span
+    sizes = [None] * len(frames)
+    if records is not None:
+        for i, w, h in zip(records['frame'].tolist(), records['w'].tolist(), records['h'].tolist()):
+            sizes[i] = (w, h)
+    else:
+        ids = stored_frames({'frames': frames}, poses=poses) if ids is None else ids
+        for i, (_, _, size) in zip(ids, level_sizes(base_dir, [frames[i] for i in ids], factor)):
+            sizes[i] = size
+    cams = level_cameras(frames, sizes)
+    ok = [i for i, c in enumerate(cams) if c and c[0] > 0 and c[1] > 0]
+    skipped = sorted(set(range(len(frames))) - set(ok))
+    tables = {}
+    rec = np.zeros(len(ok), dtype=FRAME_DTYPE)
+    offset = 0
+    for k, i in enumerate(ok):
+        w, h = cams[i][:2]
+        rec[k]['offset'], rec[k]['w'], rec[k]['h'], rec[k]['frame'] = offset, w, h, i
+        rec[k]['table'] = tables.setdefault(cams[i], len(tables))
+        rec[k]['rotation'] = poses[i][:3, :3]
+        rec[k]['origin'] = poses[i][:3, 3]
+        offset += w * h
+    prefix = os.path.join(out_dir, f'level_{factor}')
+    np.save(prefix + '.frames.npy', rec)
+    if not offset:      # nothing to map; np.memmap cannot map an empty file
+        np.save(prefix + ('.tables.npy' if shared else '.dirs.npy'), np.zeros((0, 3), dtype=dtype))
+        if shared:
+            np.save(prefix + '.table_offsets.npy', np.zeros(1, dtype=np.int64))
+        return 0, 0, skipped
+    dirs_of = {}
+    with span('ray_tables', items=len(tables)):
+        for cam, t in tables.items():
+            dirs_of[t] = camera_directions(*cam, opengl=opengl)
+    if shared:
+        order = sorted(tables.values())
+        table_offsets = np.r_[0, np.cumsum([len(dirs_of[t]) for t in order])].astype(np.int64)
+        mm = np.lib.format.open_memmap(prefix + '.tables.npy.tmp', mode='w+', dtype=dtype, shape=(int(table_offsets[-1]), 3))
+        for t in order:
+            mm[table_offsets[t]:table_offsets[t + 1]] = dirs_of[t]
+        np.save(prefix + '.table_offsets.npy', table_offsets)
+    else:
+        mm = np.lib.format.open_memmap(prefix + '.dirs.npy.tmp', mode='w+', dtype=dtype, shape=(offset, 3))
+        with span('ray_dirs', items=offset):
+            for r in rec:
+                # world = R @ d for every pixel, one frame resident at a time
+                world = dirs_of[int(r['table'])] @ r['rotation'].T
+                world /= np.linalg.norm(world, axis=1, keepdims=True)
+                mm[r['offset']:r['offset'] + len(world)] = world
+    mm.flush()
+    del mm
+    name = prefix + ('.tables.npy' if shared else '.dirs.npy')
+    os.replace(name + '.tmp', name)
+    return len(ok), offset, skipped
+
+
+class RayCache:
+    """Memory-mapped rays of one level written by build_rays()."""
+
+    def __init__(self, path, level=1):
+        with open(os.path.join(path, 'index.json')) as f:
+            self.index = json.load(f)
+        meta = self.index['levels'][str(level)]
+        prefix = os.path.join(path, f'level_{level}')
+        self.frames = np.load(prefix + '.frames.npy')
+        self.offsets = np.r_[self.frames['offset'], meta['rays']]
+        self.shared = meta['shared']
+        if self.shared:
+            self.tables = np.load(prefix + '.tables.npy', mmap_mode='r')
+            self.table_offsets = np.load(prefix + '.table_offsets.npy')
+        else:
+            self.dirs = np.load(prefix + '.dirs.npy', mmap_mode='r')
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def frame_of(self, idx):
+        return np.searchsorted(self.offsets, idx, side='right') - 1
+
+    def check_pixels(self, store):
+        """Raise ValueError unless ray i and pixel i of pixels.PixelStore `store` are the same pixel."""
+        if len(self) != len(store) or not all(np.array_equal(self.frames[k], store.frames[k])
+                                              for k in ('frame', 'offset', 'w', 'h')):
+            raise ValueError(f"rays ({len(self.frames)} frames, {len(self)} rays) and pixels ({len(store.frames)} "
+                             f"frames, {len(store)} pixels) hold different frames; rebuild the rays with --pixels")
+
+    def rays(self, idx):
+        """(origins, unit directions), both (len(idx), 3) float32, for global ray indices."""
+        idx = np.asarray(idx, dtype=np.int64)
+        k = self.frame_of(idx)
+        origins = self.frames['origin'][k].astype(np.float32)
+        if not self.shared:
+            return origins, np.asarray(self.dirs[idx], dtype=np.float32)
+        rows = self.table_offsets[self.frames['table'][k]] + (idx - self.offsets[k])
+        cam = np.asarray(self.tables[rows], dtype=np.float32)
+        return origins, np.einsum('nij,nj->ni', self.frames['rotation'][k].astype(np.float32), cam)
+
+    def frame_rays(self, k):
+        """All rays of frame k as (h, w, 3) origins and directions."""
+        lo, hi = self.offsets[k], self.offsets[k + 1]
+        o, d = self.rays(np.arange(lo, hi))
+        shape = (int(self.frames['h'][k]), int(self.frames['w'][k]), 3)
+        return o.reshape(shape), d.reshape(shape)
+
+
+def build_rays(transforms, out_dir, levels=(1, 2, 4, 8), shared=False, dtype='float32', c2w=None, opengl=None,
+               pixels=None):
+    """Ray arrays for every level plus index.json; returns the index. `c2w` / `opengl` default
+    to poses.pose_convention() of the file. With `pixels` (a build_pixels() directory holding
+    every level) the frames follow that store."""
+    from .pixels import PixelStore
+    from .poses import invert_transforms, pose_convention
+    from .transforms_io import frame_poses
+    with open(transforms) as f:
+        data = json.load(f)
+    from .pixels import stored_frames
+    frames = data.get('frames', [])
+    base_dir = os.path.dirname(os.path.abspath(transforms))
+    poses = frame_poses(data, transforms)
+    ids = stored_frames(data, poses=poses)
+    c2w, opengl = pose_convention(data, c2w, opengl)
+    if not c2w and len(poses):
+        full = np.zeros((len(poses), 4, 4))
+        full[:, :3] = poses
+        full[:, 3, 3] = 1
+        poses = invert_transforms(full)[:, :3]
+    os.makedirs(out_dir, exist_ok=True)
+    index = {'version': 1, 'transforms': os.path.abspath(transforms), 'dtype': dtype,
+             'axes': 'opengl' if opengl else 'opencv', 'pixels': pixels and os.path.abspath(pixels), 'levels': {}}
+    for f in levels:
+        records = PixelStore(pixels, f).frames if pixels else None
+        n, rays, skipped = build_level(out_dir, base_dir, frames, poses, f, shared, dtype, opengl, ids, records)
+        index['levels'][str(f)] = {'frames': n, 'rays': rays, 'shared': shared,
+                                   'skipped': [frames[i].get('file_path') for i in skipped]}
+    with open(os.path.join(out_dir, 'index.json.tmp'), 'w') as fh:
+        json.dump(index, fh, indent=1)
+    os.replace(os.path.join(out_dir, 'index.json.tmp'), os.path.join(out_dir, 'index.json'))
+    return index
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Precompute memory-mapped ray bundles for every pyramid level.")
+    p.add_argument('--transforms', required=True)
+    p.add_argument('--out', help='output directory (default: rays/ next to transforms.json)')
+    p.add_argument('--levels', default='1,2,4,8', help='downscale factors (images, images_2, ...)')
+    p.add_argument('--shared', action='store_true', help='store one direction table per intrinsics instead of per-pixel world directions')
+    p.add_argument('--dtype', default='float32', choices=('float32', 'float16'))
+    g = p.add_mutually_exclusive_group()
+    g.add_argument('--c2w', dest='c2w', action='store_const', const=True, help='transform_matrix is camera-to-world')
+    g.add_argument('--w2c', dest='c2w', action='store_const', const=False, help='transform_matrix is world-to-camera')
+    g = p.add_mutually_exclusive_group()
+    g.add_argument('--opengl', dest='opengl', action='store_const', const=True, help='camera axes are OpenGL (z back)')
+    g.add_argument('--opencv', dest='opengl', action='store_const', const=False, help='camera axes are OpenCV (z forward)')
+    p.add_argument('--pixels', help='pixel store (python -m nerfprep pixels) whose frames and sizes the rays follow')
+    args = p.parse_args(argv)
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(args.transforms)), 'rays')
+    levels = sorted({int(f) for f in args.levels.split(',') if f})
+    index = build_rays(args.transforms, out, levels, args.shared, args.dtype, args.c2w, args.opengl, args.pixels)
+    for f, meta in index['levels'].items():
+        size = sum(os.path.getsize(os.path.join(out, n)) for n in os.listdir(out) if n.startswith(f'level_{f}.'))
+        print(f"level {f}: {meta['frames']} frames, {meta['rays']} rays, {size / (1 << 20):.1f} MB"
+              + (f", {len(meta['skipped'])} frames without image/pose/intrinsics" if meta['skipped'] else ''))
+    print("WROTE", out)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
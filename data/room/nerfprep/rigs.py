@@ -0,0 +1,133 @@
+"""
+Camera poses of multi-sensor rigs, from frames.{bin,txt} and rigs.{bin,txt}.
+
+A COLMAP frame is one capture instant of a rig: RIG_FROM_WORLD plus the
+images its sensors took. rigs.txt gives SENSOR_FROM_RIG for every sensor
+(identity for the reference sensor), so
+
+ cam_from_world = sensor_from_rig @ rig_from_world
+
+compose() evaluates this for every image of the model at once: the
+(frame, sensor) of each image is found with sorted lookups on packed ids,
+and the products are one batched matmul. Images on no frame, or on a sensor
+without a calibrated pose, keep their images.txt pose.
+
+compact_frames() is the transforms.json side: frames whose rig frame holds
+more than one of them get 'rig_frame' / 'rig_sensor' indices into the
+top-level 'rig_frames' and 'rig_sensors' lists instead of their own
+transform_matrix, so a rig pose is stored once however many cameras the rig
+has. 'rig_order' says how to multiply them back:
+ rig_sensor  transform_matrix = rig_frames[i] @ rig_sensors[j]   (--c2w)
+ sensor_rig  transform_matrix = rig_sensors[j] @ rig_frames[i]   (world-to-camera)
+transforms_io.frame_poses() and the sidecar resolve these automatically.
+"""
+import numpy as np
+from .poses import qvec_to_rotmat, rt_to_transforms
+
+CAMERA = 0      # colmap_io.SENSOR_TYPES
+
+
+def _key(rig_id, sensor_id):
+    return (np.asarray(rig_id, dtype=np.int64) << 32) | np.asarray(sensor_id, dtype=np.int64)
+
+
+def sensor_table(rigs):
+    """(sorted keys rig_id << 32 | camera_id, R (K,3,3), t (K,3)) sensor_from_rig of the
+    camera sensors with a known pose; the reference sensor is the identity."""
+    keys, qvecs, tvecs = [], [], []
+    for rig_id, rig in rigs.items():
+        ref = rig['ref_sensor']
+        if ref and ref[0] == CAMERA:
+            keys.append(_key(rig_id, ref[1]))
+            qvecs.append((1.0, 0.0, 0.0, 0.0))
+            tvecs.append((0.0, 0.0, 0.0))
+        for stype, sid, qvec, tvec in rig['sensors']:
+            if stype == CAMERA and qvec is not None:
+                keys.append(_key(rig_id, sid))
+                qvecs.append(qvec)
+                tvecs.append(tvec)
+    keys = np.array(keys, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    R = qvec_to_rotmat(np.array(qvecs, dtype=np.float64).reshape(-1, 4))
+    return keys[order], R[order], np.array(tvecs, dtype=np.float64).reshape(-1, 3)[order]
+
+
+def _lookup(sorted_keys, keys):
+    """Index of each key in `sorted_keys`, -1 where absent."""
+    pos = np.searchsorted(sorted_keys, keys)
+    pos = np.minimum(pos, max(len(sorted_keys) - 1, 0))
+    hit = (sorted_keys[pos] == keys) if len(sorted_keys) else np.zeros(len(keys), bool)
+    return np.where(hit, pos, -1)
+
+
+def compose(model):
+    """cam_from_world of every image of `model`, through its rig where it has one.
+
+    Returns {'R' (N,3,3), 't' (N,3), 'frame' (N,), 'sensor' (N,)} with frame/sensor
+    indices (-1 off-rig) into 'frame_R'/'frame_t'/'frame_ids'/'frame_rig' (rig_from_world)
+    and 'sensor_R'/'sensor_t'/'sensor_keys' (sensor_from_rig)."""
+    images = model['images']
+    n = len(images['name'])
+    R = qvec_to_rotmat(images['qvec']) if n else np.zeros((0, 3, 3))
+    t = np.asarray(images['tvec'], dtype=np.float64).reshape(-1, 3).copy()
+    frame = np.full(n, -1, dtype=np.int64)
+    sensor = np.full(n, -1, dtype=np.int64)
+    frames, rigs = model.get('frames'), model.get('rigs')
+    out = {'R': R, 't': t, 'frame': frame, 'sensor': sensor, 'frame_R': np.zeros((0, 3, 3)),
+           'frame_t': np.zeros((0, 3)), 'frame_ids': np.zeros(0, np.int64), 'frame_rig': np.zeros(0, np.int64),
+           'sensor_R': np.zeros((0, 3, 3)), 'sensor_t': np.zeros((0, 3)), 'sensor_keys': np.zeros(0, np.int64)}
+    if frames is None or rigs is None or not len(frames['id']):
+        return out
+    out['frame_R'] = qvec_to_rotmat(frames['qvec'])
+    out['frame_t'] = np.asarray(frames['tvec'], dtype=np.float64)
+    out['frame_ids'] = np.asarray(frames['id'], dtype=np.int64)
+    out['frame_rig'] = np.asarray(frames['rig_id'], dtype=np.int64)
+    out['sensor_keys'], out['sensor_R'], out['sensor_t'] = sensor_table(rigs)
+
+    data = frames['data']
+    of_data = np.repeat(np.arange(len(out['frame_ids'])), np.diff(frames['data_offsets']))
+    cam = data['sensor_type'] == CAMERA
+    f_idx = of_data[cam]
+    s_idx = _lookup(out['sensor_keys'], _key(out['frame_rig'][f_idx], data['sensor_id'][cam]))
+    # image ids -> image indices
+    ids = np.asarray(images['id'], dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    pos = _lookup(ids[order], data['data_id'][cam].astype(np.int64))
+    ok = (pos >= 0) & (s_idx >= 0)
+    img = order[pos[ok]]
+    frame[img], sensor[img] = f_idx[ok], s_idx[ok]
+
+    SR = out['sensor_R'][sensor[img]]
+    R[img] = SR @ out['frame_R'][frame[img]]
+    t[img] = np.einsum('nij,nj->ni', SR, out['frame_t'][frame[img]]) + out['sensor_t'][sensor[img]]
+    return out
+
+
+def compact_frames(data, rig, idx, c2w=False, opengl=False):
+    """Move the poses of frames sharing a rig frame to data['rig_frames'] / ['rig_sensors'].
+
+    `idx` is the image index of every frame in data['frames']; returns the
+    number of frames that now reference a rig pose instead of carrying one."""
+    idx = np.asarray(idx, dtype=np.int64)
+    f, s = rig['frame'][idx], rig['sensor'][idx]
+    on = (f >= 0) & (s >= 0)
+    shared = on & (np.bincount(f[on], minlength=len(rig['frame_ids']))[np.maximum(f, 0)] > 1)
+    if not shared.any():
+        return 0
+    uf, f_ref = np.unique(f[shared], return_inverse=True)
+    us, s_ref = np.unique(s[shared], return_inverse=True)
+    # c2w: world_from_rig @ rig_from_cam; w2c: cam_from_rig @ rig_from_world (camera axes flip on the sensor side)
+    RF = rt_to_transforms(rig['frame_R'][uf], rig['frame_t'][uf], invert=c2w).tolist()
+    RS = rt_to_transforms(rig['sensor_R'][us], rig['sensor_t'][us], invert=c2w, opengl=opengl).tolist()
+    keys = rig['sensor_keys'][us]
+    data['rig_order'] = 'rig_sensor' if c2w else 'sensor_rig'
+    data['rig_frames'] = [{'frame_id': int(i), 'rig_id': int(r), 'transform_matrix': m}
+                          for i, r, m in zip(rig['frame_ids'][uf].tolist(), rig['frame_rig'][uf].tolist(), RF)]
+    data['rig_sensors'] = [{'rig_id': int(k >> 32), 'camera_id': int(k & 0xFFFFFFFF), 'transform_matrix': m}
+                           for k, m in zip(keys.tolist(), RS)]
+    frames = data['frames']
+    for k, a, b in zip(np.flatnonzero(shared).tolist(), f_ref.tolist(), s_ref.tolist()):
+        fr = frames[k]
+        fr.pop('transform_matrix', None)
+        fr['rig_frame'], fr['rig_sensor'] = a, b
+    return int(shared.sum())
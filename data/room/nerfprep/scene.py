@@ -0,0 +1,77 @@
+"""
+Indexed in-memory view of a COLMAP model, parsed once per run.
+
+ scene = SceneModel.load('sparse/0')          # or SceneModel.from_root(ROOT)
+ i = scene.frame_image('images/frame_00001.jpeg')
+ cam = scene.camera_of(i)
+
+All lookups are dict hits: image name, basename, image id, camera id and the
+frame file_path -> image bindings recorded while matching.
+"""
+import os
+import numpy as np
+from .colmap_io import read_model, find_model_dir
+from .trace import span
+
+
+class SceneModel:
+    def __init__(self, model):
+        self.model = model
+        self.cameras = model['cameras']
+        self.images = model['images']
+        names = self.images['name']
+        self.by_name = {n: i for i, n in enumerate(names)}
+        self.by_basename = {}
+        for i, n in enumerate(names):
+            self.by_basename.setdefault(os.path.basename(n), i)
+        self.by_id = dict(zip(self.images['id'].tolist(), range(len(names))))
+        # camera id -> image indices, grouped with one argsort
+        cam_ids = self.images['camera_id']
+        order = np.argsort(cam_ids, kind='stable')
+        uniq, starts = np.unique(cam_ids[order], return_index=True)
+        self.by_camera = dict(zip(uniq.tolist(), np.split(order, starts[1:]))) if len(order) else {}
+        self.by_frame = {}
+
+    @classmethod
+    def load(cls, path, cache=True, **kw):
+        """Parse (or load from the parsed-model cache) the model at `path`."""
+        with span('parse_model', path=str(path)) as sp:
+            scene = cls(read_model(path, cache=cache, **kw))
+            sp.items = len(scene)
+        return scene
+
+    @classmethod
+    def from_root(cls, root, **kw):
+        """Model under a scene root (sparse/0, else sparse_txt), or None."""
+        path = find_model_dir(root)
+        return cls.load(path, **kw) if path else None
+
+    def __len__(self):
+        return len(self.images['name'])
+
+    @property
+    def names(self):
+        return self.images['name']
+
+    def bind(self, file_path, idx):
+        """Record that transforms.json `file_path` shows image `idx`."""
+        self.by_frame[file_path] = idx
+
+    def image_index(self, name):
+        """Index of an image by COLMAP name or basename, or None."""
+        idx = self.by_name.get(name)
+        return idx if idx is not None else self.by_basename.get(os.path.basename(name))
+
+    def frame_image(self, file_path):
+        """Index of the image behind a frame file_path: bound match first, then by name."""
+        idx = self.by_frame.get(file_path)
+        return idx if idx is not None else self.image_index(file_path)
+
+    def camera_id(self, idx):
+        return int(self.images['camera_id'][idx])
+
+    def camera_of(self, idx):
+        return None if idx is None else self.cameras.get(self.camera_id(idx))
+
+    def images_of_camera(self, camera_id):
+        return self.by_camera.get(camera_id, np.zeros(0, dtype=np.int64))
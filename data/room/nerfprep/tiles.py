@@ -0,0 +1,172 @@
+"""
+Octree level-of-detail tiling of point clouds for the web viewer.
+
+ python -m nerfprep.tiles --input dense/fused.ply --out web/tiles
+ python -m nerfprep.tiles --input sparse/0 --out web/tiles      # points3D
+
+Every octree node keeps at most one point per cell of a `grid`^3 lattice over
+its cube, picked in a fixed random order so each level is a uniform subsample;
+the points not taken go down to the children. A node with at most `leaf_size`
+remaining points keeps all of them and stops. Levels are built with one sort
+per level over the whole cloud, so there is no Python work per point.
+
+Output, consumed by web/main.js:
+ index.json      {'version', 'min', 'size', 'grid', 'points', 'nodes': {name: {'level', 'min', 'size', 'count'}}}
+ <name>.bin      count * 3 uint16 positions quantized to the node cube, then count * 3 uint8 colors
+
+Node names follow the octant path from the root 'r' ('r', 'r0' .. 'r7', 'r07', ...),
+octant digit = 4 * x + 2 * y + z bit.
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1', 'short': 'i2', 'int16': 'i2',
+             'ushort': 'u2', 'uint16': 'u2', 'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+             'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+
+
+def read_ply(path):
+    """Vertex table of a PLY file as a structured array (memory-mapped when binary)."""
+    with open(path, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            raise ValueError(f"{path} is not a PLY file")
+        fmt, fields, count, element = None, [], 0, None
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: truncated PLY header")
+            parts = line.decode('ascii').split()
+            if not parts:
+                continue
+            if parts[0] == 'format':
+                fmt = parts[1]
+            elif parts[0] == 'element':
+                element = parts[1]
+                if element == 'vertex':
+                    count = int(parts[2])
+            elif parts[0] == 'property' and element == 'vertex':
+                if parts[1] == 'list':
+                    raise ValueError(f"{path}: list properties on vertices are not supported")
+                fields.append((parts[2], PLY_TYPES[parts[1]]))
+            elif parts[0] == 'end_header':
+                break
+        offset = f.tell()
+    if fmt == 'ascii':
+        return np.loadtxt(path, dtype=np.dtype(fields), skiprows=_header_lines(path), max_rows=count, ndmin=1)
+    order = {'binary_little_endian': '<', 'binary_big_endian': '>'}.get(fmt)
+    if order is None:
+        raise ValueError(f"{path}: unknown PLY format {fmt}")
+    dtype = np.dtype([(name, order + t) for name, t in fields])
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def _header_lines(path):
+    with open(path, 'rb') as f:
+        for k, line in enumerate(f, 1):
+            if line.strip() == b'end_header':
+                return k
+    return 0
+
+
+def load_cloud(path):
+    """(xyz float32 (N,3), rgb uint8 (N,3)) from a .ply file or a COLMAP model directory."""
+    if os.path.isdir(path):
+        from .points import load_points
+        pts = load_points(path)
+        return pts['xyz'], pts['rgb']
+    v = read_ply(path)
+    xyz = np.empty((len(v), 3), dtype=np.float32)
+    xyz[:, 0], xyz[:, 1], xyz[:, 2] = v['x'], v['y'], v['z']
+    names = v.dtype.names
+    rgb = np.full((len(v), 3), 200, dtype=np.uint8)
+    for k, c in enumerate(('red', 'green', 'blue')):
+        if c in names:
+            rgb[:, k] = v[c]
+    return xyz, rgb
+
+
+def _pack(q, bits):
+    q = q.astype(np.int64)
+    return (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+
+def node_name(level, ix, iy, iz):
+    digits = [str(4 * ((ix >> k) & 1) + 2 * ((iy >> k) & 1) + ((iz >> k) & 1)) for k in range(level - 1, -1, -1)]
+    return 'r' + ''.join(digits)
+
+
+def build_tiles(xyz, rgb, out_dir, leaf_size=20000, grid=64, max_depth=12, seed=0):
+    """Write the tiles and index.json for a cloud; returns the index dict."""
+    n = len(xyz)
+    gbits = int(grid).bit_length() - 1
+    if 1 << gbits != grid:
+        raise ValueError("grid must be a power of two")
+    os.makedirs(out_dir, exist_ok=True)
+    lo = xyz.min(axis=0).astype(np.float64) if n else np.zeros(3)
+    size = float((xyz.max(axis=0) - lo).max()) * (1 + 1e-6) if n else 1.0
+    size = size or 1.0
+    bits = gbits + max_depth
+    # integer coordinates at the finest lattice, in a random priority order
+    order = np.random.default_rng(seed).permutation(n)
+    q = np.clip(((xyz[order] - lo) / size * (1 << bits)).astype(np.int64), 0, (1 << bits) - 1)
+    rem = np.arange(n)
+    nodes = {}
+    for level in range(max_depth + 1):
+        if not len(rem):
+            break
+        qd = q[rem] >> (max_depth - level)          # lattice of this level: grid << level per axis
+        node_key = _pack(qd >> gbits, level)
+        keys, inv, counts = np.unique(node_key, return_inverse=True, return_counts=True)
+        leaf = (counts <= leaf_size) | (level == max_depth)
+        take = leaf[inv]
+        # one point per lattice cell of the non-leaf nodes, the first in priority order
+        inner = np.flatnonzero(~take)
+        _, first = np.unique(_pack(qd[inner], gbits + level), return_index=True)
+        take[inner[first]] = True
+        sel = np.flatnonzero(take)
+        by_node = sel[np.argsort(inv[sel], kind='stable')]
+        bounds = np.r_[0, np.cumsum(np.bincount(inv[sel], minlength=len(keys)))]
+        side = size / (1 << level)
+        for k, key in enumerate(keys.tolist()):
+            idx = rem[by_node[bounds[k]:bounds[k + 1]]]
+            if not len(idx):
+                continue
+            mask = (1 << level) - 1
+            ix, iy, iz = key >> (2 * level), (key >> level) & mask, key & mask
+            nmin = lo + side * np.array([ix, iy, iz])
+            pts = order[idx]
+            pos = np.clip(np.round((xyz[pts] - nmin) / side * 65535), 0, 65535).astype('<u2')
+            name = node_name(level, ix, iy, iz)
+            with open(os.path.join(out_dir, name + '.bin'), 'wb') as f:
+                f.write(pos.tobytes())
+                f.write(np.ascontiguousarray(rgb[pts], dtype=np.uint8).tobytes())
+            nodes[name] = {'level': level, 'min': nmin.tolist(), 'size': side, 'count': int(len(idx))}
+        rem = rem[~take]
+    index = {'version': 1, 'min': lo.tolist(), 'size': size, 'grid': grid, 'points': int(n), 'nodes': nodes}
+    tmp = os.path.join(out_dir, 'index.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp, os.path.join(out_dir, 'index.json'))
+    return index
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Build octree LOD tiles for web/main.js from fused.ply or points3D.")
+    p.add_argument('--input', required=True, help='a .ply file (dense/fused.ply) or a COLMAP model directory')
+    p.add_argument('--out', required=True, help='tile directory, e.g. web/tiles')
+    p.add_argument('--leaf_size', type=int, default=20000, help='max points kept by a leaf node')
+    p.add_argument('--grid', type=int, default=64, help='sampling lattice per node and axis (power of two)')
+    p.add_argument('--max_depth', type=int, default=12)
+    args = p.parse_args(argv)
+
+    xyz, rgb = load_cloud(args.input)
+    index = build_tiles(xyz, rgb, args.out, args.leaf_size, args.grid, args.max_depth)
+    depth = max((v['level'] for v in index['nodes'].values()), default=0)
+    print(f"WROTE {len(index['nodes'])} tiles ({index['points']} points, depth {depth}) to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+"""
+Per-stage timing and memory tracing.
+
+ NERFPREP_TRACE=trace.json python build_transforms.py ...     # or trace.enable('trace.json')
+
+ with span('match', items=len(names)) as sp:
+     ...
+     sp.items = matched                # may be set inside the block
+
+ @traced('poses_to_transforms', items=len)
+ def poses_to_transforms(...): ...
+
+Each span records wall time, item count, items/s, current and peak RSS. At
+exit the spans are written as Chrome trace events (open in chrome://tracing
+or ui.perfetto.dev) and summarized on stderr. '{pid}' in the path is replaced
+by the process id, for scripts that start other scripts.
+
+Disabled (the default), span() returns a shared no-op object and traced
+functions are called directly, so instrumented code pays one global lookup.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+_events = None      # list of finished spans while enabled
+_path = None
+_t0 = 0
+_tids = {}
+
+
+def _rss_mb():
+    """(current RSS, peak RSS) of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            cur = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError):
+        cur = None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    except ImportError:
+        peak = None
+    return cur, peak
+
+
+class _Span:
+    __slots__ = ('name', 'items', 'args', 'start')
+
+    def __init__(self, name, items=None, args=None):
+        self.name, self.items, self.args = name, items, args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        if _events is not None:
+            _events.append((self.name, self.start, end, threading.get_ident(), self.items, self.args, _rss_mb()))
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+    items = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, key, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+def enabled():
+    return _events is not None
+
+
+def span(name, items=None, **args):
+    """Context manager timing a block; set `.items` to report a throughput."""
+    return _NULL if _events is None else _Span(name, items, args or None)
+
+
+def traced(name=None, items=None):
+    """Decorator form of span(); `items(result)` gives the item count."""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _events is None:
+                return fn(*a, **kw)
+            with _Span(label) as sp:
+                result = fn(*a, **kw)
+                if items is not None:
+                    sp.items = items(result)
+                return result
+        return wrapper
+    return deco
+
+
+def enable(path):
+    """Start recording; the trace goes to `path` at exit (or on write())."""
+    global _events, _path, _t0
+    if _events is None:
+        _events = []
+        _t0 = time.perf_counter_ns()
+        atexit.register(write)
+    _path = path.replace('{pid}', str(os.getpid()))
+
+
+def events():
+    """Finished spans as Chrome trace events ('X' complete events, microseconds)."""
+    pid = os.getpid()
+    out = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': os.path.basename(sys.argv[0]) or 'python'}}]
+    for name, start, end, tid, items, args, (rss, peak) in _events or ():
+        dur = (end - start) / 1e3
+        a = dict(args or {})
+        if items is not None:
+            a['items'] = items
+            a['items_per_s'] = round(items / (dur / 1e6), 1) if dur else None
+        a['rss_mb'], a['peak_rss_mb'] = rss and round(rss, 1), peak and round(peak, 1)
+        out.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': _tids.setdefault(tid, len(_tids)),
+                    'ts': (start - _t0) / 1e3, 'dur': dur, 'args': a})
+    return out
+
+
+def summary(stream=sys.stderr):
+    """One line per span name: calls, total seconds, items, items/s, peak RSS."""
+    agg = {}
+    for name, start, end, _, items, _, (_, peak) in _events or ():
+        a = agg.setdefault(name, [0, 0.0, 0, 0.0])
+        a[0] += 1
+        a[1] += (end - start) / 1e9
+        a[2] += items or 0
+        a[3] = max(a[3], peak or 0)
+    for name, (calls, secs, items, peak) in agg.items():
+        rate = f"{items / secs:12.0f}/s" if items and secs else ' ' * 14
+        print(f"[trace] {name:28s} {calls:5d}x {secs:9.3f}s {items:10d} {rate} peak {peak:8.1f} MB", file=stream)
+
+
+def write(path=None):
+    """Write the trace file now (also done automatically at exit)."""
+    path = path or _path
+    if _events is None or not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'traceEvents': events(), 'displayTimeUnit': 'ms'}, f)
+    os.replace(tmp, path)
+    summary()
+    print("[trace] wrote", path, file=sys.stderr)
+
+
+if os.environ.get('NERFPREP_TRACE'):
+    enable(os.environ['NERFPREP_TRACE'])
@@ -0,0 +1,225 @@
+"""
+Streaming transforms.json writer and the binary per-frame sidecar.
+
+Frames are written one per line as they come from the iterator, so the whole
+document is never built as one string and a 4x4 matrix takes one line instead
+of twenty:
+
+ {
+   "camera_angle_x": 0.75,
+   "frames": [
+     {"file_path": "images/frame_00001.jpeg", "transform_matrix": [[1.0, 0, ...], ...], "fl_x": 1393.4, ...},
+     ...
+   ]
+ }
+
+With sidecar=True the poses and intrinsics also go to <name>.frames.npy, one
+SIDECAR_DTYPE record per frame in frame order, which loaders can np.load with
+mmap_mode='r' instead of parsing JSON (96 bytes per frame). The JSON then
+ends with a freshness token,
+
+   "frames_sidecar": {"file": "transforms.frames.npy", "n": 23, "crc32": ..., "json_crc32": ...}
+
+holding the CRC-32 of the records and of every JSON byte before that line.
+fresh_sidecar() only hands out a sidecar whose token still matches both, so
+a transforms.json edited by hand or by another tool falls back to its own
+frames.
+
+Frames written with rig-compact poses (see rigs.py) reference 'rig_frames'
+and 'rig_sensors' instead of holding a transform_matrix; frame_poses() and
+the sidecar compose them back.
+"""
+import json
+import os
+import zlib
+import numpy as np
+from .trace import traced
+
+SIDECAR_DTYPE = np.dtype([
+    ('pose', '<f4', (3, 4)),                # top 3 rows of transform_matrix
+    ('fl_x', '<f4'), ('fl_y', '<f4'), ('cx', '<f4'), ('cy', '<f4'),
+    ('w', '<f4'), ('h', '<f4'),
+    ('distortion', '<f4', 6),               # k1, k2, k3, k4, p1, p2
+])
+SIDECAR_KEYS = ('fl_x', 'fl_y', 'cx', 'cy', 'w', 'h')
+DISTORTION_KEYS = ('k1', 'k2', 'k3', 'k4', 'p1', 'p2')
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def sidecar_path(json_path):
+    return os.path.splitext(str(json_path))[0] + '.frames.npy'
+
+
+def _npy_header(n):
+    """.npy v1.0 header for `n` records, padded to the size of the largest count so
+    the count can be patched in after streaming without moving the data."""
+    d = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }"
+    descr = np.lib.format.dtype_to_descr(SIDECAR_DTYPE)
+    size = len(_NPY_MAGIC) + 2 + len(d % (descr, 10 ** 19)) + 1
+    size += -size % 64
+    body = (d % (descr, n)).ljust(size - len(_NPY_MAGIC) - 2 - 1) + '\n'
+    return _NPY_MAGIC + len(body).to_bytes(2, 'little') + body.encode('latin1')
+
+
+_NAN_POSE = [float('nan')] * 12
+
+
+def sidecar_row(frame):
+    """Flat list of the 24 float fields of a SIDECAR_DTYPE record."""
+    M = frame.get('transform_matrix')
+    row = [v for r in M[:3] for v in r] if M is not None else list(_NAN_POSE)
+    row += [frame.get(k, float('nan')) for k in SIDECAR_KEYS]
+    row += [frame.get(k, 0.0) for k in DISTORTION_KEYS]
+    return row
+
+
+class SidecarWriter:
+    """Append SIDECAR_DTYPE records to a .npy file whose length is only known at close()."""
+
+    def __init__(self, path, batch=4096):
+        self.path = path
+        self.tmp = path + '.tmp'
+        self.f = open(self.tmp, 'wb')
+        self.f.write(_npy_header(0))
+        self.n = 0
+        self.crc = 0
+        self.batch = batch
+        self.rows = []
+
+    def add(self, frame):
+        self.rows.append(sidecar_row(frame))
+        if len(self.rows) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            # every field is <f4, so a (n, 24) float32 block has the record layout
+            block = np.asarray(self.rows, dtype='<f4').tobytes()
+            self.crc = zlib.crc32(block, self.crc)
+            self.f.write(block)
+            self.n += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.f.seek(0)
+        self.f.write(_npy_header(self.n))
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+
+def rig_poses(data, frames):
+    """(N,4,4) composed poses of rig-compact `frames` (each with rig_frame/rig_sensor)."""
+    A = np.array([data['rig_frames'][fr['rig_frame']]['transform_matrix'] for fr in frames], dtype=np.float64)
+    B = np.array([data['rig_sensors'][fr['rig_sensor']]['transform_matrix'] for fr in frames], dtype=np.float64)
+    A, B = A.reshape(-1, 4, 4), B.reshape(-1, 4, 4)
+    return A @ B if data.get('rig_order') == 'rig_sensor' else B @ A
+
+
+@traced('write_transforms', items=lambda n: n)
+def write_transforms(path, data, frames=None, sidecar=None):
+    """Stream `data` (top-level keys) plus `frames` (any iterable, defaults to
+    data['frames']) to `path`; returns the number of frames written.
+
+    sidecar=None rewrites the sidecar only if `data` already references one, so
+    a read-modify-write never leaves a stale .frames.npy behind."""
+    crc = 0
+
+    def put(text):
+        nonlocal crc
+        b = text.encode()
+        crc = zlib.crc32(b, crc)
+        f.write(b)
+
+    frames = data.get('frames', []) if frames is None else frames
+    head = {k: v for k, v in data.items() if k not in ('frames', 'frames_sidecar')}
+    if sidecar is None:
+        sidecar = 'frames_sidecar' in data
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    side = SidecarWriter(sidecar_path(path)) if sidecar else None
+    n = 0
+    tmp = str(path) + '.tmp'
+    with open(tmp, 'wb') as f:
+        put('{\n')
+        for k, v in head.items():
+            put(f'  {json.dumps(k)}: {json.dumps(v)},\n')
+        put('  "frames": [')
+        for fr in frames:
+            put(',\n    ' if n else '\n    ')
+            put(json.dumps(fr))
+            if side:
+                side.add(dict(fr, transform_matrix=rig_poses(data, [fr])[0].tolist()) if 'rig_frame' in fr else fr)
+            n += 1
+        if side:
+            put('\n  ],\n' if n else '],\n')
+            side.close()
+            token = {'file': os.path.basename(side.path), 'n': side.n, 'crc32': side.crc, 'json_crc32': crc}
+            f.write(f'  "frames_sidecar": {json.dumps(token)}\n}}\n'.encode())
+        else:
+            put('\n  ]\n}\n' if n else ']\n}\n')
+    os.replace(tmp, path)
+    return n
+
+
+def load_sidecar(json_path_or_npy):
+    """Memory-map the frames sidecar of a transforms.json (or the .npy itself).
+
+    Does not check that it matches the JSON; see fresh_sidecar()."""
+    p = str(json_path_or_npy)
+    return np.load(p if p.endswith('.npy') else sidecar_path(p), mmap_mode='r')
+
+
+def fresh_sidecar(data, json_path):
+    """The memory-mapped sidecar of `data` (loaded from `json_path`), or None when
+    there is none or its token no longer matches the JSON file and the records."""
+    token = data.get('frames_sidecar')
+    if json_path is None or not isinstance(token, dict):
+        return None
+    try:
+        with open(json_path, 'rb') as f:
+            buf = f.read()
+        end = buf.rfind(b'\n  "frames_sidecar": ') + 1
+        if not end or zlib.crc32(memoryview(buf)[:end]) != token['json_crc32']:
+            return None
+        side = np.load(os.path.join(os.path.dirname(os.path.abspath(json_path)), token['file']), mmap_mode='r')
+        if not (len(side) == token['n'] == len(data.get('frames', []))) or zlib.crc32(side) != token['crc32']:
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return side
+
+
+def _pose_rows(M):
+    """(3,4) top rows of one transform_matrix, NaN when it is missing, misshapen or not numeric."""
+    try:
+        rows = np.asarray(M[:3], dtype=np.float64)
+        if rows.shape == (3, 4):
+            return rows
+    except (TypeError, ValueError, IndexError, KeyError):
+        pass
+    return np.full((3, 4), np.nan)
+
+
+def frame_poses(data, json_path=None):
+    """(N,3,4) float64 top rows of every frame's transform_matrix, NaN where missing or malformed.
+
+    Read from the sidecar when fresh_sidecar() accepts it, which avoids touching
+    the nested JSON lists."""
+    frames = data.get('frames', [])
+    side = fresh_sidecar(data, json_path)
+    if side is not None:
+        return np.asarray(side['pose'], dtype=np.float64)
+    try:
+        # the common case: every frame holds a numeric 4x4 (or 3x4) matrix
+        poses = np.array([fr['transform_matrix'] for fr in frames], dtype=np.float64)
+        if poses.shape[1:] not in ((4, 4), (3, 4)):
+            raise ValueError(poses.shape)
+        poses = poses[:, :3].reshape(-1, 3, 4)
+    except (KeyError, TypeError, ValueError, IndexError):
+        poses = np.stack([_pose_rows(fr.get('transform_matrix')) for fr in frames]).reshape(-1, 3, 4) \
+            if frames else np.zeros((0, 3, 4))
+    if 'rig_frames' in data:
+        on = [i for i, fr in enumerate(frames) if 'rig_frame' in fr]
+        if on:
+            poses[on] = rig_poses(data, [frames[i] for i in on])[:, :3]
+    return poses
@@ -0,0 +1,206 @@
+"""
+Undistort frames to pinhole images, one remap table per camera.
+
+ python -m nerfprep.undistort --transforms nerfstudio/transforms.json --workers 8
+ python build_transforms.py ... --stages poses,intrinsics,wh,distortion,undistort
+
+Frames are grouped by their camera (size, fl_x/fl_y/cx/cy, camera_model and
+k1..k4/p1/p2 as written by the distortion stage). For each group the source
+pixel of every output pixel is computed once over the whole grid and cached
+in <base>/.undistort_maps as a memory-mappable .npy (flat index of the
+top-left neighbour + bilinear weights), so workers only gather and blend.
+Undistorted images go to <base>/images_undistorted/ and the frames are
+rewritten to point at them with the same fl/cx/cy and no distortion terms.
+Images resized after COLMAP (e.g. 1097x1464 frames of a 1200x1600 camera)
+get their intrinsics scaled to the size on disk first.
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .trace import span
+from .transforms_io import DISTORTION_KEYS, write_transforms
+
+MAP_DIR = '.undistort_maps'
+OUT_SUBDIR = 'images_undistorted'
+LUT_DTYPE = np.dtype([('idx', '<i4'), ('wx', '<f4'), ('wy', '<f4')])
+
+
+def camera_key(frame):
+    """Hashable camera of a frame, or None if it has no distortion to remove."""
+    coeffs = tuple(float(frame.get(k, 0.0)) for k in DISTORTION_KEYS)
+    if not any(coeffs) or not all(k in frame for k in ('w', 'h', 'fl_x', 'fl_y', 'cx', 'cy')):
+        return None
+    return (frame.get('camera_model', 'OPENCV'), int(frame['w']), int(frame['h']),
+            float(frame['fl_x']), float(frame['fl_y']), float(frame['cx']), float(frame['cy'])) + coeffs
+
+
+def distort(x, y, model, k1=0.0, k2=0.0, k3=0.0, k4=0.0, p1=0.0, p2=0.0):
+    """Distorted normalized coordinates for undistorted (x, y), nerfstudio/OpenCV models."""
+    r2 = x * x + y * y
+    if model == 'OPENCV_FISHEYE':
+        r = np.sqrt(r2)
+        theta = np.arctan(r)
+        t2 = theta * theta
+        thetad = theta * (1 + t2 * (k1 + t2 * (k2 + t2 * (k3 + t2 * k4))))
+        scale = np.where(r > 1e-8, thetad / np.maximum(r, 1e-8), 1.0)
+        return x * scale, y * scale
+    radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+    xy = x * y
+    return (x * radial + 2 * p1 * xy + p2 * (r2 + 2 * x * x),
+            y * radial + p1 * (r2 + 2 * y * y) + 2 * p2 * xy)
+
+
+def undistort_lut(key):
+    """Remap table for a camera_key: per output pixel the flat index of the
+    top-left source pixel (-1 outside the image) and the bilinear weights."""
+    model, w, h, fx, fy, cx, cy = key[:7]
+    coeffs = dict(zip(DISTORTION_KEYS, key[7:]))
+    # pixel centers sit at +0.5, as in COLMAP
+    u = (np.arange(w, dtype=np.float64) + 0.5 - cx) / fx
+    v = (np.arange(h, dtype=np.float64) + 0.5 - cy) / fy
+    x, y = np.meshgrid(u, v)
+    xd, yd = distort(x, y, model, **coeffs)
+    sx = (fx * xd + cx - 0.5).ravel()
+    sy = (fy * yd + cy - 0.5).ravel()
+    # border pixels blend with weight 0/1 from the inner neighbour; allow a
+    # rounding-sized overshoot so an identity map keeps the whole image
+    x0, y0 = np.clip(np.floor(sx), 0, w - 2), np.clip(np.floor(sy), 0, h - 2)
+    lut = np.empty(w * h, dtype=LUT_DTYPE)
+    eps = 1e-3
+    inside = (sx >= -eps) & (sx <= w - 1 + eps) & (sy >= -eps) & (sy <= h - 1 + eps)
+    lut['idx'] = np.where(inside, y0 * w + x0, -1)
+    lut['wx'] = sx - x0
+    lut['wy'] = sy - y0
+    return lut
+
+
+def lut_path(map_dir, key):
+    return os.path.join(map_dir, hashlib.blake2b(repr(key).encode(), digest_size=10).hexdigest() + '.npy')
+
+
+def cached_lut(map_dir, key):
+    """Path of the remap table for `key`, computed and saved on first use."""
+    path = lut_path(map_dir, key)
+    if not os.path.exists(path):
+        os.makedirs(map_dir, exist_ok=True)
+        with span('undistort_lut', items=key[1] * key[2]):
+            lut = undistort_lut(key)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, lut)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def remap(img, lut, w):
+    """Bilinear gather of `img` (H, W[, C]) through a remap table."""
+    flat = img.reshape(len(lut), -1).astype(np.float32)
+    i = lut['idx']
+    valid = i >= 0
+    i = np.where(valid, i, 0)
+    wx, wy = lut['wx'][:, None], lut['wy'][:, None]
+    top = flat[i] * (1 - wx) + flat[i + 1] * wx
+    bottom = flat[i + w] * (1 - wx) + flat[i + w + 1] * wx
+    out = top * (1 - wy) + bottom * wy
+    out[~valid] = 0
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8).reshape(img.shape)
+
+
+_luts = {}
+
+
+def _job(args):
+    src, dst, path, w, h, quality = args
+    try:
+        from PIL import Image
+        lut = _luts.get(path)
+        if lut is None:
+            lut = _luts[path] = np.load(path, mmap_mode='r')
+        with Image.open(src) as im:
+            if im.size != (w, h):
+                return src, f"image is {im.size[0]}x{im.size[1]}, frame says {w}x{h}"
+            img = np.asarray(im.convert('RGB') if im.mode not in ('RGB', 'L') else im)
+        out = Image.fromarray(remap(img, lut, w))
+        tmp = dst + '.tmp'
+        fmt = 'PNG' if dst.lower().endswith('.png') else 'JPEG'
+        out.save(tmp, format=fmt, **({'quality': quality} if fmt == 'JPEG' else {}))
+        os.replace(tmp, dst)
+        return src, None
+    except Exception as e:
+        return src, repr(e)
+
+
+def scaled_camera(frame, size):
+    """Frame intrinsics rescaled to the image size on disk (images resized after COLMAP)."""
+    cam = {k: frame[k] for k in ('fl_x', 'fl_y', 'cx', 'cy', 'w', 'h') if k in frame}
+    if size and 'w' in cam and 'h' in cam and (size[0], size[1]) != (cam['w'], cam['h']):
+        sx, sy = size[0] / cam['w'], size[1] / cam['h']
+        cam.update(fl_x=cam['fl_x'] * sx, cx=cam['cx'] * sx, fl_y=cam['fl_y'] * sy, cy=cam['cy'] * sy,
+                   w=size[0], h=size[1])
+    return cam
+
+
+def undistort_frames(data, base_dir, out_subdir=OUT_SUBDIR, workers=None, force=False, quality=95):
+    """Undistort every distorted frame of `data` and point it at the new image.
+
+    Returns (written, skipped, errors); frames that fail keep their old entry."""
+    from .imagesize import probe_sizes, CACHE_NAME
+    map_dir = os.path.join(base_dir, MAP_DIR)
+    out_dir = os.path.join(base_dir, out_subdir)
+    frames = [fr for fr in data.get('frames', []) if camera_key(fr)]
+    paths = [os.path.join(base_dir, fr['file_path']) for fr in frames]
+    sizes, _ = probe_sizes(paths, cache_path=os.path.join(base_dir, CACHE_NAME)) if paths else ({}, [])
+    os.makedirs(out_dir, exist_ok=True)
+    jobs, skipped, done, luts = [], 0, [], {}
+    for fr, src in zip(frames, paths):
+        cam = scaled_camera(fr, sizes.get(src))
+        key = camera_key(dict(fr, **cam))
+        if key not in luts:
+            luts[key] = cached_lut(map_dir, key)
+        dst = os.path.join(out_dir, os.path.basename(fr['file_path']))
+        done.append((fr, src, cam))
+        if not force and os.path.exists(dst) and os.path.exists(src) \
+                and os.stat(dst).st_mtime_ns >= os.stat(src).st_mtime_ns:
+            skipped += 1
+            continue
+        jobs.append((src, dst, luts[key], key[1], key[2], quality))
+    failed = {}
+    if jobs:
+        chunk = max(1, len(jobs) // (8 * (workers or os.cpu_count() or 1)))
+        with span('undistort_images', items=len(jobs)), ProcessPoolExecutor(max_workers=workers) as pool:
+            failed = {src: err for src, err in pool.map(_job, jobs, chunksize=chunk) if err}
+    for fr, src, cam in done:
+        if src in failed:
+            continue
+        fr.update(cam)
+        fr['file_path'] = f"{out_subdir}/{os.path.basename(fr['file_path'])}"
+        for k in DISTORTION_KEYS:
+            fr.pop(k, None)
+        fr['camera_model'] = 'OPENCV'
+    return len(jobs) - len(failed), skipped, sorted(failed.items())
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Undistort transforms.json frames to pinhole images.")
+    p.add_argument('--transforms', required=True)
+    p.add_argument('--out_subdir', default=OUT_SUBDIR, help='directory next to transforms.json for the new images')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--quality', type=int, default=95)
+    p.add_argument('--force', action='store_true', help='rewrite images that are up to date')
+    args = p.parse_args(argv)
+
+    with open(args.transforms) as f:
+        data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.transforms))
+    written, skipped, errors = undistort_frames(data, base_dir, args.out_subdir, args.workers, args.force, args.quality)
+    write_transforms(args.transforms, data)
+    print(f"Undistorted {written} frames, {skipped} up to date, {len(errors)} failed. Wrote {args.transforms}")
+    for src, err in errors[:20]:
+        print("  ERR", src, err)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,181 @@
+"""
+Keep transforms.json up to date while a capture is running.
+
+ python -m nerfprep watch --root ~/nerf_project/data/room --interval 1
+ python -m nerfprep watch --colmap_dir sparse/0 --images_dir nerfstudio/images --out nerfstudio/transforms.json --once
+
+Every `interval` seconds the images directory and the model directory are
+listed with os.scandir and compared with the previous listing (name, size,
+mtime). Only the frames behind added, removed or rewritten images are
+rebuilt: new files are matched against the COLMAP names that have no file
+yet, and the poses, intrinsics, w/h and distortion stages of pipeline.py run
+on just those frames. A changed model is reloaded (through the parsed-model
+cache) and keeps the name -> file assignments it can; its poses are
+recomputed for all frames in one batched pass. transforms.json is rewritten
+through a temp file and rename, so readers never see a partial file.
+"""
+import argparse
+import os
+import struct
+import time
+from .paths import add_scene_args, resolve_scene_args
+from .pipeline import new_context, stage_distortion, stage_intrinsics, stage_wh
+from .trace import span
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def snapshot(path, exts=None):
+    """{name: (size, mtime_ns)} of the files in `path` ({} if it does not exist)."""
+    out = {}
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                if exts and not e.name.lower().endswith(exts):
+                    continue
+                try:
+                    if e.is_file():
+                        st = e.stat()
+                        out[e.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return out
+
+
+def diff(old, new):
+    """(added, removed, changed) names between two snapshots."""
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    changed = {k for k in new.keys() & old.keys() if new[k] != old[k]}
+    return added, removed, changed
+
+
+class Watcher:
+    def __init__(self, colmap_dir, images_dir, out, c2w=False, opengl=False, fuzzy=True, sidecar=False):
+        self.colmap_dir, self.images_dir, self.out = colmap_dir, images_dir, out
+        self.c2w, self.opengl, self.fuzzy, self.sidecar = c2w, opengl, fuzzy, sidecar
+        self.base_dir = os.path.dirname(os.path.abspath(out))
+        self.prefix = os.path.basename(os.path.normpath(images_dir))
+        self.model_snap, self.image_snap = {}, {}
+        self.scene = None
+        self.assign = {}        # COLMAP image index -> file name
+        self.frames = {}        # COLMAP image index -> frame dict
+        self.data = {}
+
+    def _reload_model(self):
+        from .poses import CONVENTION_KEY
+        from .scene import SceneModel
+        old = self.scene
+        self.scene = SceneModel.load(self.colmap_dir)
+        if old is not None:
+            by_name = {old.names[i]: f for i, f in self.assign.items()}
+            self.assign = {self.scene.by_name[n]: f for n, f in by_name.items() if n in self.scene.by_name}
+        self.frames = {}
+        self.data = {CONVENTION_KEY: {'c2w': bool(self.c2w), 'opengl': bool(self.opengl)}}
+        if self.scene.cameras:
+            import math
+            cam = next(iter(self.scene.cameras.values()))
+            self.data['camera_angle_x'] = 2.0 * math.atan(cam['width'] / (2.0 * cam['params'][0]))
+        return set(self.assign)
+
+    def _build(self, dirty):
+        """Rebuild the frames of COLMAP image indices `dirty` with the pipeline stages."""
+        from .poses import poses_to_transforms
+        idx = sorted(dirty)
+        images = self.scene.images
+        M = poses_to_transforms(images['qvec'][idx], images['tvec'][idx], invert=self.c2w, opengl=self.opengl).tolist()
+        sub = {k: v for k, v in self.data.items() if k != 'frames'}
+        sub['frames'] = []
+        for i, m in zip(idx, M):
+            fr = {'file_path': f"{self.prefix}/{self.assign[i]}", 'transform_matrix': m}
+            self.scene.bind(fr['file_path'], i)
+            sub['frames'].append(fr)
+        ctx = new_context(self.scene, base_dir=self.base_dir, images_dir=self.images_dir)
+        stage_intrinsics(sub, ctx)
+        stage_wh(sub, ctx)
+        stage_distortion(sub, ctx)
+        self.frames.update(zip(idx, sub['frames']))
+
+    def poll(self):
+        """One scan; returns (added, removed, rebuilt) counts, or None when nothing changed."""
+        from .colmap_io import detect_format
+        from .matching import match_names
+        model_snap = snapshot(self.colmap_dir)
+        image_snap = snapshot(self.images_dir, IMAGE_EXTS)
+        model_changed = model_snap != self.model_snap
+        added, removed, changed = diff(self.image_snap, image_snap)
+        if not (model_changed or added or removed or changed):
+            return None
+        dirty = set()
+        if model_changed:
+            if detect_format(self.colmap_dir) is None:
+                return None         # model being written or not there yet; retry next poll
+            try:
+                dirty = self._reload_model()
+            except (ValueError, IndexError, struct.error, OSError):
+                return None         # half-written model file; the next poll sees it change again
+        if self.scene is None:
+            return None             # images before the model: matched once it loads
+        # remember the listings only once they have been acted on
+        self.model_snap, self.image_snap = model_snap, image_snap
+
+        gone = {i for i, f in self.assign.items() if f in removed}
+        for i in gone:
+            del self.assign[i]
+            self.frames.pop(i, None)
+        dirty -= gone
+        dirty |= {i for i, f in self.assign.items() if f in changed}
+
+        if added or removed or model_changed:
+            free = sorted(set(image_snap) - set(self.assign.values()))
+            todo = [i for i in range(len(self.scene)) if i not in self.assign]
+            if free and todo:
+                for i, f in zip(todo, match_names([self.scene.names[i] for i in todo], free, fuzzy=self.fuzzy)):
+                    if f:
+                        self.assign[i] = f
+                        dirty.add(i)
+        if dirty:
+            self._build(dirty)
+        self.write()
+        return len(added), len(removed), len(dirty)
+
+    def write(self):
+        from .transforms_io import write_transforms
+        self.data['frames'] = [self.frames[i] for i in sorted(self.frames)]
+        write_transforms(self.out, self.data, sidecar=self.sidecar)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Watch the images and model directories and update transforms.json incrementally.")
+    add_scene_args(p)
+    p.add_argument('--interval', type=float, default=1.0, help='seconds between scans')
+    p.add_argument('--once', action='store_true', help='one scan, then exit')
+    p.add_argument('--c2w', action='store_true', help='write camera-to-world matrices')
+    p.add_argument('--opengl', action='store_true', help='flip camera axes to the OpenGL convention')
+    p.add_argument('--exact', action='store_true', help='no fuzzy filename matching')
+    p.add_argument('--sidecar', action='store_true', help='also write <out>.frames.npy')
+    args = resolve_scene_args(p.parse_args(argv))
+
+    w = Watcher(args.colmap_dir, args.images_dir, args.out, args.c2w, args.opengl, not args.exact, args.sidecar)
+    print(f"Watching {args.images_dir} and {args.colmap_dir} -> {args.out}", flush=True)
+    try:
+        while True:
+            t = time.perf_counter()
+            with span('watch_poll') as sp:
+                res = w.poll()
+                sp.items = res and res[2]
+            if res:
+                added, removed, rebuilt = res
+                print(f"[{time.strftime('%H:%M:%S')}] +{added} -{removed} images, {rebuilt} frames rebuilt, "
+                      f"{len(w.frames)} frames, {1000 * (time.perf_counter() - t):.0f} ms", flush=True)
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
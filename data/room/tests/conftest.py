@@ -0,0 +1,5 @@
+import os
+import sys
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOM)
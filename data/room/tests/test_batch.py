@@ -0,0 +1,51 @@
+import os
+import time
+
+from nerfprep.batch import discover, estimate_mb, run_batch
+
+
+def _scene(root, model, files, images=True):
+    os.makedirs(os.path.join(root, model))
+    for f in files:
+        with open(os.path.join(root, model, f), 'wb') as fh:
+            fh.write(b'\0' * 1024)
+    if images:
+        os.makedirs(os.path.join(root, 'nerfstudio', 'images'))
+
+
+def test_discover_uses_model_layouts(tmp_path):
+    _scene(tmp_path / 'a', 'sparse/0', ['cameras.bin', 'images.bin', 'rigs.bin'])
+    _scene(tmp_path / 'g' / 'b', 'sparse_txt', ['cameras.txt', 'images.txt'])
+    _scene(tmp_path / 'c', 'sparse/0', ['cameras.bin', 'images.bin'], images=False)
+    _scene(tmp_path / 'd', 'sparse_txt', ['cameras.txt'])
+    _scene(tmp_path / 'e', 'sparse/1', ['cameras.bin', 'images.bin'])
+    assert discover(str(tmp_path)) == [str(tmp_path / 'a'), str(tmp_path / 'g' / 'b')]
+    assert estimate_mb(str(tmp_path / 'a')) == 80 + 3 * 3072 / (1 << 20)
+
+
+def _fake_main(argv):
+    # runs in the forked workers: one scene kills its process, the others take a moment
+    root = argv[argv.index('--root') + 1]
+    if root.endswith('bad'):
+        os._exit(9)
+    time.sleep(0.5)
+    return 0
+
+
+def test_crashing_scene_is_isolated(tmp_path, monkeypatch):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    import nerfprep.batch
+    import nerfprep.pipeline
+    monkeypatch.setattr(nerfprep.pipeline, 'main', _fake_main)
+    # forked workers, so they see the patched pipeline
+    monkeypatch.setattr(nerfprep.batch, '_pool', lambda jobs: ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context('fork')))
+    scenes = []
+    for name in ('a', 'bad', 'c', 'd'):
+        _scene(tmp_path / name, 'sparse/0', ['cameras.bin', 'images.bin'])
+        scenes.append(str(tmp_path / name))
+    done = []
+    results = run_batch(scenes, jobs=4, on_done=done.append)
+    assert [r['status'] for r in results] == ['ok', 'crashed', 'ok', 'ok']
+    assert sorted(r['scene'] for r in done) == scenes
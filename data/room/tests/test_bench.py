@@ -0,0 +1,17 @@
+import json
+import os
+
+from nerfprep.bench import make_scene, run_stage
+
+
+def test_stages_ignore_exported_root(tmp_path, monkeypatch):
+    fake = tmp_path / 'fakeroot'
+    os.makedirs(fake / 'nerfstudio' / 'images')
+    monkeypatch.setenv('NERFPREP_ROOT', str(fake))
+    home, room, model_dir = make_scene(str(tmp_path / 'work'), 5, 'txt', 'frame')
+    for stage in ('build_transforms', 'add_wh', 'make_symlinks'):
+        assert run_stage(stage, home, room, model_dir)[2] == 0, open(os.path.join(home, f'{stage}.log')).read()
+    with open(os.path.join(room, 'nerfstudio', 'transforms.json')) as f:
+        assert len(json.load(f)['frames']) == 5
+    assert sorted(os.listdir(fake / 'nerfstudio')) == ['images']
+    assert not os.listdir(fake / 'nerfstudio' / 'images')
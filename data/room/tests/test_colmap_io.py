@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+from nerfprep.colmap_io import read_images_txt, read_model, write_model
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _by_id(table):
+    order = np.argsort(table['id'], kind='stable')
+    return {k: [v[i] for i in order] if isinstance(v, list) else v[order] for k, v in table.items()}
+
+
+def _same_images_and_points(a, b):
+    ia, ib = _by_id(a['images']), _by_id(b['images'])
+    np.testing.assert_array_equal(ia['id'], ib['id'])
+    np.testing.assert_array_equal(ia['camera_id'], ib['camera_id'])
+    np.testing.assert_array_equal(ia['num_points2D'], ib['num_points2D'])
+    assert ia['name'] == ib['name']
+    np.testing.assert_allclose(ia['qvec'], ib['qvec'], atol=1e-12)
+    np.testing.assert_allclose(ia['tvec'], ib['tvec'], atol=1e-12)
+
+    pa, pb = a['points3D'], b['points3D']
+    np.testing.assert_array_equal(pa['id'], pb['id'])
+    np.testing.assert_array_equal(pa['xyz'], pb['xyz'])
+    np.testing.assert_array_equal(pa['rgb'], pb['rgb'])
+    np.testing.assert_array_equal(pa['error'], pb['error'])
+    np.testing.assert_array_equal(pa['track_offsets'], pb['track_offsets'])
+    np.testing.assert_array_equal(pa['track'], pb['track'])
+    assert pa['track_offsets'][-1] == len(pa['track'])
+    assert set(pa['track']['image_id'].tolist()) <= set(ia['id'].tolist())
+
+
+def test_bin_and_txt_agree():
+    a = read_model(os.path.join(ROOM, 'sparse/0'), points3D=True)
+    b = read_model(os.path.join(ROOM, 'sparse_txt'), points3D=True)
+    assert a['cameras'].keys() == b['cameras'].keys()
+    for cid, cam in a['cameras'].items():
+        assert (cam['model'], cam['width'], cam['height']) == \
+               (b['cameras'][cid]['model'], b['cameras'][cid]['width'], b['cameras'][cid]['height'])
+        np.testing.assert_allclose(cam['params'], b['cameras'][cid]['params'], rtol=1e-12)
+    _same_images_and_points(a, b)
+
+
+def test_undistorted_model_keeps_poses_and_points():
+    a = read_model(os.path.join(ROOM, 'sparse/0'), points3D=True)
+    b = read_model(os.path.join(ROOM, 'dense', 'sparse'), points3D=True)
+    assert a['cameras'].keys() == b['cameras'].keys()
+    assert {c['model'] for c in b['cameras'].values()} == {'PINHOLE'}
+    _same_images_and_points(a, b)
+
+
+def test_frames_and_rigs_agree():
+    a, b = read_model(os.path.join(ROOM, 'sparse/0')), read_model(os.path.join(ROOM, 'sparse_txt'))
+    assert (a['format'], b['format']) == ('bin', 'txt')
+    for k in ('id', 'rig_id', 'data_offsets', 'data'):
+        np.testing.assert_array_equal(a['frames'][k], b['frames'][k])
+    np.testing.assert_allclose(a['frames']['qvec'], b['frames']['qvec'], atol=1e-12)
+    np.testing.assert_allclose(a['frames']['tvec'], b['frames']['tvec'], atol=1e-12)
+    assert a['rigs'] == b['rigs']
+
+
+def test_names_with_spaces():
+    names = read_model(os.path.join(ROOM, 'sparse_txt'))['images']['name']
+    assert sorted(names) == ['WhatsApp Image 2025-12-08 at 12.50.19 PM.jpeg',
+                             'WhatsApp Image 2025-12-08 at 12.50.20 PM (2).jpeg',
+                             'WhatsApp Image 2025-12-08 at 12.50.21 PM (1).jpeg']
+
+
+def test_names_with_spaces_round_trip(tmp_path):
+    src = read_model(os.path.join(ROOM, 'sparse/0'))
+    names = ['a  b.jpg', 'sub dir/c d (1).jpg', 'plain.jpg']
+    model = {'cameras': src['cameras'], 'images': dict(src['images'], name=names)}
+    for ext in ('bin', 'txt'):
+        write_model(str(tmp_path / ext), model, ext)
+        assert read_model(str(tmp_path / ext))['images']['name'] == names
+
+
+def test_text_reader_keeps_points_line(tmp_path):
+    path = tmp_path / 'images.txt'
+    path.write_text("# comment\n"
+                    "1 1 0 0 0 0 0 0 2 my image 1.jpg\n"
+                    "10.5 20.5 -1 30 40 7\n"
+                    "2 1 0 0 0 1 2 3 2 other.jpg\n"
+                    "\n")
+    imgs = read_images_txt(str(path))
+    assert imgs['name'] == ['my image 1.jpg', 'other.jpg']
+    np.testing.assert_array_equal(imgs['num_points2D'], [2, 0])
+    np.testing.assert_array_equal(imgs['tvec'][1], [1, 2, 3])
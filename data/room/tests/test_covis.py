@@ -0,0 +1,88 @@
+import itertools
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+from nerfprep import covis
+from nerfprep.colmap_io import TRACK_ELEM, read_model
+from nerfprep.covis import build_covisibility, components, neighbors, top_k
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _pairs(model):
+    """Shared point count per unordered image-name pair, one track at a time."""
+    names = dict(zip(model['images']['id'].tolist(), model['images']['name']))
+    pts, shared = model['points3D'], Counter()
+    for a, b in zip(pts['track_offsets'][:-1], pts['track_offsets'][1:]):
+        seen = sorted({names[i] for i in pts['track']['image_id'][a:b].tolist() if i in names})
+        shared.update(itertools.combinations(seen, 2))
+    return dict(shared)
+
+
+def _edges(g):
+    out = {}
+    for i, name in enumerate(g['names']):
+        for j, c in zip(*neighbors(g, i)):
+            out[tuple(sorted((name, g['names'][j])))] = int(c)
+    return out
+
+
+@pytest.mark.parametrize('model', ['sparse/0', 'sparse_txt'])
+def test_graph_matches_tracks(model):
+    m = read_model(os.path.join(ROOM, model), points3D=True)
+    g = build_covisibility(m)
+    assert _edges(g) == _pairs(m)
+    labels, sizes = components(g)
+    assert sizes.tolist() == [len(m['images']['id'])] and not labels.any()
+
+
+def test_formats_give_the_same_graph():
+    a = read_model(os.path.join(ROOM, 'sparse/0'), points3D=True)
+    b = read_model(os.path.join(ROOM, 'sparse_txt'), points3D=True)
+    assert _edges(build_covisibility(a)) == _edges(build_covisibility(b))
+
+
+def _synthetic(rng, n_images=12, n_points=400):
+    ids = rng.permutation(np.arange(100, 100 + n_images))
+    offsets, track = [0], []
+    for _ in range(n_points):
+        group = rng.integers(2)         # two halves that never share a point
+        pool = ids[ids % 2 == group]
+        L = int(rng.integers(1, 8))
+        obs = rng.choice(pool, L).tolist()              # repeats within a track happen
+        if rng.random() < 0.1:
+            obs.append(999)                             # an image that is not in the model
+        track += obs
+        offsets.append(len(track))
+    t = np.zeros(len(track), dtype=TRACK_ELEM)
+    t['image_id'] = track
+    return {'images': {'id': ids, 'name': [f'im{i}.jpg' for i in ids.tolist()]},
+            'points3D': {'track_offsets': np.array(offsets, dtype=np.int64), 'track': t}}
+
+
+def test_synthetic_graph_in_chunks(monkeypatch):
+    m = _synthetic(np.random.default_rng(0))
+    ref = _pairs(m)
+    whole = build_covisibility(m)
+    monkeypatch.setattr(covis, 'PAIR_CHUNK', 7)
+    chunked = build_covisibility(m)
+    assert _edges(whole) == _edges(chunked) == ref
+    for k in ('indptr', 'indices', 'counts'):
+        np.testing.assert_array_equal(whole[k], chunked[k])
+
+    strong = build_covisibility(m, min_shared=5)
+    assert _edges(strong) == {p: c for p, c in ref.items() if c >= 5}
+
+    labels, sizes = components(whole)
+    assert sizes.tolist() == [6, 6]
+    halves = m['images']['id'] % 2
+    assert all(len(set(labels[halves == h].tolist())) == 1 for h in (0, 1))
+
+    idx, cnt = top_k(whole, 3)
+    for i in range(len(m['images']['id'])):
+        ni, nc = neighbors(whole, i, 3)
+        assert idx[i, :len(ni)].tolist() == ni.tolist() and cnt[i, :len(nc)].tolist() == nc.tolist()
+        assert (idx[i, len(ni):] == -1).all()
+        assert (np.diff(nc) <= 0).all()
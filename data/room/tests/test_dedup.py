@@ -0,0 +1,62 @@
+import os
+import shutil
+
+from nerfprep import dedup as dd
+from nerfprep.scene import SceneModel
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _root(tmp_path):
+    for d in ('images', 'nerfstudio/images', 'sparse/0'):
+        shutil.copytree(os.path.join(ROOM, d), tmp_path / d)
+    return str(tmp_path)
+
+
+def _hashes(root, dirs=()):
+    return dd.hash_files(dd.list_images(dd.view_dirs(root) + list(dirs)))[0]
+
+
+def test_duplicates_are_hardlinked(tmp_path):
+    root = _root(tmp_path)
+    a, b = os.path.join(root, 'images', 'frame_00004.jpg'), os.path.join(root, 'nerfstudio', 'images', 'frame_00007.jpg')
+    assert not os.path.samefile(a, b)
+    hashes = _hashes(root)
+    store = os.path.join(root, dd.STORE_DIR)
+    estimate = dd.dedup(hashes, store, dry_run=True)
+    report = dd.dedup(hashes, store)
+    assert os.path.samefile(a, b)
+    assert report['link'] + report['same'] == report['files'] and not report['skipped']
+    assert report['after'] == estimate['after'] == sum({h: os.path.getsize(p) for p, h in hashes.items()}.values())
+    again = dd.dedup(_hashes(root), store)
+    assert again['same'] == again['files'] and again['saved'] == 0
+
+
+def test_views_left_alone_when_only_a_copy_works(tmp_path, monkeypatch):
+    root = _root(tmp_path)
+    hashes = _hashes(root)
+    inodes = {p: os.stat(p).st_ino for p in hashes}
+
+    def fail(*args):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(dd.os, 'link', fail)
+    monkeypatch.setattr(dd, 'reflink', fail)
+    report = dd.dedup(hashes, os.path.join(root, dd.STORE_DIR))
+    assert report['skipped'] == report['files'] and report['after'] == report['before']
+    assert {p: os.stat(p).st_ino for p in hashes} == inodes
+    assert not dd.store_objects(os.path.join(root, dd.STORE_DIR))
+
+
+def test_link_names_by_content(tmp_path):
+    root = _root(tmp_path)
+    images_dir = os.path.join(root, 'nerfstudio', 'images')
+    scene = SceneModel.load(os.path.join(root, 'sparse', '0'), cache=False)
+    name = scene.names[0]
+    # the image COLMAP ran on, under its COLMAP name, holds frame_00010's pixels
+    src = tmp_path / 'colmap_images'
+    src.mkdir()
+    shutil.copy(os.path.join(images_dir, 'frame_00010.jpg'), src / name)
+    created, by_content, unmatched = dd.link_names(scene, _hashes(root, [str(src)]), images_dir)
+    assert by_content == 1 and created == len(scene) and not unmatched
+    assert os.path.samefile(os.path.join(images_dir, name), os.path.join(images_dir, 'frame_00010.jpg'))
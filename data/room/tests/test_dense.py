@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+from nerfprep.dense import depth_stats, downsample, export_depths, find_map, map_path, read_header, read_map
+from nerfprep.scene import SceneModel
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_map(path, arr):
+    """A COLMAP dense map: 'w&h&c&' then float32, column-major per channel."""
+    arr = np.asarray(arr, dtype='<f4')
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    h, w, c = arr.shape
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(f'{w}&{h}&{c}&'.encode('ascii'))
+        f.write(arr.transpose(2, 0, 1).tobytes())
+
+
+def test_map_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    depth = rng.uniform(1, 5, (6, 8)).astype(np.float32)
+    depth[0, :2] = 0
+    normal = rng.normal(size=(6, 8, 3)).astype(np.float32)
+    _write_map(str(tmp_path / 'd.bin'), depth)
+    _write_map(str(tmp_path / 'n.bin'), normal)
+    assert read_header(str(tmp_path / 'd.bin')) == (8, 6, 1, len('8&6&1&'))
+    np.testing.assert_array_equal(read_map(str(tmp_path / 'd.bin')), depth)
+    np.testing.assert_array_equal(read_map(str(tmp_path / 'n.bin')), normal)
+    # as COLMAP's scripts/python/read_write_dense.py reads it
+    raw = np.fromfile(str(tmp_path / 'n.bin'), np.float32, offset=len('8&6&3&'))
+    np.testing.assert_array_equal(raw.reshape((8, 6, 3), order='F').transpose(1, 0, 2), normal)
+
+    half = downsample(depth, 2)
+    assert half.shape == (3, 4)
+    assert half[0, 0] == depth[1, :2].mean()            # zeros are not averaged in
+    np.testing.assert_allclose(half[1, 1], depth[2:4, 2:4].mean(), rtol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(downsample(normal, 2), axis=-1), 1, rtol=1e-5)
+
+    st = depth_stats(depth)
+    assert st['valid'] == round(46 / 48, 4) and st['min'] == depth[depth > 0].min()
+
+
+def test_export_on_sample_model(tmp_path):
+    scene = SceneModel.load(os.path.join(ROOM, 'dense', 'sparse'), cache=False)
+    ws = str(tmp_path / 'dense')
+    names = list(scene.names)
+    rng = np.random.default_rng(1)
+    maps = {n: rng.uniform(1, 3, (16, 12)).astype(np.float32) for n in names}
+    _write_map(map_path(ws, names[0]), maps[names[0]])
+    _write_map(map_path(ws, names[1], map_type='photometric'), maps[names[1]])  # only the other type
+    assert find_map(ws, names[1]) == map_path(ws, names[1], map_type='photometric')
+    assert find_map(ws, names[2]) is None
+
+    data = {'frames': [{'file_path': f'images/{os.path.basename(n)}', 'w': 6, 'h': 8} for n in names]}
+    stats, failed = export_depths(data, str(tmp_path / 'ns'), ws, scene, workers=2)
+    assert failed == [data['frames'][2]['file_path']]
+    assert data['depth_unit_scale_factor'] == 1.0
+    for fr, n in zip(data['frames'][:2], names):
+        out = np.load(tmp_path / 'ns' / fr['depth_file_path'])
+        np.testing.assert_allclose(out, downsample(maps[n], 2), rtol=1e-6)
+        assert stats[fr['file_path']]['valid'] == 1.0
+    assert 'depth_file_path' not in data['frames'][2]
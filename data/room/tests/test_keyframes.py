@@ -0,0 +1,74 @@
+import json
+import math
+
+import numpy as np
+from nerfprep.keyframes import grid_select, main, select_count
+from nerfprep.transforms_io import write_transforms
+
+
+def test_empty_and_single():
+    empty = np.zeros((0, 3))
+    for sel in (grid_select(empty, empty, 0.1, 5.0), grid_select(empty, empty, 0.0, 0.0),
+                select_count(empty, empty, 10)):
+        assert sel.dtype.kind == 'i' and len(sel) == 0
+    one = np.array([[0.0, 0.0, 1.0]])
+    assert grid_select(one, one, 0.1, 0.1).tolist() == [0]
+    assert select_count(one, one, 5).tolist() == [0]
+
+
+def test_grid_merges_close_frames():
+    centers = np.array([[0.0, 0, 0], [0.01, 0, 0], [1.0, 0, 0], [0.0, 0, 0]])
+    dirs = np.array([[0.0, 0, 1], [0, 0, 1], [0, 0, 1], [0, 0, -1]])
+    assert grid_select(centers, dirs, 0.5, 0.0).tolist() == [0, 2]
+    assert grid_select(centers, dirs, 0.5, math.radians(10)).tolist() == [0, 2, 3]
+
+
+def test_select_count_hits_target():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(500, 3))
+    dirs = rng.normal(size=(500, 3))
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    sel = select_count(centers, dirs, 37)
+    assert len(sel) == 37 and np.all(np.diff(sel) > 0)
+
+
+def test_main_without_valid_poses(tmp_path):
+    src, out = tmp_path / 'transforms.json', tmp_path / 'keys.json'
+    write_transforms(src, {'frames': [{'file_path': 'images/a.jpg'}]})
+    assert main(['--transforms', str(src), '--out', str(out), '--min_dist', '0.1']) == 0
+    with open(out) as f:
+        assert json.load(f)['frames'] == []
+
+
+def test_select_count_trims_by_coverage():
+    # a 4x4x4 lattice in shuffled file order: the grid search overshoots and the surplus is trimmed
+    lattice = np.stack(np.meshgrid(*[np.arange(4.0)] * 3, indexing='ij'), -1).reshape(-1, 3)
+    dirs = np.tile([0.0, 0.0, 1.0], (len(lattice), 1))
+    for seed in range(10):
+        centers = lattice[np.random.default_rng(seed).permutation(len(lattice))]
+        for target in (10, 12):
+            sel = select_count(centers, dirs, target)
+            # every frame within one coarse (2x2x2) cell diagonal of a kept one
+            cover = np.linalg.norm(centers[:, None] - centers[sel][None], axis=-1).min(axis=1).max()
+            assert len(sel) == target and cover <= math.sqrt(3) + 1e-9
+
+
+def test_main_reads_pose_convention(tmp_path):
+    from nerfprep.poses import CONVENTION_KEY, poses_to_transforms
+    rng = np.random.default_rng(2)
+    q = rng.normal(size=(6, 4))
+    t = rng.normal(size=(6, 3))
+    frames = [{'file_path': f'images/{i}.jpg', 'transform_matrix': m} for i, m in enumerate(poses_to_transforms(q, t).tolist())]
+    # frames 3..5 repeat the camera centers of 0..2 with other rotations: duplicates only as w2c
+    R = poses_to_transforms(q, t)[:, :3, :3]
+    C = -np.einsum('nji,nj->ni', R, t)
+    for i in range(3, 6):
+        frames[i]['transform_matrix'] = poses_to_transforms(q[i:i + 1], (-R[i] @ C[i - 3])[None])[0].tolist()
+    src, out = tmp_path / 'transforms.json', tmp_path / 'keys.json'
+    write_transforms(src, {CONVENTION_KEY: {'c2w': False, 'opengl': False}, 'frames': frames})
+    assert main(['--transforms', str(src), '--out', str(out), '--min_dist', '0.01']) == 0
+    with open(out) as f:
+        assert len(json.load(f)['frames']) == 3
+    assert main(['--transforms', str(src), '--out', str(out), '--min_dist', '0.01', '--c2w']) == 0
+    with open(out) as f:
+        assert len(json.load(f)['frames']) == 6
@@ -0,0 +1,39 @@
+from nerfprep.matching import NameMatcher, match_names
+
+
+def test_tiers():
+    files = ['IMG_0001.JPG', 'frame_IMG_0002.jpg', 'img-0003.jpg', 'a.jpg', 'shot_0042.jpg', 'x_scan_final.png',
+             'room_north_wall.jpg']
+    names = ['IMG_0001.JPG', 'img_0001.jpg', 'IMG_0002.jpg', 'IMG_0003.jpg', 'P42.jpg', 'scan.png', 'room_nrth_wall.jpg']
+    chosen, tiers = NameMatcher(files).match(names, one_to_one=False)
+    assert chosen == ['IMG_0001.JPG', 'IMG_0001.JPG', 'frame_IMG_0002.jpg', 'img-0003.jpg', 'shot_0042.jpg',
+                      'x_scan_final.png', 'room_north_wall.jpg']
+    assert tiers == ['exact', 'casefold', 'prefixed', 'normalized', 'numeric', 'substring', 'ngram']
+
+
+def test_one_to_one_and_exact():
+    assert match_names(['IMG_0001.JPG', 'img_0001.jpg'], ['IMG_0001.JPG']) == ['IMG_0001.JPG', None]
+    files = ['IMG_0001.JPG', 'room_north_wall.jpg', 'room_south_wall.jpg']
+    assert match_names(['img_0001.jpg', 'room_north_wal.jpg', 'room_suth_wall.jpg'], files,
+                       fuzzy=False) == [None, 'room_north_wall.jpg', None]
+
+
+def test_displaced_name_retries_free_files():
+    # both names prefer room_east_01; the loser falls back to the free room_east_1
+    files = ['room_east_01.jpg', 'room_east_1.jpg']
+    chosen, tiers = NameMatcher(files, ngram_candidates=1).match(['room_east_01.png', 'room_east_0l.jpg'])
+    assert chosen == ['room_east_01.jpg', 'room_east_1.jpg']
+    assert tiers == ['normalized', 'ngram']
+
+
+def test_unrelated_names_stay_unmatched():
+    files = [f'frame_{i:05d}.jpg' for i in range(1, 2001)]
+    names = [f'WhatsApp Image 2025-12-08 at 1.{i // 60:02d}.{i % 60:02d} PM (0).jpeg' for i in range(2000)]
+    m = NameMatcher(files, max_pairs=1000)     # forces many small pair batches
+    chosen, _ = m.match(names)
+    assert chosen == [None] * len(names)
+
+
+def test_empty():
+    assert match_names([], ['a.jpg']) == []
+    assert match_names(['a.jpg'], []) == [None]
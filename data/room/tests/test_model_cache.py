@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import numpy as np
+from nerfprep import model_cache
+from nerfprep.colmap_io import read_model
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _model(tmp_path):
+    path = tmp_path / 'model'
+    shutil.copytree(os.path.join(ROOM, 'sparse_txt'), path)
+    return str(path)
+
+
+def test_cache_goes_to_user_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.delenv(model_cache.CACHE_ENV, raising=False)
+    path = _model(tmp_path)
+    before = sorted(os.listdir(path))
+    parsed = read_model(path)
+    cached = read_model(path, cache=True)
+    assert sorted(os.listdir(path)) == before
+    cache = model_cache.cache_dir(path)
+    assert cache.startswith(str(tmp_path / 'cache' / 'nerfprep' / 'models'))
+    assert os.path.isfile(os.path.join(cache, model_cache.MANIFEST))
+    again = read_model(path, cache=True)
+    for model in (cached, again):
+        assert model['images']['name'] == parsed['images']['name']
+        np.testing.assert_array_equal(model['images']['qvec'], parsed['images']['qvec'])
+        assert model['cameras'].keys() == parsed['cameras'].keys()
+    model_cache.clear(path)
+    assert not os.path.exists(cache)
+
+
+def test_inplace_and_off(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    path = _model(tmp_path)
+    monkeypatch.setenv(model_cache.CACHE_ENV, 'inplace')
+    read_model(path, cache=True)
+    assert os.path.isfile(os.path.join(path, model_cache.CACHE_DIR, model_cache.MANIFEST))
+    monkeypatch.setenv(model_cache.CACHE_ENV, '0')
+    assert model_cache.cache_dir(path) is None
+    assert read_model(path, cache=True)['images']['name']
+    assert not os.path.exists(tmp_path / 'cache')
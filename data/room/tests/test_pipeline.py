@@ -0,0 +1,20 @@
+from PIL import Image
+from nerfprep.pipeline import probe_frames
+
+
+def _jpeg(path, size, orientation=None):
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new('RGB', size).save(path, exif=exif)
+
+
+def test_probe_frames_applies_exif_orientation(tmp_path):
+    (tmp_path / 'images').mkdir()
+    _jpeg(tmp_path / 'images' / 'a.jpg', (40, 30))
+    _jpeg(tmp_path / 'images' / 'b.jpg', (40, 30), orientation=6)
+    _jpeg(tmp_path / 'images' / 'c.jpg', (40, 30), orientation=3)
+    frames = [{'file_path': f'images/{n}.jpg'} for n in 'abcd']
+    sizes, failed = probe_frames({'base_dir': str(tmp_path)}, frames)
+    assert sizes == {'images/a.jpg': (40, 30), 'images/b.jpg': (30, 40), 'images/c.jpg': (40, 30)}
+    assert failed == ['images/d.jpg']
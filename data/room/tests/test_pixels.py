@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+from PIL import Image
+from nerfprep.pixels import PixelStore, build_pixels
+
+
+def _scene(tmp_path):
+    (tmp_path / 'images').mkdir()
+    colors = {'a': (255, 0, 0), 'b': (0, 255, 0), 'd': (0, 0, 255)}
+    for name, rgb in colors.items():
+        Image.new('RGB', (40, 30) if name != 'd' else (20, 10), rgb).save(tmp_path / 'images' / f'{name}.png')
+    # header readable, data truncated: probes fine, fails to decode
+    Image.effect_noise((64, 48), 50).convert('RGB').save(tmp_path / 'images' / 'c.jpg', quality=95)
+    raw = (tmp_path / 'images' / 'c.jpg').read_bytes()
+    (tmp_path / 'images' / 'c.jpg').write_bytes(raw[:len(raw) // 3])
+    cam = {'transform_matrix': np.eye(4).tolist(), 'fl_x': 50.0, 'fl_y': 50.0, 'cx': 20.0, 'cy': 15.0, 'w': 40, 'h': 30}
+    frames = [dict(cam, file_path='images/a.png'), dict(cam), dict(cam, file_path='images/b.png'),
+              dict(cam, file_path='images/c.jpg'), dict(cam, file_path='images/missing.png'),
+              dict(cam, file_path='images/d.png'), {'file_path': 'images/a.png'}]
+    path = tmp_path / 'transforms.json'
+    path.write_text(json.dumps({'frames': frames}))
+    return path, colors
+
+
+def test_records_map_back_to_frames(tmp_path):
+    path, colors = _scene(tmp_path)
+    index = build_pixels(str(path), str(tmp_path / 'pixels'), levels=(1, 2), workers=1)
+    assert index['unposed'] == 2
+    level = index['levels']['1']
+    assert level['frames'] == 3 and level['pixels'] == 2 * 40 * 30 + 20 * 10
+    assert sorted(level['skipped']) == ['images/c.jpg', 'images/missing.png']
+    for f, size in ((1, {0: (40, 30), 5: (20, 10)}), (2, {0: (20, 15), 5: (10, 5)})):
+        store = PixelStore(str(tmp_path / 'pixels'), level=f)
+        assert store.frames['frame'].tolist() == [0, 2, 5]
+        n = store.frames['w'].astype(int) * store.frames['h']
+        assert store.frames['offset'].tolist() == np.r_[0, np.cumsum(n)[:-1]].tolist()
+        assert len(store) == n.sum()
+        for k, i in enumerate(store.frames['frame'].tolist()):
+            img = store.frame(k)
+            if i in size:
+                assert img.shape == size[i][::-1] + (3,)
+            name = {0: 'a', 2: 'b', 5: 'd'}[i]
+            assert (img == colors[name]).all()
+        last = len(store) - 1
+        assert store.frames['frame'][store.frame_of(last)] == 5
+        assert tuple(store.pixels([last])[0]) == colors['d']
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+from nerfprep.points import bounds, load_points, point_mask, select_points, track_lengths, write_ply
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _points_txt(path):
+    """points3D.txt parsed line by line, as {id: (xyz, rgb, error, [(image_id, point2D_idx)])}."""
+    out = {}
+    with open(path) as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            v = line.split()
+            track = [(int(a), int(b)) for a, b in zip(v[8::2], v[9::2])]
+            out[int(v[0])] = ([float(x) for x in v[1:4]], [int(x) for x in v[4:7]], float(v[7]), track)
+    return out
+
+
+@pytest.mark.parametrize('model', ['sparse/0', 'sparse_txt'])
+def test_points_match_text_file(model):
+    pts = load_points(os.path.join(ROOM, model), cache=False)
+    ref = _points_txt(os.path.join(ROOM, 'sparse_txt', 'points3D.txt'))
+    assert pts['id'].tolist() == list(ref)
+    assert pts['xyz'].dtype == np.float32 and pts['rgb'].dtype == np.uint8
+    np.testing.assert_allclose(pts['xyz'], np.float32([r[0] for r in ref.values()]), rtol=1e-6)
+    np.testing.assert_array_equal(pts['rgb'], [r[1] for r in ref.values()])
+    np.testing.assert_allclose(pts['error'], np.float32([r[2] for r in ref.values()]), rtol=1e-6)
+    lengths = track_lengths(pts)
+    assert lengths.tolist() == [len(r[3]) for r in ref.values()]
+    tracks = [list(map(tuple, pts['track'][a:b].tolist())) for a, b in zip(pts['track_offsets'][:-1], pts['track_offsets'][1:])]
+    assert tracks == [r[3] for r in ref.values()]
+
+
+def test_filter_and_select_agree_between_formats():
+    a = load_points(os.path.join(ROOM, 'sparse/0'), cache=False)
+    b = load_points(os.path.join(ROOM, 'sparse_txt'), cache=False)
+    bbox = ((-2.75, -2, 0), (0, 0, 5))
+    ka, kb = point_mask(a, 0.5, 3, bbox), point_mask(b, 0.5, 3, bbox)
+    np.testing.assert_array_equal(ka, kb)
+    assert 0 < ka.sum() < len(ka)
+    sa, sb = select_points(a, ka), select_points(b, kb)
+    for k in ('id', 'xyz', 'rgb', 'error', 'track_offsets', 'track'):
+        np.testing.assert_array_equal(sa[k], sb[k])
+    # the selected tracks are the kept points' own tracks
+    idx = np.flatnonzero(ka)
+    assert sa['track'].tolist() == [t for i in idx for t in a['track'][a['track_offsets'][i]:a['track_offsets'][i + 1]].tolist()]
+    for p in (None, 5):
+        for x, y in zip(bounds(a, p), bounds(b, p)):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_write_ply_round_trip(tmp_path):
+    pts = load_points(os.path.join(ROOM, 'sparse/0'), cache=False)
+    path = tmp_path / 'sparse.ply'
+    assert write_ply(str(path), **pts) == len(pts['id'])
+    raw = path.read_bytes()
+    end = raw.index(b'end_header\n') + len(b'end_header\n')
+    assert f"element vertex {len(pts['id'])}".encode() in raw[:end]
+    rows = np.frombuffer(raw[end:], dtype=[('xyz', '<f4', 3), ('rgb', 'u1', 3)])
+    np.testing.assert_array_equal(rows['xyz'], pts['xyz'])
+    np.testing.assert_array_equal(rows['rgb'], pts['rgb'])
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+from PIL import Image
+from nerfprep.pixels import PixelStore, build_pixels
+from nerfprep.rays import RayCache, build_rays
+
+
+def _scene(tmp_path):
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images_2').mkdir()
+    Image.new('RGB', (40, 30)).save(tmp_path / 'images' / 'a.png')
+    Image.new('RGB', (41, 31)).save(tmp_path / 'images' / 'b.png')
+    Image.new('RGB', (24, 16)).save(tmp_path / 'images_2' / 'b.png')     # pre-scaled level 2, not floor(w/2)
+    cam = {'fl_x': 80.0, 'fl_y': 80.0, 'cx': 40.0, 'cy': 30.0, 'w': 80, 'h': 60}      # COLMAP size, images are smaller
+    eye = np.eye(4).tolist()
+    frames = [dict(cam, file_path='images/a.png', transform_matrix=eye),
+              dict(cam, file_path='images/missing.png', transform_matrix=eye),
+              dict(cam, file_path='images/b.png', transform_matrix=eye),
+              dict(cam, transform_matrix=eye),
+              dict(cam, file_path='images/a.png')]
+    path = tmp_path / 'transforms.json'
+    path.write_text(json.dumps({'frames': frames}))
+    return path
+
+
+def test_rays_follow_image_sizes(tmp_path):
+    path = _scene(tmp_path)
+    rays = build_rays(str(path), str(tmp_path / 'rays'), levels=(1, 2))
+    build_pixels(str(path), str(tmp_path / 'pixels'), levels=(1, 2), workers=1)
+    assert rays['levels']['1']['skipped'] == ['images/missing.png', None, 'images/a.png']
+    for level, sizes in ((1, [(40, 30), (41, 31)]), (2, [(20, 15), (24, 16)])):
+        cache = RayCache(str(tmp_path / 'rays'), level)
+        store = PixelStore(str(tmp_path / 'pixels'), level)
+        assert cache.frames['frame'].tolist() == [0, 2]
+        assert list(zip(cache.frames['w'].tolist(), cache.frames['h'].tolist())) == sizes
+        assert len(cache) == len(store) == sum(w * h for w, h in sizes)
+        assert store.frames['frame'].tolist() == cache.frames['frame'].tolist()
+        assert store.frames['offset'].tolist() == cache.frames['offset'].tolist()
+
+
+def test_intrinsics_scaled_to_image(tmp_path):
+    path = _scene(tmp_path)
+    build_rays(str(path), str(tmp_path / 'rays'), levels=(1,), opengl=False)
+    cache = RayCache(str(tmp_path / 'rays'), 1)
+    _, d = cache.frame_rays(0)
+    # image a is 40x30 for an 80x60 camera: f = 40, principal point at the image center
+    assert d.shape == (30, 40, 3)
+    np.testing.assert_allclose(d[0, 0], np.array([-19.5, -14.5, 40.0]) / np.linalg.norm([-19.5, -14.5, 40.0]), atol=1e-6)
+    np.testing.assert_allclose(d[14, 19] + d[15, 20], [0, 0, 2 * d[15, 20, 2]], atol=1e-6)
+
+
+def test_no_frames(tmp_path):
+    path = tmp_path / 'transforms.json'
+    path.write_text(json.dumps({'frames': []}))
+    index = build_rays(str(path), str(tmp_path / 'rays'), levels=(1,))
+    assert index['levels']['1']['rays'] == 0 and len(RayCache(str(tmp_path / 'rays'), 1)) == 0
+
+
+def test_rays_follow_pixel_store_after_decode_failure(tmp_path):
+    import pytest
+    path = _scene(tmp_path)
+    # header readable, data truncated: probes fine, fails to decode
+    Image.effect_noise((40, 30), 50).convert('RGB').save(tmp_path / 'images' / 'c.jpg', quality=95)
+    raw = (tmp_path / 'images' / 'c.jpg').read_bytes()
+    (tmp_path / 'images' / 'c.jpg').write_bytes(raw[:len(raw) // 3])
+    data = json.loads(path.read_text())
+    data['frames'].insert(1, dict(data['frames'][0], file_path='images/c.jpg'))
+    path.write_text(json.dumps(data))
+    build_pixels(str(path), str(tmp_path / 'pixels'), levels=(1,), workers=1)
+    store = PixelStore(str(tmp_path / 'pixels'), 1)
+    assert store.frames['frame'].tolist() == [0, 3]
+
+    build_rays(str(path), str(tmp_path / 'rays'), levels=(1,))
+    cache = RayCache(str(tmp_path / 'rays'), 1)
+    assert cache.frames['frame'].tolist() == [0, 1, 3]
+    with pytest.raises(ValueError):
+        cache.check_pixels(store)
+
+    build_rays(str(path), str(tmp_path / 'rays'), levels=(1,), pixels=str(tmp_path / 'pixels'))
+    cache = RayCache(str(tmp_path / 'rays'), 1)
+    cache.check_pixels(store)
+    assert cache.frames['frame'].tolist() == [0, 3] and len(cache) == len(store)
+    last = len(cache) - 1
+    assert store.frames['frame'][store.frame_of(last)] == cache.frames['frame'][cache.frame_of(last)] == 3
+
+
+def test_pose_convention_from_file(tmp_path):
+    from nerfprep.poses import CONVENTION_KEY, poses_to_transforms
+    path = _scene(tmp_path)
+    data = json.loads(path.read_text())
+    q, t = np.array([[0.9, 0.1, -0.3, 0.2]]), np.array([[0.5, -1.0, 2.0]])
+    R = poses_to_transforms(q, t)[0, :3, :3]
+    center = -R.T @ t[0]
+    for c2w, opengl in ((False, False), (True, True), (None, None)):
+        if c2w is None:
+            data.pop(CONVENTION_KEY)        # no record: the converters' default, w2c OpenCV
+            M = poses_to_transforms(q, t)[0]
+        else:
+            data[CONVENTION_KEY] = {'c2w': c2w, 'opengl': opengl}
+            M = poses_to_transforms(q, t, invert=c2w, opengl=opengl)[0]
+        data['frames'][0]['transform_matrix'] = M.tolist()
+        path.write_text(json.dumps(data))
+        index = build_rays(str(path), str(tmp_path / 'rays'), levels=(1,))
+        assert index['axes'] == ('opengl' if opengl else 'opencv')
+        cache = RayCache(str(tmp_path / 'rays'), 1)
+        o, d = cache.frame_rays(0)
+        np.testing.assert_allclose(o[0, 0], center, atol=1e-6)
+        assert d[15, 20] @ R[2] > 0.99     # the center pixel looks along the camera z axis (forward)
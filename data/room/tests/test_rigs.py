@@ -0,0 +1,88 @@
+import copy
+import itertools
+import os
+
+import numpy as np
+import pytest
+from nerfprep.colmap_io import FRAME_DATA, read_model
+from nerfprep.poses import qvec_to_rotmat, rt_to_transforms
+from nerfprep.rigs import compact_frames, compose
+from nerfprep.transforms_io import frame_poses
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('model', ['sparse/0', 'sparse_txt'])
+def test_single_sensor_rigs_match_image_poses(model):
+    m = read_model(os.path.join(ROOM, model))
+    rig = compose(m)
+    assert (rig['frame'] >= 0).all() and (rig['sensor'] >= 0).all()
+    np.testing.assert_allclose(rig['R'], qvec_to_rotmat(m['images']['qvec']), atol=1e-9)
+    np.testing.assert_allclose(rig['t'], m['images']['tvec'], atol=1e-9)
+
+
+def _qvecs(rng, n):
+    q = rng.normal(size=(n, 4))
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _rig_model(rng):
+    """Two rig frames of a two-camera rig (cameras 1 and 2) plus one image on no frame."""
+    rig_q, rig_t = _qvecs(rng, 1)[0], rng.normal(size=3)
+    frame_q, frame_t = _qvecs(rng, 2), rng.normal(size=(2, 3))
+    data = np.zeros(4, dtype=FRAME_DATA)
+    data['sensor_id'] = [1, 2, 2, 1]
+    data['data_id'] = [10, 11, 13, 12]
+    images = {'id': np.array([10, 11, 12, 13, 14]), 'name': [f'im{i}.jpg' for i in range(5)],
+              'camera_id': np.array([1, 2, 1, 2, 1]),
+              # stale per-image poses: composition must not use them for rig images
+              'qvec': np.tile([1.0, 0, 0, 0], (5, 1)), 'tvec': np.zeros((5, 3))}
+    images['qvec'][4], images['tvec'][4] = _qvecs(rng, 1)[0], rng.normal(size=3)
+    model = {'images': images,
+             'rigs': {7: {'ref_sensor': (0, 1), 'sensors': [(0, 2, rig_q, rig_t)]}},
+             'frames': {'id': np.array([100, 101]), 'rig_id': np.array([7, 7]), 'qvec': frame_q, 'tvec': frame_t,
+                        'data_offsets': np.array([0, 2, 4]), 'data': data}}
+    # image -> (frame, sensor_from_rig)
+    S = qvec_to_rotmat(rig_q)[0]
+    F = qvec_to_rotmat(frame_q)
+    expect = {10: (0, np.eye(3), np.zeros(3)), 11: (0, S, rig_t), 13: (1, S, rig_t), 12: (1, np.eye(3), np.zeros(3))}
+    R = np.empty((5, 3, 3))
+    t = np.empty((5, 3))
+    for i, image_id in enumerate(images['id'][:4]):
+        f, SR, St = expect[image_id]
+        R[i], t[i] = SR @ F[f], SR @ frame_t[f] + St
+    R[4], t[4] = qvec_to_rotmat(images['qvec'][4])[0], images['tvec'][4]
+    return model, R, t
+
+
+def test_compose_two_camera_rig():
+    model, R, t = _rig_model(np.random.default_rng(1))
+    rig = compose(model)
+    np.testing.assert_allclose(rig['R'], R, atol=1e-12)
+    np.testing.assert_allclose(rig['t'], t, atol=1e-12)
+    assert rig['frame'].tolist() == [0, 0, 1, 1, -1]
+    assert rig['sensor_keys'][rig['sensor']][:4].tolist() == [(7 << 32) | c for c in (1, 2, 1, 2)]
+
+
+def test_compose_without_rigs():
+    model, _, _ = _rig_model(np.random.default_rng(2))
+    del model['frames'], model['rigs']
+    rig = compose(model)
+    np.testing.assert_allclose(rig['R'], qvec_to_rotmat(model['images']['qvec']))
+    assert (rig['frame'] == -1).all()
+    empty = {'images': {'name': [], 'qvec': np.zeros((0, 4)), 'tvec': np.zeros((0, 3)), 'id': np.zeros(0, int)}}
+    assert compose(empty)['R'].shape == (0, 3, 3)
+
+
+@pytest.mark.parametrize('c2w,opengl', list(itertools.product([False, True], repeat=2)))
+def test_compact_frames_round_trip(c2w, opengl):
+    model, R, t = _rig_model(np.random.default_rng(3))
+    rig = compose(model)
+    idx = [3, 0, 4, 1, 2]
+    M = rt_to_transforms(R[idx], t[idx], invert=c2w, opengl=opengl)
+    data = {'frames': [{'file_path': f'images/im{i}.jpg', 'transform_matrix': m} for i, m in zip(idx, M.tolist())]}
+    full = copy.deepcopy(data)
+    assert compact_frames(data, rig, idx, c2w=c2w, opengl=opengl) == 4
+    assert 'transform_matrix' not in data['frames'][0] and 'transform_matrix' in data['frames'][2]
+    assert len(data['rig_frames']) == 2 and len(data['rig_sensors']) == 2
+    np.testing.assert_allclose(frame_poses(data), frame_poses(full), atol=1e-9)
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+from nerfprep.transforms_io import fresh_sidecar, frame_poses, write_transforms
+
+
+def _data(n=5):
+    frames = []
+    for i in range(n):
+        M = np.eye(4)
+        M[:3, 3] = (i, 2 * i, 3 * i)
+        frames.append({'file_path': f'images/frame_{i:05d}.jpg', 'transform_matrix': M.tolist(),
+                       'fl_x': 500.0, 'fl_y': 500.0, 'cx': 320.0, 'cy': 240.0, 'w': 640, 'h': 480})
+    return {'camera_angle_x': 1.0, 'frames': frames}
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_sidecar_matches_json(tmp_path):
+    path = tmp_path / 'transforms.json'
+    assert write_transforms(path, _data(), sidecar=True) == 5
+    data = _load(path)
+    side = fresh_sidecar(data, path)
+    assert side is not None and len(side) == 5
+    assert data['frames_sidecar']['n'] == 5
+    np.testing.assert_allclose(side['pose'], frame_poses(data), atol=1e-6)
+    np.testing.assert_allclose(side['w'], 640)
+    # a read-modify-write keeps it fresh
+    data['frames'][0]['fl_x'] = 510.0
+    write_transforms(path, data)
+    data = _load(path)
+    assert fresh_sidecar(data, path)['fl_x'][0] == 510.0
+
+
+def test_edited_json_ignores_stale_sidecar(tmp_path):
+    path = tmp_path / 'transforms.json'
+    write_transforms(path, _data(), sidecar=True)
+    # an edit that keeps the frame count and the token, e.g. a tool that json.dump()s the data back
+    data = _load(path)
+    data['frames'][2]['transform_matrix'][0][3] = 100.0
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    assert fresh_sidecar(data, path) is None
+    assert frame_poses(data, path)[2, 0, 3] == 100.0
+
+
+def test_same_layout_edit_ignores_stale_sidecar(tmp_path):
+    path = tmp_path / 'transforms.json'
+    write_transforms(path, _data(), sidecar=True)
+    text = path.read_text()
+    path.write_text(text.replace('[1.0, 0.0, 0.0, 3.0]', '[1.0, 0.0, 0.0, 4.0]', 1))
+    data = _load(path)
+    assert fresh_sidecar(data, path) is None
+    assert frame_poses(data, path)[3, 0, 3] == 4.0
+
+
+def test_rewritten_sidecar_is_rejected(tmp_path):
+    path = tmp_path / 'transforms.json'
+    write_transforms(path, _data(), sidecar=True)
+    side = np.load(tmp_path / 'transforms.frames.npy')
+    side['pose'][1, 0, 3] = 7.0
+    np.save(tmp_path / 'transforms.frames.npy', side)
+    data = _load(path)
+    assert fresh_sidecar(data, path) is None
+    assert frame_poses(data, path)[1, 0, 3] == 1.0
+
+
+def test_old_string_reference_falls_back(tmp_path):
+    path = tmp_path / 'transforms.json'
+    write_transforms(path, _data(), sidecar=True)
+    data = _load(path)
+    data['frames_sidecar'] = 'transforms.frames.npy'
+    assert fresh_sidecar(data, path) is None
+    assert frame_poses(data, path).shape == (5, 3, 4)
+
+
+def test_no_frames(tmp_path):
+    path = tmp_path / 'transforms.json'
+    assert write_transforms(path, {'frames': []}, sidecar=True) == 0
+    data = _load(path)
+    assert data['frames'] == []
+    assert fresh_sidecar(data, path) is not None
+    assert frame_poses(data, path).shape == (0, 3, 4)
@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+from PIL import Image
+from nerfprep.transforms_io import write_transforms
+from nerfprep.validate import check_intrinsics, check_poses, validate
+
+
+def _scene(tmp_path, n=4):
+    (tmp_path / 'images').mkdir()
+    frames = []
+    for i in range(n):
+        Image.new('RGB', (64, 48)).save(tmp_path / 'images' / f'frame_{i:05d}.jpg')
+        M = np.eye(4)
+        M[:3, 3] = i
+        frames.append({'file_path': f'images/frame_{i:05d}.jpg', 'transform_matrix': M.tolist(),
+                       'fl_x': 50.0, 'fl_y': 50.0, 'cx': 32.0, 'cy': 24.0, 'w': 64, 'h': 48})
+    path = tmp_path / 'transforms.json'
+    write_transforms(path, {'frames': frames}, sidecar=True)
+    return path
+
+
+def _validate(path):
+    with open(path) as f:
+        return validate(json.load(f), str(path))
+
+
+def test_valid_scene(tmp_path):
+    report = _validate(_scene(tmp_path))
+    assert report['ok'], report
+    assert report['frames'] == 4
+
+
+def test_edited_json_with_stale_sidecar(tmp_path):
+    path = _scene(tmp_path)
+    with open(path) as f:
+        data = json.load(f)
+    # broken rotation, principal point and focal length; the sidecar still has the good values
+    data['frames'][1]['transform_matrix'][0][0] = 2.0
+    data['frames'][2]['cx'] = 500.0
+    data['frames'][3]['fl_y'] = -1.0
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    report = _validate(path)
+    assert not report['ok']
+    assert report['errors']['rotation']['frames'] == ['images/frame_00001.jpg']
+    assert report['errors']['principal_point']['frames'] == ['images/frame_00002.jpg']
+    assert report['errors']['intrinsics_invalid']['frames'] == ['images/frame_00003.jpg']
+
+
+def test_missing_files_and_duplicates(tmp_path):
+    path = _scene(tmp_path)
+    with open(path) as f:
+        data = json.load(f)
+    data['frames'][0]['file_path'] = 'images/gone.jpg'
+    data['frames'][3]['file_path'] = data['frames'][2]['file_path']
+    report = validate(data, str(path))
+    assert report['errors']['file_missing']['frames'] == ['images/gone.jpg']
+    assert report['errors']['duplicate_path']['count'] == 2
+
+
+def test_empty_inputs(tmp_path):
+    report = validate({'frames': []}, str(tmp_path / 'transforms.json'))
+    assert not report['ok'] and 'no_frames' in report['errors']
+    assert {k: len(v) for k, v in check_poses(np.zeros((0, 3, 4))).items()} == {'pose_missing': 0, 'rotation': 0}
+    masks, fallback = check_intrinsics(np.zeros((0, 6)))
+    assert not len(fallback) and all(not len(m) for m in masks.values())
+
+
+def test_malformed_poses_and_intrinsics(tmp_path):
+    path = _scene(tmp_path, n=5)
+    with open(path) as f:
+        data = json.load(f)
+    data['frames'][0]['transform_matrix'] = np.eye(3).tolist()
+    data['frames'][1]['transform_matrix'] = [[1, 0, 0, 0], [0, 1, 0], [0, 0, 1, 0]]
+    data['frames'][2]['fl_x'] = 'abc'
+    data['frames'][3]['transform_matrix'][1][1] = 'x'
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    report = _validate(path)
+    assert report['errors']['pose_missing']['frames'] == [f'images/frame_{i:05d}.jpg' for i in (0, 1, 3)]
+    assert report['errors']['intrinsics_invalid']['frames'] == ['images/frame_00002.jpg']
+    assert set(report['errors']) == {'pose_missing', 'intrinsics_invalid'}
+
+
+def test_cli_reports_malformed_frames(tmp_path):
+    from nerfprep.validate import main
+    path = _scene(tmp_path)
+    with open(path) as f:
+        data = json.load(f)
+    data['frames'][0]['transform_matrix'] = np.eye(3).tolist()
+    data['cx'] = 'abc'
+    del data['frames'][1]['cx']
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    assert main([str(path), '--report', str(tmp_path / 'check.json')]) == 1
+    with open(tmp_path / 'check.json') as f:
+        errors = json.load(f)['errors']
+    assert errors['pose_missing']['count'] == 1 and errors['intrinsics_invalid']['count'] == 1
@@ -0,0 +1,53 @@
+import os
+import shutil
+
+from PIL import Image
+from nerfprep.scene import SceneModel
+from nerfprep.watch import Watcher
+
+ROOM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setenv('NERFPREP_MODEL_CACHE', '0')
+    model = tmp_path / 'sparse' / '0'
+    shutil.copytree(os.path.join(ROOM, 'dense', 'sparse'), model)
+    images = tmp_path / 'nerfstudio' / 'images'
+    images.mkdir(parents=True)
+    for name in SceneModel.load(str(model), cache=False).names:
+        Image.new('RGB', (16, 12)).save(images / os.path.basename(name))
+    return model, Watcher(str(model), str(images), str(tmp_path / 'nerfstudio' / 'transforms.json'))
+
+
+def test_half_written_model_is_retried(tmp_path, monkeypatch):
+    model, w = _setup(tmp_path, monkeypatch)
+    added, removed, rebuilt = w.poll()
+    assert added == rebuilt == len(w.scene) and not removed
+    assert w.poll() is None
+    good = (model / 'images.bin').read_bytes()
+    (model / 'images.bin').write_bytes(good[:len(good) // 2])
+    scene = w.scene
+    assert w.poll() is None             # reload failed: state and listings kept
+    assert w.scene is scene and len(w.frames) == len(scene)
+    (model / 'images.bin').write_bytes(good)
+    res = w.poll()                      # the finished file is picked up
+    assert res is not None and res[2] == len(w.scene)
+    assert w.poll() is None
+
+
+def test_images_before_model(tmp_path, monkeypatch):
+    monkeypatch.setenv('NERFPREP_MODEL_CACHE', '0')
+    model = tmp_path / 'sparse' / '0'
+    model.mkdir(parents=True)
+    images = tmp_path / 'nerfstudio' / 'images'
+    images.mkdir(parents=True)
+    w = Watcher(str(model), str(images), str(tmp_path / 'nerfstudio' / 'transforms.json'))
+    names = SceneModel.load(os.path.join(ROOM, 'dense', 'sparse'), cache=False).names
+    Image.new('RGB', (16, 12)).save(images / os.path.basename(names[0]))
+    assert w.poll() is None and w.scene is None
+    os.rmdir(model)
+    assert w.poll() is None
+    shutil.copytree(os.path.join(ROOM, 'dense', 'sparse'), model)
+    assert w.poll() == (1, 0, 1)
+    assert [fr['file_path'] for fr in w.data['frames']] == ['images/' + os.path.basename(names[0])]
+    assert w.data['pose_convention'] == {'c2w': False, 'opengl': False}
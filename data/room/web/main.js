@@ -6,6 +6,16 @@ canvas.height = window.innerHeight;
 const gl = canvas.getContext("webgl");
 gl.enable(gl.DEPTH_TEST);
 
+// Point cloud tiles written by `python -m nerfprep.tiles --out web/tiles`;
+// another directory can be given as ?tiles=path/ and ?flip=1 turns COLMAP's
+// y-down world upright (also toggled with "f").
+const params = new URLSearchParams(location.search);
+const TILES = params.get("tiles") || "tiles/";
+const FOV = 1.2;
+const MAX_LOADING = 4;           // concurrent tile requests
+const POINT_BUDGET = 8000000;    // points kept on the GPU
+const LOD_PIXELS = 1.5;          // refine a node while its point spacing exceeds this on screen
+
 // ===== SHADERS =====
 const vs = `
 attribute vec3 position;
@@ -21,6 +31,30 @@ void main() {
 }
 `;
 
+// tile positions are uint16 normalized to the node cube, colors uint8
+const pointVs = `
+attribute vec3 position;
+attribute vec3 color;
+uniform mat4 mvp;
+uniform vec3 offset;
+uniform float scale;
+uniform float pointSize;
+varying vec3 vColor;
+void main() {
+  gl_Position = mvp * vec4(offset + position * scale, 1.0);
+  gl_PointSize = pointSize;
+  vColor = color;
+}
+`;
+
+const pointFs = `
+precision mediump float;
+varying vec3 vColor;
+void main() {
+  gl_FragColor = vec4(vColor, 1.0);
+}
+`;
+
 function compile(type, src) {
   const s = gl.createShader(type);
   gl.shaderSource(s, src);
@@ -28,11 +62,24 @@ function compile(type, src) {
   return s;
 }
 
-const program = gl.createProgram();
-gl.attachShader(program, compile(gl.VERTEX_SHADER, vs));
-gl.attachShader(program, compile(gl.FRAGMENT_SHADER, fs));
-gl.linkProgram(program);
-gl.useProgram(program);
+function link(vsrc, fsrc) {
+  const p = gl.createProgram();
+  gl.attachShader(p, compile(gl.VERTEX_SHADER, vsrc));
+  gl.attachShader(p, compile(gl.FRAGMENT_SHADER, fsrc));
+  gl.linkProgram(p);
+  return p;
+}
+
+const program = link(vs, fs);
+const pointProgram = link(pointVs, pointFs);
+const loc = {
+  position: gl.getAttribLocation(pointProgram, "position"),
+  color: gl.getAttribLocation(pointProgram, "color"),
+  mvp: gl.getUniformLocation(pointProgram, "mvp"),
+  offset: gl.getUniformLocation(pointProgram, "offset"),
+  scale: gl.getUniformLocation(pointProgram, "scale"),
+  pointSize: gl.getUniformLocation(pointProgram, "pointSize"),
+};
 
 // ===== FLOOR =====
 const floor = new Float32Array([
@@ -45,28 +92,37 @@ gl.bindBuffer(gl.ARRAY_BUFFER, vbo);
 gl.bufferData(gl.ARRAY_BUFFER, floor, gl.STATIC_DRAW);
 
 const posLoc = gl.getAttribLocation(program, "position");
-gl.enableVertexAttribArray(posLoc);
-gl.vertexAttribPointer(posLoc, 3, gl.FLOAT, false, 0, 0);
 
 // ===== CAMERA =====
 let camX = 0, camY = 1.6, camZ = 5;
 let yaw = 0, pitch = 0;
+let flip = params.get("flip") === "1";
 const keys = {};
 
-document.addEventListener("keydown", e => keys[e.key] = true);
+document.addEventListener("keydown", e => {
+  keys[e.key] = true;
+  if (e.key === "f") { flip = !flip; resetCamera(); }
+});
 document.addEventListener("keyup", e => keys[e.key] = false);
 
 canvas.onclick = () => canvas.requestPointerLock();
 
 document.addEventListener("mousemove", e => {
   if (document.pointerLockElement === canvas) {
-    yaw -= e.movementX * 0.002;
+    yaw += e.movementX * 0.002;
     pitch -= e.movementY * 0.002;
     pitch = Math.max(-1.5, Math.min(1.5, pitch));
   }
 });
 
+window.addEventListener("resize", () => {
+  canvas.width = window.innerWidth;
+  canvas.height = window.innerHeight;
+  gl.viewport(0, 0, canvas.width, canvas.height);
+});
+
 // ===== MATH =====
+// all matrices are column-major, as WebGL expects
 function mat4Perspective(fov, aspect, near, far) {
   const f = 1 / Math.tan(fov/2);
   return [
@@ -77,40 +133,201 @@ function mat4Perspective(fov, aspect, near, far) {
   ];
 }
 
-function mat4Look() {
-  const cx = Math.cos(pitch), sx = Math.sin(pitch);
-  const cy = Math.cos(yaw), sy = Math.sin(yaw);
+function mat4Multiply(a, b) {
+  const out = new Array(16);
+  for (let c = 0; c < 4; c++) {
+    for (let r = 0; r < 4; r++) {
+      let s = 0;
+      for (let k = 0; k < 4; k++) s += a[k*4 + r] * b[c*4 + k];
+      out[c*4 + r] = s;
+    }
+  }
+  return out;
+}
 
-  const fx = sy*cx, fy = sx, fz = -cy*cx;
+function forward() {
+  const cp = Math.cos(pitch);
+  return [Math.sin(yaw)*cp, Math.sin(pitch), -Math.cos(yaw)*cp];
+}
 
+// world -> camera for the walk camera (looks along forward(), y up)
+function mat4Look() {
+  const f = forward();
+  const z = [-f[0], -f[1], -f[2]];
+  const xl = Math.hypot(z[2], z[0]) || 1;
+  const x = [z[2]/xl, 0, -z[0]/xl];                  // up x z, up = +y
+  const y = [z[1]*x[2] - z[2]*x[1], z[2]*x[0] - z[0]*x[2], z[0]*x[1] - z[1]*x[0]];
+  const e = [camX, camY, camZ];
+  const dot = (a, b) => a[0]*b[0] + a[1]*b[1] + a[2]*b[2];
   return [
-    cy,0,sy,0,
-    sy*sx, cx, -cy*sx,0,
-    -sy*cx, sx, cy*cx,0,
-    -(camX*cy + camZ*sy),
-    -(camY),
-    -(-camX*sy*cx + camZ*cy*cx),
-    1
+    x[0], y[0], z[0], 0,
+    x[1], y[1], z[1], 0,
+    x[2], y[2], z[2], 0,
+    -dot(x, e), -dot(y, e), -dot(z, e), 1
   ];
 }
 
+// model matrix: identity, or a half turn about x for y-down reconstructions
+function mat4Model() {
+  const s = flip ? -1 : 1;
+  return [1,0,0,0, 0,s,0,0, 0,0,s,0, 0,0,0,1];
+}
+
+// the six clip planes of `m` (Gribb & Hartmann), each [a,b,c,d] with inside >= 0
+function frustumPlanes(m) {
+  const row = i => [m[i], m[4+i], m[8+i], m[12+i]];
+  const r0 = row(0), r1 = row(1), r2 = row(2), r3 = row(3);
+  const planes = [];
+  for (const r of [r0, r1, r2]) {
+    planes.push(r3.map((v, i) => v + r[i]));
+    planes.push(r3.map((v, i) => v - r[i]));
+  }
+  return planes;
+}
+
+function boxVisible(planes, min, size) {
+  for (const p of planes) {
+    const x = min[0] + (p[0] > 0 ? size : 0);
+    const y = min[1] + (p[1] > 0 ? size : 0);
+    const z = min[2] + (p[2] > 0 ? size : 0);
+    if (p[0]*x + p[1]*y + p[2]*z + p[3] < 0) return false;
+  }
+  return true;
+}
+
+// ===== TILES =====
+const hud = document.getElementById("hud");
+let index = null;
+const tiles = new Map();         // name -> {buffer, count, lastUsed}
+const loading = new Set();
+let loadedPoints = 0;
+let frame = 0;
+
+// outside the cloud, looking at its center
+function resetCamera() {
+  if (!index) return;
+  const h = index.size / 2, s = flip ? -1 : 1;
+  camX = index.min[0] + h; camY = s*(index.min[1] + h); camZ = s*(index.min[2] + h) + 2.5*index.size;
+  yaw = 0; pitch = 0;
+}
+
+fetch(TILES + "index.json")
+  .then(r => r.ok ? r.json() : null)
+  .then(idx => {
+    if (!idx) return;
+    index = idx;
+    resetCamera();
+  })
+  .catch(() => {});
+
+function loadTile(name) {
+  loading.add(name);
+  fetch(TILES + name + ".bin")
+    .then(r => r.arrayBuffer())
+    .then(data => {
+      const buffer = gl.createBuffer();
+      gl.bindBuffer(gl.ARRAY_BUFFER, buffer);
+      gl.bufferData(gl.ARRAY_BUFFER, data, gl.STATIC_DRAW);
+      const count = index.nodes[name].count;
+      tiles.set(name, {buffer, count, lastUsed: frame});
+      loadedPoints += count;
+    })
+    .catch(() => {})
+    .finally(() => loading.delete(name));
+}
+
+function evict(keep) {
+  if (loadedPoints <= POINT_BUDGET) return;
+  const old = [...tiles.entries()].filter(([n]) => !keep.has(n)).sort((a, b) => a[1].lastUsed - b[1].lastUsed);
+  for (const [name, t] of old) {
+    if (loadedPoints <= POINT_BUDGET) break;
+    gl.deleteBuffer(t.buffer);
+    tiles.delete(name);
+    loadedPoints -= t.count;
+  }
+}
+
+// visible nodes, coarse to fine: a node's children add detail to it, so a
+// node is drawn and refined while its point spacing covers > LOD_PIXELS
+function selectNodes(planes, eye) {
+  const pxPerRad = canvas.height / (2 * Math.tan(FOV/2));
+  const out = [];
+  const stack = ["r"];
+  while (stack.length) {
+    const name = stack.pop();
+    const node = index.nodes[name];
+    if (!node || !boxVisible(planes, node.min, node.size)) continue;
+    const h = node.size / 2, s = flip ? -1 : 1;
+    const c = [node.min[0] + h, s*(node.min[1] + h), s*(node.min[2] + h)];
+    const dist = Math.max(Math.hypot(c[0]-eye[0], c[1]-eye[1], c[2]-eye[2]) - h*Math.sqrt(3), 1e-3);
+    const spacing = node.size / index.grid / dist * pxPerRad;
+    out.push({name, node, priority: spacing});
+    if (spacing > LOD_PIXELS) {
+      for (let k = 0; k < 8; k++) stack.push(name + k);
+    }
+  }
+  return out;
+}
+
+function drawTiles(mvp) {
+  const eye = [camX, camY, camZ];
+  const visible = selectNodes(frustumPlanes(mvp), eye);
+  const want = new Set(visible.map(v => v.name));
+
+  gl.useProgram(pointProgram);
+  gl.uniformMatrix4fv(loc.mvp, false, mvp);
+  gl.enableVertexAttribArray(loc.position);
+  gl.enableVertexAttribArray(loc.color);
+  for (const v of visible) {
+    const t = tiles.get(v.name);
+    if (!t) continue;
+    t.lastUsed = frame;
+    gl.bindBuffer(gl.ARRAY_BUFFER, t.buffer);
+    gl.vertexAttribPointer(loc.position, 3, gl.UNSIGNED_SHORT, true, 0, 0);
+    gl.vertexAttribPointer(loc.color, 3, gl.UNSIGNED_BYTE, true, 0, 6 * t.count);
+    gl.uniform3fv(loc.offset, v.node.min);
+    gl.uniform1f(loc.scale, v.node.size);
+    gl.uniform1f(loc.pointSize, Math.min(Math.max(v.priority, 1), 8));
+    gl.drawArrays(gl.POINTS, 0, t.count);
+  }
+  gl.disableVertexAttribArray(loc.color);
+
+  // request the most needed missing tiles first
+  const missing = visible.filter(v => !tiles.has(v.name) && !loading.has(v.name))
+    .sort((a, b) => b.priority - a.priority);
+  for (const v of missing.slice(0, MAX_LOADING - loading.size)) loadTile(v.name);
+  evict(want);
+}
+
 // ===== LOOP =====
 function loop() {
-  const speed = 0.1;
-  if (keys["w"]) { camX += Math.sin(yaw)*speed; camZ -= Math.cos(yaw)*speed; }
-  if (keys["s"]) { camX -= Math.sin(yaw)*speed; camZ += Math.cos(yaw)*speed; }
+  frame++;
+  const f = forward();
+  const speed = index ? index.size / 400 : 0.1;
+  if (keys["w"]) { camX += f[0]*speed; camY += f[1]*speed; camZ += f[2]*speed; }
+  if (keys["s"]) { camX -= f[0]*speed; camY -= f[1]*speed; camZ -= f[2]*speed; }
   if (keys["a"]) { camX -= Math.cos(yaw)*speed; camZ -= Math.sin(yaw)*speed; }
   if (keys["d"]) { camX += Math.cos(yaw)*speed; camZ += Math.sin(yaw)*speed; }
 
   gl.clearColor(0.2,0.6,1.0,1);
   gl.clear(gl.COLOR_BUFFER_BIT | gl.DEPTH_BUFFER_BIT);
 
-  const proj = mat4Perspective(1.2, canvas.width/canvas.height, 0.1, 1000);
-  const view = mat4Look();
-  const mvp = proj.map((v,i)=>v+(view[i]||0));
+  const proj = mat4Perspective(FOV, canvas.width/canvas.height, 0.01, 1000);
+  const viewProj = mat4Multiply(proj, mat4Look());
 
-  gl.uniformMatrix4fv(gl.getUniformLocation(program,"mvp"), false, mvp);
-  gl.drawArrays(gl.TRIANGLES, 0, 6);
+  if (index) {
+    drawTiles(mat4Multiply(viewProj, mat4Model()));
+    if (frame % 30 === 0) {
+      hud.textContent = `${tiles.size} tiles, ${loadedPoints} / ${index.points} points, ${loading.size} loading`;
+    }
+  } else {
+    gl.useProgram(program);
+    gl.bindBuffer(gl.ARRAY_BUFFER, vbo);
+    gl.enableVertexAttribArray(posLoc);
+    gl.vertexAttribPointer(posLoc, 3, gl.FLOAT, false, 0, 0);
+    gl.uniformMatrix4fv(gl.getUniformLocation(program,"mvp"), false, viewProj);
+    gl.drawArrays(gl.TRIANGLES, 0, 6);
+  }
 
   requestAnimationFrame(loop);
 }